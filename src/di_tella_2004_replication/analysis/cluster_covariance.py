@@ -0,0 +1,115 @@
+"""Function(s) for cluster-robust covariances of regression coefficients."""
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+class ClusterCovariance:
+    """The clusters of a regression design, prepared once for many covariances.
+
+    The scores of every coefficient vector are summed within clusters by a single
+    product with a sparse (clusters x observations) indicator matrix. With two
+    clustering dimensions, e.g. blocks and weeks, the covariance is the one of
+    Cameron, Gelbach and Miller (2011): the sum of the one-way covariances of both
+    dimensions minus the one-way covariance of their intersection. The indicator
+    matrices and the inverse of x'x are built once, so any number of outcomes that
+    share the design can be handled at once.
+
+    Args:
+        x (array-like): The regressors, with shape (observations, regressors).
+        clusters (list of array-like): The cluster labels of one or two dimensions.
+
+    Raises:
+        ValueError: If there are not one or two dimensions, or a label is missing.
+
+    """
+
+    def __init__(self, x, clusters):
+        if len(clusters) not in (1, 2):
+            raise ValueError("Clusters must have one or two dimensions.")
+        self.x = np.asarray(x, dtype=float)
+        nobs = self.x.shape[0]
+        codes = []
+        for labels in clusters:
+            dimension_codes, _ = pd.factorize(np.asarray(labels).ravel(), sort=True)
+            if len(dimension_codes) != nobs:
+                raise ValueError("Clusters must have one label per observation.")
+            if (dimension_codes < 0).any():
+                raise ValueError("The cluster labels must not have missing values.")
+            codes.append(dimension_codes)
+        # Every term adds or subtracts the score covariance of one clustering.
+        self.signs = [1.0] * len(codes)
+        if len(codes) == 2:
+            intersection, _ = pd.factorize(
+                codes[0].astype(np.int64) * (codes[1].max() + 1) + codes[1],
+            )
+            codes.append(intersection)
+            self.signs.append(-1.0)
+        self.n_clusters = [int(term.max()) + 1 for term in codes]
+        self._indicators = [
+            sp.csr_matrix(
+                (np.ones(nobs), (term, np.arange(nobs))),
+                shape=(n_clusters, nobs),
+            )
+            for term, n_clusters in zip(codes, self.n_clusters)
+        ]
+        self._xpxi = np.linalg.inv(self.x.T @ self.x / nobs)
+
+    def score_covariance(self, scores, group_debias=False):
+        """Returns the clustered covariance of the scores of every coefficient vector.
+
+        Args:
+            scores (numpy.ndarray): Array of shape (observations, regressors) or
+                (observations, regressors, outcomes).
+            group_debias (bool): Whether to scale every term by the number of its
+                clusters G by G / (G - 1).
+
+        Returns:
+            numpy.ndarray: Array of shape (regressors, regressors) or (outcomes,
+            regressors, regressors), divided by the number of observations.
+
+        """
+        squeeze = scores.ndim == 2
+        if squeeze:
+            scores = scores[:, :, None]
+        nobs, n_vars, n_outcomes = scores.shape
+        flat = scores.reshape(nobs, -1)
+        s = np.zeros((n_outcomes, n_vars, n_vars))
+        for sign, indicator, n_clusters in zip(
+            self.signs,
+            self._indicators,
+            self.n_clusters,
+        ):
+            sums = (indicator @ flat).reshape(n_clusters, n_vars, n_outcomes)
+            term = np.einsum("gkm,glm->mkl", sums, sums) / nobs
+            if group_debias:
+                term *= n_clusters / (n_clusters - 1)
+            s += sign * term
+        return s[0] if squeeze else s
+
+    def cov(self, eps, scale=1.0, group_debias=False):
+        """Returns the cluster-robust covariance of the coefficients of every outcome.
+
+        Args:
+            eps (numpy.ndarray): The residuals, with shape (observations,) or
+                (observations, outcomes).
+            scale (float): The small-sample adjustment of the score covariance, e.g.
+                nobs / (nobs - regressors). Stata and statsmodels use (nobs - 1) /
+                (nobs - regressors) together with group_debias.
+            group_debias (bool): Whether to scale every term by G / (G - 1).
+
+        Returns:
+            numpy.ndarray: Array of shape (regressors, regressors) or (outcomes,
+            regressors, regressors).
+
+        """
+        eps = np.asarray(eps, dtype=float)
+        squeeze = eps.ndim == 1
+        if squeeze:
+            eps = eps[:, None]
+        nobs = self.x.shape[0]
+        scores = self.x[:, :, None] * eps[:, None, :]
+        s = self.score_covariance(scores, group_debias) * scale
+        cov = self._xpxi @ s @ self._xpxi / nobs
+        cov = (cov + cov.transpose(0, 2, 1)) / 2
+        return cov[0] if squeeze else cov
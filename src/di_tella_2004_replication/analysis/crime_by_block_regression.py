@@ -1,135 +1,128 @@
-import statsmodels.api as sm
-from linearmodels import PanelOLS
-from linearmodels.iv import absorbing
+from di_tella_2004_replication.analysis.design_matrix import design_matrix
+from di_tella_2004_replication.analysis.fixed_effects import (
+    block_absorber,
+    fit_entity_effects,
+)
+from di_tella_2004_replication.data_management.panel_tables import join_dimension
 
+TOTALS = ["hv", "lv", "night", "day", "weekday", "weekend"]
+DIFFERENCES = ["hv_lv", "night_day", "weekday_weekend"]
+REGRESSORS = ["treatment", "treatment_1d", "treatment_2d"] + [
+    f"month_dummy_{i}" for i in range(5, 13)
+]
 
-def fe_regression_models_totals(df):
+
+def fe_regression_models_totals(df, blocks=None):
     """Perform panel regression analysis for total thefts on the input dataframe using
     fixed-effects regression models for each suffix in the list.
 
     Args:
-    df (pandas.DataFrame): Input dataframe with the necessary variables
+    df (pandas.DataFrame): Input dataframe (or fact table) with the necessary variables
+    blocks (pandas.DataFrame, optional): Block dimension table to join the variables
+        from that are missing in df.
 
     Returns:
     A tuple containing two dictionaries with the results of the fixed effects models and the absorbing fixed effects models, respectively.
 
     """
-    fe_results = {}
-
-    for suffix in ["hv", "lv", "night", "day", "weekday", "weekend"]:
-
-        fe_model = PanelOLS(
-            df[f"tot_theft_{suffix}"],
-            sm.add_constant(
-                df[
-                    ["treatment", "treatment_1d", "treatment_2d"]
-                    + [f"month_dummy_{i}" for i in range(5, 13)]
-                ],
-            ),
-            entity_effects=True,
-            check_rank=True,
+    if blocks is not None:
+        df = join_dimension(
+            df,
+            blocks,
+            [f"tot_theft_{suffix}" for suffix in TOTALS] + REGRESSORS,
         )
-        fe_results[suffix] = fe_model.fit(cov_type="clustered", cluster_entity=True)
 
-    return fe_results
+    matrix = design_matrix(df)
+    fe_results = fit_entity_effects(
+        matrix.frame([f"tot_theft_{suffix}" for suffix in TOTALS]),
+        matrix.frame(REGRESSORS, constant=True),
+    )
+    return {suffix: fe_results[f"tot_theft_{suffix}"] for suffix in TOTALS}
 
 
-def fe_regression_models_dif(df):
+def fe_regression_models_dif(df, blocks=None):
     """Perform panel regression analysis for for differences in thefts across car
     values, night and day and weekday and weekends, on the input dataframe using fixed-
     effects regression models for each suffix in the list.
 
     Args:
-    df (pandas.DataFrame): Input dataframe with the necessary variables
+    df (pandas.DataFrame): Input dataframe (or fact table) with the necessary variables
+    blocks (pandas.DataFrame, optional): Block dimension table to join the variables
+        from that are missing in df.
 
     Returns:
     A tuple containing two dictionaries with the results of the fixed effects models and the absorbing fixed effects models, respectively.
 
     """
-    fe_results = {}
-
-    for suffix in ["hv_lv", "night_day", "weekday_weekend"]:
-
-        fe_model = PanelOLS(
-            df[f"dif_{suffix}"],
-            sm.add_constant(
-                df[
-                    ["treatment", "treatment_1d", "treatment_2d"]
-                    + [f"month_dummy_{i}" for i in range(5, 13)]
-                ],
-            ),
-            entity_effects=True,
-            check_rank=True,
+    if blocks is not None:
+        df = join_dimension(
+            df,
+            blocks,
+            [f"dif_{suffix}" for suffix in DIFFERENCES] + REGRESSORS,
         )
-        fe_results[suffix] = fe_model.fit(cov_type="clustered", cluster_entity=True)
 
-    return fe_results
+    matrix = design_matrix(df)
+    fe_results = fit_entity_effects(
+        matrix.frame([f"dif_{suffix}" for suffix in DIFFERENCES]),
+        matrix.frame(REGRESSORS, constant=True),
+    )
+    return {suffix: fe_results[f"dif_{suffix}"] for suffix in DIFFERENCES}
 
 
-def abs_regression_models_totals(df):
+def abs_regression_models_totals(df, blocks=None):
     """Perform panel regression analysis for total thefts on the input dataframe using
     absorbing regression models for each suffix in the list.
 
     Args:
-    df (pandas.DataFrame): Input dataframe with the necessary variables
+    df (pandas.DataFrame): Input dataframe (or fact table) with the necessary variables
+    blocks (pandas.DataFrame, optional): Block dimension table to join the variables
+        from that are missing in df.
 
     Returns:
     A tuple containing two dictionaries with the results of the fixed effects models and the absorbing fixed effects models, respectively.
 
     """
-    df = df.reset_index(names=["block", "month"])
-
-    abs_results = {}
-
-    for suffix in ["hv", "lv", "night", "day", "weekday", "weekend"]:
-
-        abs_model = absorbing.AbsorbingLS(
-            df[f"tot_theft_{suffix}"],
-            sm.add_constant(
-                df[
-                    ["treatment", "treatment_1d", "treatment_2d"]
-                    + [f"month_dummy_{i}" for i in range(5, 13)]
-                ],
-            ),
-            absorb=df["block"].to_frame().astype(float),
-            drop_absorbed=True,
+    if blocks is not None:
+        df = join_dimension(
+            df,
+            blocks,
+            [f"tot_theft_{suffix}" for suffix in TOTALS] + REGRESSORS,
         )
-
-        abs_results[suffix] = abs_model.fit(cov_type="robust", debiased=True)
-
-    return abs_results
+    df = df.reset_index(names=["block", "month"])
+    matrix = design_matrix(df)
+    abs_results = block_absorber(matrix, REGRESSORS).fit(
+        matrix.frame([f"tot_theft_{suffix}" for suffix in TOTALS]),
+        cov_type="robust",
+        debiased=True,
+    )
+    return {suffix: abs_results[f"tot_theft_{suffix}"] for suffix in TOTALS}
 
 
-def abs_regression_models_dif(df):
+def abs_regression_models_dif(df, blocks=None):
     """Perform panel regression analysis for differences in thefts across car values,
     night and day and weekday and weekends,on the input dataframe using absorbing
     regression models for each suffix in the list.
 
     Args:
-    df (pandas.DataFrame): Input dataframe with the necessary variables
+    df (pandas.DataFrame): Input dataframe (or fact table) with the necessary variables
+    blocks (pandas.DataFrame, optional): Block dimension table to join the variables
+        from that are missing in df.
 
     Returns:
     A tuple containing two dictionaries with the results of the fixed effects models and the absorbing fixed effects models, respectively.
 
     """
-    df = df.reset_index(names=["block", "month"])
-
-    abs_results = {}
-
-    for suffix in ["hv_lv", "night_day", "weekday_weekend"]:
-
-        abs_model = absorbing.AbsorbingLS(
-            df[f"dif_{suffix}"],
-            sm.add_constant(
-                df[
-                    ["treatment", "treatment_1d", "treatment_2d"]
-                    + [f"month_dummy_{i}" for i in range(5, 13)]
-                ],
-            ),
-            absorb=df["block"].to_frame().astype(float),
-            drop_absorbed=True,
+    if blocks is not None:
+        df = join_dimension(
+            df,
+            blocks,
+            [f"dif_{suffix}" for suffix in DIFFERENCES] + REGRESSORS,
         )
-
-        abs_results[suffix] = abs_model.fit(cov_type="robust", debiased=True)
-
-    return abs_results
+    df = df.reset_index(names=["block", "month"])
+    matrix = design_matrix(df)
+    abs_results = block_absorber(matrix, REGRESSORS).fit(
+        matrix.frame([f"dif_{suffix}" for suffix in DIFFERENCES]),
+        cov_type="robust",
+        debiased=True,
+    )
+    return {suffix: abs_results[f"dif_{suffix}"] for suffix in DIFFERENCES}
@@ -0,0 +1,160 @@
+"""Function(s) for sweeping fixed effects out of regression inputs."""
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import lsmr
+
+
+def _as_columns(values):
+    """Returns values as a float array of shape (observations, columns)."""
+    values = np.asarray(values, dtype=float)
+    return values[:, None] if values.ndim == 1 else values
+
+
+class Demeaner:
+    """The groups of one or more fixed effects, factorized once for many demeanings.
+
+    Group sums are a `np.bincount` over the integer codes of the groups, one per
+    column. With one effect, demeaning subtracts the group means once, which is
+    exact. With more effects, the group means of every effect are subtracted in turn
+    (alternating projections) until a sweep changes a column by no more than tol
+    times its norm. For balanced panels, this takes a single sweep. On weakly
+    connected panels, e.g. entities that are each seen in a few adjacent periods,
+    the sweeps converge very slowly. If the rate of convergence shows that a column
+    would not converge within max_iterations sweeps, the rest of its effects are
+    instead solved for by LSMR on the sparse dummies of all effects.
+
+    Args:
+        groups (list of array-like): The group labels of every effect, e.g. the
+            blocks and the months of the observations.
+        weights (array-like, optional): Weights of the observations. Group means are
+            then weighted means.
+        tol (float): The convergence tolerance of the alternating projections and
+            LSMR.
+        max_iterations (int): The maximum number of sweeps.
+
+    """
+
+    def __init__(self, groups, weights=None, tol=1e-10, max_iterations=1000):
+        self.codes = []
+        self.n_groups = []
+        for labels in groups:
+            codes, uniques = pd.factorize(np.asarray(labels).ravel(), sort=True)
+            if (codes < 0).any():
+                raise ValueError("The group labels must not have missing values.")
+            self.codes.append(codes)
+            self.n_groups.append(len(uniques))
+        self.weights = None if weights is None else np.asarray(weights, float).ravel()
+        self._group_weights = [
+            np.bincount(codes, weights=self.weights, minlength=n_groups)
+            for codes, n_groups in zip(self.codes, self.n_groups)
+        ]
+        self.tol = tol
+        self.max_iterations = max_iterations
+        self._dummies = None
+
+    def group_means(self, values, effect=0):
+        """Returns the (weighted) means of every column within the groups of an effect.
+
+        Args:
+            values (array-like): Array of shape (observations,) or (observations,
+                columns).
+            effect (int): The position of the effect in groups.
+
+        Returns:
+            numpy.ndarray: Array of shape (groups, columns).
+
+        """
+        values = _as_columns(values)
+        codes, n_groups = self.codes[effect], self.n_groups[effect]
+        weighted = values if self.weights is None else values * self.weights[:, None]
+        sums = np.empty((n_groups, values.shape[1]))
+        for j in range(values.shape[1]):
+            sums[:, j] = np.bincount(codes, weights=weighted[:, j], minlength=n_groups)
+        return sums / self._group_weights[effect][:, None]
+
+    def demean(self, values):
+        """Sweeps the fixed effects out of every column.
+
+        Args:
+            values (array-like): Array of shape (observations,) or (observations,
+                columns).
+
+        Returns:
+            numpy.ndarray: The residuals of a (weighted) regression of every column on
+            the dummies of all effects, with shape (observations, columns).
+
+        """
+        values = _as_columns(values)
+        if len(self.codes) == 1:
+            return values - self.group_means(values)[self.codes[0]]
+
+        # Every column is swept on its own, as a contiguous array, until it converges.
+        resid = np.empty_like(values)
+        for j in range(values.shape[1]):
+            resid[:, j] = self._alternating_projections(values[:, j])
+        return resid
+
+    def _weighted_norm(self, column):
+        """Returns the (weighted) Euclidean norm of a column."""
+        squares = column**2 if self.weights is None else self.weights * column**2
+        return np.sqrt(squares.sum())
+
+    def _alternating_projections(self, column):
+        """Sweeps the group means of all effects out of one column until convergence."""
+        resid = column.copy()
+        threshold = self.tol * max(self._weighted_norm(resid), 1.0)
+        previous = np.inf
+        for iteration in range(1, self.max_iterations + 1):
+            change = 0.0
+            for codes, n_groups, group_weights in zip(
+                self.codes,
+                self.n_groups,
+                self._group_weights,
+            ):
+                sums = np.bincount(
+                    codes,
+                    weights=resid if self.weights is None else resid * self.weights,
+                    minlength=n_groups,
+                )
+                means = sums / group_weights
+                # The (weighted) norm of the change is a sum over the groups.
+                change = max(change, np.sqrt((group_weights * means**2).sum()))
+                resid -= means[codes]
+            if change <= threshold:
+                return resid
+            rate = change / previous
+            previous = change
+            remaining = self.max_iterations - iteration
+            if rate >= 1.0 or (
+                iteration >= 10 and change * rate**remaining > threshold
+            ):
+                break
+        return self._lsmr(resid)
+
+    def _lsmr(self, column):
+        """Sweeps the effects out of one column by LSMR on all of their dummies."""
+        if self._dummies is None:
+            nobs = len(self.codes[0])
+            self._dummies = sp.hstack(
+                [
+                    sp.csr_matrix(
+                        (np.ones(nobs), (np.arange(nobs), codes)),
+                        shape=(nobs, n_groups),
+                    )
+                    for codes, n_groups in zip(self.codes, self.n_groups)
+                ],
+                format="csr",
+            )
+        dummies, rhs = self._dummies, column
+        if self.weights is not None:
+            root_w = np.sqrt(self.weights)
+            dummies, rhs = sp.diags(root_w) @ dummies, root_w * column
+        effects = lsmr(
+            dummies,
+            rhs,
+            atol=self.tol,
+            btol=self.tol,
+            maxiter=10 * sum(self.n_groups),
+        )[0]
+        return column - self._dummies @ effects
@@ -0,0 +1,213 @@
+"""Function(s) for converting the regression inputs to NumPy once per data set."""
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from di_tella_2004_replication.data_management.derived_variables import (
+    VIRTUAL_COLUMNS,
+    evaluate_virtual,
+)
+
+CONSTANT = "const"
+
+# The caches of the active `shared_design_matrices` blocks. The outermost is used.
+_SCOPES = []
+
+
+def _is_numeric(series):
+    """Checks whether a column can be stored in a float block."""
+    return pd.api.types.is_numeric_dtype(series.dtype) and not isinstance(
+        series.dtype,
+        pd.CategoricalDtype,
+    )
+
+
+def _has_nonzero_constant(values):
+    """Checks whether a block holds a constant column, as `sm.add_constant` does."""
+    if values.shape[0] == 0:
+        return False
+    is_constant = np.ptp(values, axis=0) == 0
+    is_constant &= np.all(values != 0.0, axis=0)
+    return bool(is_constant.any())
+
+
+class DesignMatrix:
+    """The numeric columns of a data set, converted to NumPy once per column.
+
+    A column is converted to the dtype the estimators use the first time a fit selects
+    it, and kept for the later fits, so a data set with many columns costs only the
+    conversion of the columns its models use. Sparse columns are kept sparse, and only
+    the ones a fit selects are made dense. Virtual columns, whose recipes are listed in
+    the attribute "virtual_columns" of df, are evaluated from the other columns the
+    first time a fit selects them.
+
+    Args:
+        df (pandas.DataFrame): The data set. It must not be modified while the design
+            matrix is in use.
+        columns (list of str, optional): The columns that can be selected. Defaults to
+            all numeric and boolean columns.
+        dtype (str or numpy.dtype): The dtype of the columns, float64 or float32.
+
+    """
+
+    def __init__(self, df, columns=None, dtype="float64"):
+        if columns is None:
+            columns = [col for col in df.columns if _is_numeric(df[col])]
+        self.virtual = {
+            name: recipe
+            for name, recipe in df.attrs.get(VIRTUAL_COLUMNS, {}).items()
+            if name not in df.columns
+        }
+        self.index = df.index
+        self.columns = pd.Index([CONSTANT, *columns, *self.virtual])
+        self.dtype = np.dtype(dtype)
+        self._df = df
+        self._n_stored = len(columns) + 1
+        self._values = {}
+        self._positions = {}
+
+    def positions(self, columns):
+        """Returns the positions of columns in the block, cached per selection.
+
+        Args:
+            columns (list of str): The column names.
+
+        Returns:
+            numpy.ndarray: The positions.
+
+        """
+        key = tuple(columns)
+        if key not in self._positions:
+            positions = self.columns.get_indexer(key)
+            if (positions == -1).any():
+                missing = [col for col, pos in zip(key, positions) if pos == -1]
+                raise KeyError(f"Columns not in the design matrix: {missing}")
+            self._positions[key] = positions
+        return self._positions[key]
+
+    def _column(self, name):
+        """Returns a single column as a dense array."""
+        return self._take(self.positions([name]))[:, 0]
+
+    def _stored_column(self, position):
+        """Returns a column of the data set, converting it on the first request."""
+        if position in self._values:
+            return self._values[position]
+        if position == 0:
+            values = np.ones(len(self.index), dtype=self.dtype)
+        else:
+            column = self._df[self.columns[position]]
+            if isinstance(column.dtype, pd.SparseDtype):
+                # Made dense for the selecting fit only, so it is not kept.
+                return column.array.to_dense().astype(self.dtype)
+            values = column.to_numpy(dtype=self.dtype, na_value=np.nan)
+        self._values[position] = values
+        return values
+
+    def _virtual_column(self, position):
+        """Returns a virtual column, evaluating its recipe on the first request."""
+        if position not in self._values:
+            recipe = self.virtual[self.columns[position]]
+            values = evaluate_virtual(recipe, self._column)
+            self._values[position] = np.asarray(values, dtype=self.dtype)
+        return self._values[position]
+
+    def _take(self, positions):
+        """Returns the columns at positions as one column-major block."""
+        values = np.empty((len(self.index), len(positions)), self.dtype, order="F")
+        for i, position in enumerate(positions):
+            if position < self._n_stored:
+                values[:, i] = self._stored_column(position)
+            else:
+                values[:, i] = self._virtual_column(position)
+        return values
+
+    def _rows(self, rows):
+        """Returns the row selection as a NumPy indexer and the selected index."""
+        if rows is None:
+            return slice(None), self.index
+        rows = np.asarray(rows)
+        return rows, self.index[rows]
+
+    def frame(self, columns, constant=False, rows=None):
+        """Returns the selected columns as a float DataFrame.
+
+        Args:
+            columns (str or list of str): The regressors.
+            constant (bool): Whether to prepend the constant "const", unless the
+                selection already holds a non-zero constant column. This matches
+                `statsmodels.api.add_constant`.
+            rows (array-like of bool or int, optional): The rows to select. Defaults
+                to all rows.
+
+        Returns:
+            pandas.DataFrame: The regressors, indexed like the data set.
+
+        """
+        if isinstance(columns, str):
+            columns = [columns]
+        selection, index = self._rows(rows)
+        positions = self.positions(columns)
+        values = self._take(positions)[selection]
+        if constant and not _has_nonzero_constant(values):
+            positions = self.positions([CONSTANT, *columns])
+            values = self._take(positions)[selection]
+        return pd.DataFrame(values, index=index, columns=self.columns[positions])
+
+    def series(self, column, rows=None):
+        """Returns a single column as a float Series.
+
+        Args:
+            column (str): The column name.
+            rows (array-like of bool or int, optional): The rows to select. Defaults
+                to all rows.
+
+        Returns:
+            pandas.Series: The column, indexed like the data set.
+
+        """
+        selection, index = self._rows(rows)
+        values = self._take(self.positions([column]))[selection, 0]
+        return pd.Series(values, index=index, name=column)
+
+
+@contextlib.contextmanager
+def shared_design_matrices():
+    """Shares one design matrix per data set among the fits inside the block.
+
+    Inside the block, `design_matrix` builds the matrix of a DataFrame on the first call
+    only, so e.g. the fits of a task share one conversion and one absorption. The
+    DataFrames must not be modified inside the block. Outside of any block, every call
+    builds a new matrix, so a data set that was modified is never fit with stale values.
+
+    """
+    _SCOPES.append({})
+    try:
+        yield
+    finally:
+        _SCOPES.pop()
+
+
+def design_matrix(df, dtype="float64"):
+    """Returns the design matrix of a data set.
+
+    Inside a `shared_design_matrices` block, the matrix is built on the first call
+    for a DataFrame only.
+
+    Args:
+        df (pandas.DataFrame): The data set.
+        dtype (str or numpy.dtype): The dtype of the block, float64 or float32.
+
+    Returns:
+        DesignMatrix: The design matrix of all numeric, boolean and sparse columns.
+
+    """
+    if not _SCOPES:
+        return DesignMatrix(df, dtype=dtype)
+    # The cache holds the DataFrame itself, so its id is not reused in the block.
+    cache = _SCOPES[0]
+    key = (id(df), np.dtype(dtype).str)
+    if key not in cache:
+        cache[key] = (df, DesignMatrix(df, dtype=dtype))
+    return cache[key][1]
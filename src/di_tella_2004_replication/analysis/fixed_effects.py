@@ -0,0 +1,773 @@
+"""Function(s) for fitting fixed-effects regressions of many outcomes at once."""
+import functools
+import warnings
+import weakref
+
+import linearmodels
+import numpy as np
+import pandas as pd
+from linearmodels import PanelOLS
+from linearmodels.iv.absorbing import AbsorbingLS
+from linearmodels.iv.results import AbsorbingLSResults
+from linearmodels.panel.data import PanelData
+from linearmodels.panel.results import PanelEffectsResults
+from linearmodels.panel.utility import (
+    AbsorbingEffectWarning,
+    absorbing_warn_msg,
+    check_absorbed,
+    not_absorbed,
+)
+from linearmodels.shared.hypotheses import InvalidTestStatistic, WaldTestStatistic
+from linearmodels.shared.utility import AttrDict
+from scipy.linalg import lstsq
+
+from di_tella_2004_replication.analysis.cluster_covariance import ClusterCovariance
+from di_tella_2004_replication.analysis.demeaning import Demeaner
+
+# The results are built by the constructors of the results classes of linearmodels,
+# which take the fields of a fit and may change them in a major release.
+_LINEARMODELS_MAJOR = 7
+if int(linearmodels.__version__.split(".")[0]) != _LINEARMODELS_MAJOR:
+    raise ImportError(
+        f"fixed_effects.py requires linearmodels {_LINEARMODELS_MAJOR}.x, but "
+        f"{linearmodels.__version__} is installed.",
+    )
+
+_ABSORBERS = weakref.WeakKeyDictionary()
+
+
+def _lstsq(x, y):
+    """Solves a least-squares problem like PanelOLS does, for all columns of y."""
+    cond = max(x.shape) * np.finfo(np.float64).eps
+    return lstsq(x, y, cond=cond, lapack_driver="gelsy")[0]
+
+
+def _sum_of_squares(values):
+    """Returns the sum of squares of every column."""
+    return np.einsum("ij,ij->j", values, values)
+
+
+def _r2(residual_ss, total_ss):
+    """Returns 1 - residual_ss / total_ss, or 0 where total_ss is not positive."""
+    safe_ss = np.where(total_ss > 0.0, total_ss, 1.0)
+    return np.where(total_ss > 0.0, 1.0 - residual_ss / safe_ss, 0.0)
+
+
+def _squared_corr(y, fitted):
+    """Returns the squared correlation of every column of y and fitted."""
+    y = y - y.mean(axis=0)
+    fitted = fitted - fitted.mean(axis=0)
+    valid = (y.std(axis=0) > 0) & (fitted.std(axis=0) > 0)
+    denom = np.sqrt(_sum_of_squares(y) * _sum_of_squares(fitted))
+    corr = np.einsum("ij,ij->j", y, fitted) / np.where(valid, denom, 1.0)
+    return np.where(valid, corr, 0.0) ** 2
+
+
+def _structure_stats(ids, name):
+    """Returns the statistics of the observations per group that PanelOLS reports."""
+    counts = np.bincount(ids)
+    counts = counts[counts > 0]
+    return pd.Series(
+        [counts.mean(), np.median(counts), counts.max(), counts.min(), len(counts)],
+        index=["mean", "median", "max", "min", "total"],
+        name=name,
+    )
+
+
+def _constant_index(x):
+    """Returns the position of the first non-zero constant column, or None."""
+    is_constant = (np.ptp(x, axis=0) == 0) & (x[0] != 0.0)
+    positions = np.flatnonzero(is_constant)
+    return int(positions[0]) if len(positions) else None
+
+
+def _f_statistics(y, weps, root_w, n_vars, has_constant, df_resid):
+    """Returns the homoskedastic F-statistic of PanelOLS for every outcome."""
+    name = "Model F-statistic (homoskedastic)"
+    if has_constant and n_vars == 1:
+        invalid = InvalidTestStatistic("Model contains only a constant", name=name)
+        return [invalid] * y.shape[1]
+    num_df = n_vars - has_constant
+    if has_constant:
+        y = y - (root_w.T @ y) / (root_w.T @ root_w)
+    resid_ss = _sum_of_squares(weps)
+    num = _sum_of_squares(y) - resid_ss
+    return [
+        WaldTestStatistic(
+            float((num[j] / num_df) / (resid_ss[j] / df_resid))
+            if resid_ss[j] > 0.0
+            else 0.0,
+            null="All parameters ex. constant are zero",
+            df=num_df,
+            df_denom=df_resid,
+            name=name,
+        )
+        for j in range(y.shape[1])
+    ]
+
+
+def _wald_f_statistics(params, cov, constant, debiased, df_resid, name, invalid):
+    """Returns the Wald test that all coefficients but the constant are 0.
+
+    Args:
+        params (numpy.ndarray): The coefficients, one column per outcome.
+        cov (numpy.ndarray): The covariances, with shape (outcomes, regressors,
+            regressors).
+        constant (int or None): The position of the constant.
+        debiased (bool): Whether to report an F instead of a chi-squared statistic.
+        df_resid (int): The residual degrees of freedom.
+        name (str): The name of the test.
+        invalid (str): The reason the test is invalid if there is only a constant.
+
+    Returns:
+        list: The test of every outcome.
+
+    """
+    null = "All parameters ex. constant are zero"
+    n_vars, n_outcomes = params.shape
+    if constant is not None and n_vars == 1:
+        return [InvalidTestStatistic(invalid, name=name)] * n_outcomes
+    sel = np.ones(n_vars, dtype=bool)
+    if constant is not None:
+        sel[constant] = False
+    df = int(sel.sum())
+    tests = []
+    for j in range(n_outcomes):
+        test_params = params[sel, j]
+        stat = float(test_params @ np.linalg.inv(cov[j][sel][:, sel]) @ test_params)
+        if debiased:
+            tests.append(WaldTestStatistic(stat / df, null, df, df_resid, name=name))
+        else:
+            tests.append(WaldTestStatistic(stat, null, df, name=name))
+    return tests
+
+
+class EntityEffectsResults(PanelEffectsResults):
+    """The results of PanelOLS, with the robust F-statistic computed with the fit."""
+
+    def __init__(self, res):
+        super().__init__(res)
+        self._f_statistic_robust = res.f_statistic_robust
+
+    @property
+    def f_statistic_robust(self):
+        """Joint test of significance for non-constant regressors."""
+        return self._f_statistic_robust
+
+
+def _effect_results(model, params, values, n_vars):
+    """Returns the R-squared measures of PanelOLS for the params of every outcome.
+
+    Args:
+        model (PanelOLS): The model, whose weights are used.
+        params (numpy.ndarray): The coefficients, one column per outcome.
+        values (dict): The arrays "y" and "x" of the outcomes and regressors, their
+            (weighted) "between" and "within" versions, and the unweighted
+            "between_unweighted" and "within_unweighted" ones.
+        n_vars (int): The number of regressors.
+
+    Returns:
+        dict: Arrays of the measures of all outcomes, keyed like the results of
+        PanelOLS.
+
+    """
+    y, x = values["y"], values["x"]
+    n_outcomes = y.shape[1]
+    if model.has_constant and n_vars == 1:
+        zeros = np.zeros(n_outcomes)
+        r2 = {"r2o": zeros, "r2w": zeros, "r2b": zeros}
+    else:
+        between_y, between_x, between_w = values["between"]
+        root_bw = np.sqrt(between_w)
+        e = between_y
+        if model.has_constant:
+            e = between_y - (between_w * between_y).sum(axis=0) / between_w.sum()
+        r2b = _r2(
+            _sum_of_squares(root_bw * between_y - root_bw * between_x @ params),
+            (between_w * e**2).sum(axis=0),
+        )
+
+        w = model.weights.values2d
+        root_w = np.sqrt(w)
+        mu = (w * y).sum(axis=0) / w.sum() if model.has_constant else 0.0
+        r2o = _r2(
+            _sum_of_squares(root_w * y - root_w * x @ params),
+            _sum_of_squares(root_w * y - root_w * mu),
+        )
+
+        within_y, within_x = values["within"]
+        r2w = _r2(
+            _sum_of_squares(within_y - within_x @ params),
+            _sum_of_squares(within_y),
+        )
+        if model.dependent.nobs == 1:
+            r2w = np.zeros(n_outcomes)
+        r2 = {"r2o": r2o, "r2w": r2w, "r2b": r2b}
+
+    between_y, between_x = values["between_unweighted"]
+    within_y, within_x = values["within_unweighted"]
+    return {
+        **r2,
+        "c2o": _squared_corr(y, x @ params),
+        "c2b": _squared_corr(between_y, between_x @ params),
+        "c2w": _squared_corr(within_y, within_x @ params),
+    }
+
+
+def _drop_absorbed(x, has_constant, constant, names):
+    """Finds the regressors that the effects absorb, like PanelOLS does.
+
+    Args:
+        x (numpy.ndarray): The within-transformed regressors.
+        has_constant (bool): Whether the regressors hold a constant.
+        constant (int or None): The position of the constant.
+        names (list of str): The names of the regressors.
+
+    Returns:
+        list: The positions of the retained regressors.
+
+    """
+    retain = not_absorbed(x, has_constant, constant)
+    if not retain:
+        raise ValueError(
+            "All columns in exog have been fully absorbed by the included effects. "
+            "This model cannot be estimated.",
+        )
+    if len(retain) < x.shape[1]:
+        dropped = [name for i, name in enumerate(names) if i not in retain]
+        warnings.warn(
+            absorbing_warn_msg.format(absorbed_variables=", ".join(dropped)),
+            AbsorbingEffectWarning,
+            stacklevel=3,
+        )
+    return retain
+
+
+def fit_entity_effects(
+    dependent,
+    exog,
+    time_effects=False,
+    weights=None,
+    drop_absorbed=False,
+    debiased=True,
+):
+    """Fits entity fixed-effects regressions of many outcomes on the same regressors.
+
+    Each fit equals `PanelOLS(y, exog, entity_effects=True, time_effects=time_effects,
+    weights=weights, drop_absorbed=drop_absorbed).fit(cov_type="clustered",
+    cluster_entity=True)`, up to rounding. The effects are swept out by a Demeaner,
+    and the regressors are within-transformed, the groups factorized and the cluster
+    structure built once for all outcomes. The coefficients, residuals, covariances
+    and goodness-of-fit measures of all outcomes are computed as matrices.
+
+    Args:
+        dependent (pandas.DataFrame): The outcomes, one per column, with an (entity,
+            time) MultiIndex.
+        exog (pandas.DataFrame): The regressors, indexed like dependent.
+        time_effects (bool): Whether to add time effects.
+        weights (pandas.Series, optional): Weights of the observations, indexed like
+            dependent.
+        drop_absorbed (bool): Whether to drop regressors that the effects absorb,
+            instead of raising an error.
+        debiased (bool): Whether to adjust the covariance for the number of
+            regressors.
+
+    Returns:
+        dict: Maps every outcome to its EntityEffectsResults, the PanelEffectsResults of
+        linearmodels.
+
+    Raises:
+        ValueError: If dependent, exog or weights has missing values, since all
+            outcomes must be fit on the same observations.
+
+    """
+    if any(
+        _has_missing(values)
+        for values in [dependent, exog, weights]
+        if values is not None
+    ):
+        raise ValueError("The outcomes and regressors must not have missing values.")
+
+    outcomes = list(dependent.columns)
+    options = {"weights": weights, "entity_effects": True, "time_effects": time_effects}
+    model = PanelOLS(dependent[outcomes[:1]], exog, check_rank=True, **options)
+    panel = PanelData(dependent)
+    _y, _x = panel.values2d, model.exog.values2d
+    names = [str(var) for var in model.exog.vars]
+    nobs = _x.shape[0]
+    has_constant = model.has_constant
+    constant = _constant_index(_x) if has_constant else None
+    w = model.weights.values2d
+    root_w = np.sqrt(w)
+    weighted = bool(np.any(w != 1.0))
+
+    entity = model.dependent.entity_ids.squeeze()
+    n_entities = model.dependent.nentity
+    by_entity = Demeaner([entity], weights=w if weighted else None)
+    by_entity_unweighted = Demeaner([entity]) if weighted else by_entity
+    effects = by_entity
+    neffects = n_entities - has_constant
+    if time_effects:
+        effects = Demeaner(
+            [entity, model.dependent.time_ids.squeeze()],
+            weights=w if weighted else None,
+        )
+        neffects += model.dependent.nobs - 1
+
+    # Within transformation, adding back the (weighted) grand means if there is a
+    # constant, as in PanelOLS.
+    y, x = root_w * effects.demean(_y), root_w * effects.demean(_x)
+    # The demeaning converges to a tolerance, so regressors that the effects absorb
+    # are zeroed explicitly, using the norm criterion of check_absorbed.
+    x_norms = np.linalg.norm(root_w * _x, axis=0)
+    x[:, np.linalg.norm(x, axis=0) ** 2 < np.finfo(float).eps * x_norms**2] = 0.0
+    ybar = 0.0
+    if has_constant:
+        ybar = root_w * (w.T @ _y / w.sum())
+        y, x = y + ybar, x + root_w * (w.T @ _x / w.sum())
+
+    retain = list(range(x.shape[1]))
+    if drop_absorbed:
+        retain = _drop_absorbed(x, has_constant, constant, names)
+        x, _x = x[:, retain], _x[:, retain]
+        if constant is not None:
+            constant = retain.index(constant)
+    else:
+        check_absorbed(x, names)
+    n_vars = x.shape[1]
+
+    params = _lstsq(x, y)
+    df_model = n_vars + neffects
+    df_resid = nobs - df_model
+    weps = y - x @ params
+    eps = weps
+    if weighted:
+        eps = (y - x @ params) / root_w
+        if has_constant:
+            eps -= (w * eps).sum(axis=0) / w.sum()
+
+    # The clusters are the entities. If the entity effects are the only effects,
+    # they do not count against the degrees of freedom of the covariance.
+    extra_df = neffects if time_effects else 0
+    scale = nobs / (nobs - extra_df - (n_vars if debiased else 0))
+    cov = ClusterCovariance(x, [entity]).cov(weps, scale)
+    s2 = scale * _sum_of_squares(weps) / nobs
+
+    fitted = _x @ params
+    eps_effects = _y - fitted
+    resid_ss = _sum_of_squares(weps)
+    total_ss = _sum_of_squares(y - ybar)
+    sigma2_tot = _sum_of_squares(eps_effects) / nobs
+    sigma2_eps = _sum_of_squares(eps) / nobs
+    y_ex = root_w * _y
+    total_ss_ex_effects = _sum_of_squares(y_ex - root_w * (root_w.T @ y_ex) / nobs)
+
+    between_w = np.ones((n_entities, 1))
+    if weighted:
+        between_w = by_entity._group_weights[0][:, None]
+        between_w = between_w / between_w.mean()
+    measures = _effect_results(
+        model,
+        params,
+        {
+            "y": _y,
+            "x": _x,
+            "between": (
+                by_entity.group_means(_y),
+                by_entity.group_means(_x),
+                between_w,
+            ),
+            "within": (root_w * by_entity.demean(_y), root_w * by_entity.demean(_x)),
+            "between_unweighted": (
+                by_entity_unweighted.group_means(_y),
+                by_entity_unweighted.group_means(_x),
+            ),
+            "within_unweighted": (
+                by_entity_unweighted.demean(_y),
+                by_entity_unweighted.demean(_x),
+            ),
+        },
+        n_vars,
+    )
+
+    pooled_y, pooled_x, df_num = root_w * _y, root_w * _x, df_model - n_vars
+    if not has_constant:
+        pooled_y = pooled_y - root_w * _lstsq(root_w, pooled_y)
+        pooled_x = pooled_x - root_w * _lstsq(root_w, pooled_x)
+        df_num -= 1
+    resid_ss_pooled = _sum_of_squares(pooled_y - pooled_x @ _lstsq(pooled_x, pooled_y))
+
+    f_stats = _f_statistics(y, weps, root_w, n_vars, has_constant, df_resid)
+    f_robust = _wald_f_statistics(
+        params,
+        cov,
+        constant,
+        debiased,
+        df_resid,
+        "Model F-statistic (robust)",
+        "Model contains only a constant",
+    )
+    entity_info = _structure_stats(entity, "Observations per entity")
+    time_info = _structure_stats(
+        model.dependent.time_ids.squeeze(),
+        "Observations per time period",
+    )
+    index = panel.index
+    if len(retain) < len(names):
+        exog = exog.iloc[:, retain]
+
+    results = {}
+    for j, name in enumerate(outcomes):
+        # The model of every outcome is only kept for the results to refer to.
+        outcome = model
+        if j > 0 or len(retain) < len(names):
+            outcome = PanelOLS(dependent[[name]], exog, check_rank=False, **options)
+        weps_j, eps_j = weps[:, [j]], eps[:, [j]]
+        sigma2 = float(resid_ss[j]) / nobs
+        sigma2_effects = float(sigma2_tot[j] - sigma2_eps[j])
+        res = AttrDict(
+            params=params[:, j],
+            deferred_cov=functools.partial(np.array, cov[j]),
+            f_info=None,
+            f_stat=f_stats[j],
+            f_statistic_robust=f_robust[j],
+            debiased=debiased,
+            name="PanelOLS",
+            var_names=[names[i] for i in retain],
+            **{key: float(values[j]) for key, values in measures.items()},
+            r2=float(measures["r2w"][j]),
+            s2=float(s2[j]),
+            model=outcome,
+            cov_type="Clustered",
+            index=index,
+            entity_info=entity_info,
+            time_info=time_info,
+            other_info=None,
+            f_pooled=WaldTestStatistic(
+                (resid_ss_pooled[j] - resid_ss[j]) / df_num / (resid_ss[j] / df_resid),
+                "Effects are zero",
+                df_num,
+                df_denom=df_resid,
+                name="Pooled F-statistic",
+            ),
+            loglik=(
+                -0.5 * nobs * (np.log(2 * np.pi) + np.log(sigma2) + 1)
+                if sigma2 > 0.0
+                else np.nan
+            ),
+            not_null=np.ones(nobs, dtype=bool),
+            original_index=dependent.index,
+        )
+        res.update(
+            {
+                "df_resid": df_resid,
+                "df_model": df_model,
+                "nobs": nobs,
+                "residual_ss": float(resid_ss[j]),
+                "total_ss": float(total_ss[j]),
+                "wresids": weps_j,
+                "resids": eps_j,
+                "r2": float(_r2(resid_ss[j], total_ss[j])),
+                "entity_effects": True,
+                "time_effects": time_effects,
+                "other_effects": False,
+                "sigma2_eps": float(sigma2_eps[j]),
+                "sigma2_effects": sigma2_effects,
+                "rho": (
+                    sigma2_effects / float(sigma2_tot[j])
+                    if sigma2_tot[j] > 0.0
+                    else 0.0
+                ),
+                "r2_ex_effects": float(_r2(resid_ss[j], total_ss_ex_effects[j])),
+                "effects": pd.DataFrame(
+                    eps_effects[:, [j]] - eps_j,
+                    columns=["estimated_effects"],
+                    index=index,
+                ),
+                "fitted": pd.DataFrame(
+                    fitted[:, [j]],
+                    index=index,
+                    columns=["fitted_values"],
+                ),
+                "idiosyncratic": pd.DataFrame(
+                    eps_j,
+                    index=index,
+                    columns=["idiosyncratic"],
+                ),
+            },
+        )
+        results[name] = EntityEffectsResults(res)
+    return results
+
+
+def _has_missing(values):
+    """Checks whether a DataFrame or Series holds a missing value."""
+    return bool(values.isna().to_numpy().any())
+
+
+# The cov_type names of AbsorbingLS that an Absorber estimates, and the descriptions
+# of their estimators.
+_COVARIANCES = {
+    "unadjusted": "Unadjusted Covariance (Homoskedastic)",
+    "homoskedastic": "Unadjusted Covariance (Homoskedastic)",
+    "robust": "Robust Covariance (Heteroskedastic)",
+    "heteroskedastic": "Robust Covariance (Heteroskedastic)",
+    "clustered": "Clustered Covariance (One-Way)",
+    "one-way": "Clustered Covariance (One-Way)",
+}
+
+
+class AbsorbedResults(AbsorbingLSResults):
+    """The results of AbsorbingLS, for a model that is not fitted itself."""
+
+    def __init__(self, results, model):
+        super().__init__(results, model)
+        self._has_constant = results["has_constant"]
+
+    @property
+    def has_constant(self):
+        """Flag indicating the model includes a constant or equivalent."""
+        return self._has_constant
+
+
+class Absorber:
+    """The absorbed variables of a panel, absorbed from a set of regressors once.
+
+    Building the absorber sweeps the absorbed variables out of the regressors. Every
+    fit then only sweeps them out of its outcomes, all of them at once, and solves for
+    the coefficients, so any number of outcomes and covariance types can be fit
+    against the same absorption. The results are the ones of separate
+    `linearmodels.iv.absorbing.AbsorbingLS` models with `drop_absorbed=True`. As in
+    AbsorbingLS, categorical columns are absorbed as fixed effects, by a Demeaner, and
+    numeric columns as continuous variables, by least squares.
+
+    Args:
+        matrix (DesignMatrix): The design matrix of the panel.
+        regressors (list of str): The regressors. A constant is prepended.
+        absorb (pandas.DataFrame): The variables to absorb, indexed like the panel.
+
+    Raises:
+        ValueError: If the regressors or absorbed variables have missing values.
+
+    """
+
+    def __init__(self, matrix, regressors, absorb):
+        exog = matrix.frame(regressors, constant=True)
+        if _has_missing(exog) or _has_missing(absorb):
+            raise ValueError(
+                "The regressors and absorbed variables must not have missing values.",
+            )
+        self._exog = exog
+        self._absorb = absorb
+
+        categorical = [
+            col for col in absorb if isinstance(absorb[col].dtype, pd.CategoricalDtype)
+        ]
+        continuous = [col for col in absorb if col not in categorical]
+        self._effects = None
+        n_absorbed = len(continuous)
+        if categorical:
+            self._effects = Demeaner(
+                [absorb[col].cat.codes.to_numpy() for col in categorical],
+            )
+            n_absorbed += sum(self._effects.n_groups) - (len(categorical) - 1)
+        self._continuous = None
+        if continuous:
+            self._continuous = self._sweep_effects(
+                absorb[continuous].to_numpy(dtype=float),
+            )
+
+        # As in AbsorbingLS, the constant is the first column without variation, and
+        # the fixed effects absorb it.
+        x = exog.to_numpy(dtype=float)
+        constants = np.flatnonzero(np.ptp(x, axis=0) == 0)
+        constant = int(constants[0]) if len(constants) else None
+        self._constant_absorbed = constant is not None and bool(categorical)
+        self._has_constant = constant is not None or bool(categorical)
+        self._n_exog = x.shape[1]
+
+        absorbed = self._absorb_values(x)
+        retain = not_absorbed(absorbed)
+        if not retain:
+            raise ValueError(
+                "All columns in exog have been fully absorbed by the included effects. "
+                "This model cannot be estimated.",
+            )
+        if len(retain) < x.shape[1]:
+            dropped = [
+                str(exog.columns[i]) for i in range(x.shape[1]) if i not in retain
+            ]
+            warnings.warn(
+                absorbing_warn_msg.format(absorbed_variables=", ".join(dropped)),
+                AbsorbingEffectWarning,
+                stacklevel=2,
+            )
+        self._columns = [exog.columns[i] for i in retain]
+        self._constant = retain.index(constant) if constant in retain else None
+        self._absorbed_exog = absorbed[:, retain]
+        self._df_model = n_absorbed - self._constant_absorbed + len(retain)
+
+    def _sweep_effects(self, values):
+        """Sweeps the fixed effects out of every column."""
+        return values if self._effects is None else self._effects.demean(values)
+
+    def _absorb_values(self, values):
+        """Residualizes every column on the absorbed variables."""
+        residuals = self._sweep_effects(values)
+        if self._continuous is not None:
+            residuals = residuals - self._continuous @ _lstsq(
+                self._continuous,
+                residuals,
+            )
+        if self._constant_absorbed:
+            residuals = residuals + values.mean(axis=0)
+        return residuals
+
+    def _cov(self, eps, cov_type, debiased, clusters):
+        """Returns the covariance of the coefficients of every outcome."""
+        x = self._absorbed_exog
+        nobs, n_vars = x.shape
+        scale = nobs / (nobs - n_vars) if debiased else 1.0
+        if cov_type in ["unadjusted", "homoskedastic"]:
+            s2 = scale * _sum_of_squares(eps) / nobs
+            xpxi = np.linalg.inv(x.T @ x / nobs)
+            return s2[:, None, None] * xpxi / nobs
+        if cov_type in ["robust", "heteroskedastic"]:
+            return ClusterCovariance(x, [np.arange(nobs)]).cov(eps, scale)
+        clusters = np.arange(nobs) if clusters is None else np.asarray(clusters)
+        design = ClusterCovariance(x, list(clusters.reshape(nobs, -1).T))
+        if debiased:
+            scale *= (nobs - 1) / nobs
+        return design.cov(eps, scale, group_debias=debiased)
+
+    def fit(self, dependent, cov_type="robust", debiased=False, clusters=None):
+        """Fits the outcomes against the absorbed regressors.
+
+        Args:
+            dependent (pandas.DataFrame): The outcomes, one per column, indexed like
+                the panel.
+            cov_type (str): The covariance estimator of `AbsorbingLS.fit`, "robust",
+                "unadjusted" or "clustered".
+            debiased (bool): Whether to adjust the covariance for degrees of freedom.
+            clusters (array-like, optional): The cluster labels of one or two
+                dimensions of a clustered covariance. Defaults to one cluster per
+                observation.
+
+        Returns:
+            dict: Maps every outcome to its AbsorbedResults, the AbsorbingLSResults of
+            linearmodels.
+
+        Raises:
+            ValueError: If the outcomes have missing values, or the covariance
+                estimator is not supported.
+
+        """
+        if _has_missing(dependent):
+            raise ValueError("The outcomes must not have missing values.")
+        if cov_type not in _COVARIANCES:
+            raise ValueError(f"The covariance estimator {cov_type!r} is not supported.")
+        values = dependent.to_numpy(dtype=float)
+        absorbed = self._absorb_values(values)
+        x = self._absorbed_exog
+        nobs, n_vars = x.shape
+        params = np.linalg.lstsq(x, absorbed, rcond=None)[0]
+        eps = absorbed - x @ params
+        cov = self._cov(eps, cov_type, debiased, clusters)
+        s2 = (nobs / (nobs - n_vars) if debiased else 1.0) * _sum_of_squares(eps) / nobs
+        f_stats = _wald_f_statistics(
+            params,
+            cov,
+            self._constant,
+            debiased,
+            nobs - self._n_exog,
+            "Model F-statistic",
+            "Model contains no non-constant exogenous terms",
+        )
+
+        residual_ss = _sum_of_squares(eps)
+        total_ss = _sum_of_squares(
+            values - values.mean(axis=0) if self._has_constant else values,
+        )
+        absorbed_total = absorbed
+        if self._constant is not None:
+            column = x[:, [self._constant]]
+            absorbed_total = absorbed - column * (column.T @ absorbed) / (
+                column.T @ column
+            )
+        absorbed_total_ss = _sum_of_squares(absorbed_total)
+
+        cov_config = {"debiased": debiased, "kappa": 0.0}
+        if cov_type in ["clustered", "one-way"]:
+            cov_config["clusters"] = (
+                np.arange(nobs) if clusters is None else np.asarray(clusters).squeeze()
+            )
+        index = dependent.index
+        columns = self._columns
+        results = {}
+        for j, name in enumerate(dependent.columns):
+            fitted = values[:, j] - eps[:, j]
+            res = {
+                "kappa": 0.0,
+                "liml_kappa": 0.0,
+                "params": pd.Series(params[:, j], columns, name="parameter"),
+                "eps": pd.Series(eps[:, j], index=index, name="residual"),
+                "weps": pd.Series(eps[:, j], index=index, name="weighted residual"),
+                "cov": pd.DataFrame(cov[j], columns=columns, index=columns),
+                "s2": float(s2[j]),
+                "debiased": debiased,
+                "residual_ss": float(residual_ss[j]),
+                "total_ss": float(total_ss[j]),
+                "r2": max(1.0 - residual_ss[j] / total_ss[j], 0.0),
+                "fstat": f_stats[j],
+                "vars": columns,
+                "instruments": [],
+                "cov_config": cov_config,
+                "cov_type": cov_type,
+                "method": "Absorbing LS",
+                "cov_estimator": _COVARIANCES[cov_type],
+                "fitted": pd.DataFrame(
+                    fitted,
+                    index=index,
+                    columns=["fitted_values"],
+                ),
+                "original_index": index,
+                "absorbed_effects": pd.DataFrame(
+                    absorbed[:, j] - fitted,
+                    index=index,
+                    columns=["absorbed_effects"],
+                ),
+                "absorbed_r2": max(1.0 - residual_ss[j] / absorbed_total_ss[j], 0.0),
+                "df_model": self._df_model,
+                "has_constant": self._has_constant,
+            }
+            # The model is only kept for the results to refer to.
+            model = AbsorbingLS(
+                dependent[[name]],
+                self._exog,
+                absorb=self._absorb,
+                drop_absorbed=True,
+            )
+            results[name] = AbsorbedResults(res, model)
+        return results
+
+
+def block_absorber(matrix, regressors):
+    """Returns the absorber of the blocks of a data set, building it on the first call.
+
+    The blocks are absorbed as a float column, as the absorbing regressions of the
+    replication have always done. Absorbers are cached on the design matrix, so all
+    fits on the same matrix and regressors share one absorption.
+
+    Args:
+        matrix (DesignMatrix): The design matrix of the data set.
+        regressors (list of str): The regressors. A constant is prepended.
+
+    Returns:
+        Absorber: The absorber.
+
+    """
+    absorbers = _ABSORBERS.setdefault(matrix, {})
+    key = tuple(regressors)
+    if key not in absorbers:
+        absorbers[key] = Absorber(matrix, regressors, matrix.frame(["block"]))
+    return absorbers[key]
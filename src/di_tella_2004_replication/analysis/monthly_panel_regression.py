@@ -1,16 +1,16 @@
-import numpy as np
 import pandas as pd
 import statsmodels.api as smm
 import statsmodels.formula.api as sm
-from linearmodels.panel import PanelOLS
-
 
+from di_tella_2004_replication.analysis.design_matrix import design_matrix
+from di_tella_2004_replication.analysis.fixed_effects import fit_entity_effects
 
 # Regressions
 
+
 def normal_regression(Data, formula, columns):
-    """
-    Performs a normal linear regression analysis using the provided formula and column names.
+    """Performs a normal linear regression analysis using the provided formula and
+    column names.
 
     Parameters:
     Data (pandas DataFrame): The input data for the regression analysis.
@@ -19,6 +19,7 @@ def normal_regression(Data, formula, columns):
 
     Returns:
     An instance of the OLS regression results class from the statsmodels package.
+
     """
     formula = formula + " + " + " + ".join(columns)
     return sm.ols(formula, data=Data).fit()
@@ -48,11 +49,11 @@ def areg_single(Data, variable_log, a, variable_fe, variable_y, variable_x):
         The result object obtained from fitting a fixed effects regression with clustered covariance.
 
     """
-    m = Data[variable_log] == a
+    matrix = design_matrix(Data)
+    m = (Data[variable_log] == a).to_numpy()
     fixed_effects = Data[variable_fe][m]
-    y = Data[variable_y]
-    x = Data[variable_x]
-    X = smm.add_constant(x)
+    y = matrix.series(variable_y)
+    X = matrix.frame(variable_x, constant=True)
     reg = smm.OLS(y[m], X[m]).fit(
         cov_type="cluster",
         cov_kwds={"groups": fixed_effects},
@@ -93,28 +94,23 @@ def areg_double(
         on the value of type_condition: 'equal' or 'unequal'.
 
     """
+    matrix = design_matrix(Data)
     if type_condition == "equal":
-        fixed_effects = Data.loc[
-            (Data[variable_loga] == a) | (Data[variable_logb] == a)
-        ]
-        y = fixed_effects[variable_y]
-        x = fixed_effects[variable_x]
-        X = smm.add_constant(x)
+        m = ((Data[variable_loga] == a) | (Data[variable_logb] == a)).to_numpy()
+        y = matrix.series(variable_y, rows=m)
+        X = matrix.frame(variable_x, constant=True, rows=m)
         reg = smm.OLS(y, X).fit(
             cov_type="cluster",
-            cov_kwds={"groups": fixed_effects[variable_fe]},
+            cov_kwds={"groups": Data[variable_fe][m]},
         )
         return reg
     elif type_condition == "unequal":
-        fixed_effects = Data.loc[
-            (Data[variable_loga] != a) | (Data[variable_logb] != a)
-        ]
-        y = fixed_effects[variable_y]
-        x = fixed_effects[variable_x]
-        X = smm.add_constant(x)
+        m = ((Data[variable_loga] != a) | (Data[variable_logb] != a)).to_numpy()
+        y = matrix.series(variable_y, rows=m)
+        X = matrix.frame(variable_x, constant=True, rows=m)
         reg = smm.OLS(y, X).fit(
             cov_type="cluster",
-            cov_kwds={"groups": fixed_effects[variable_fe]},
+            cov_kwds={"groups": Data[variable_fe][m]},
         )
         return reg
 
@@ -156,17 +152,17 @@ def areg_triple(
         Results of the fixed effects regression with clustered covariance.
 
     """
-    fixed_effects = Data.loc[
+    matrix = design_matrix(Data)
+    m = (
         (Data[variable_loga] == a)
         | (Data[variable_logb] == a)
         | (Data[variable_logc] == a)
-    ]
-    y = fixed_effects[variable_y]
-    x = fixed_effects[variable_x]
-    X = smm.add_constant(x)
+    ).to_numpy()
+    y = matrix.series(variable_y, rows=m)
+    X = matrix.frame(variable_x, constant=True, rows=m)
     reg = smm.OLS(y, X).fit(
         cov_type="cluster",
-        cov_kwds={"groups": fixed_effects[variable_fe]},
+        cov_kwds={"groups": Data[variable_fe][m]},
     )
     return reg
 
@@ -190,8 +186,9 @@ def reg_robust(Data, variable_y, variable_x):
         The results of the robust regression.
 
     """
-    y = Data[variable_y]
-    x = Data[variable_x]
+    matrix = design_matrix(Data)
+    y = matrix.series(variable_y)
+    x = matrix.frame(variable_x)
     robust_model = smm.RLM(y, x, M=smm.robust.norms.HuberT())
     reg = robust_model.fit()
     return reg
@@ -211,9 +208,9 @@ def areg_clus(Data, variable_y, variable_x):
     is clustered by the variable 'observ' in Data.
 
     """
-    y = Data[variable_y]
-    x = Data[variable_x]
-    X = smm.add_constant(x)
+    matrix = design_matrix(Data)
+    y = matrix.series(variable_y)
+    X = matrix.frame(variable_x, constant=True)
     reg = smm.OLS(y, X).fit(cov_type="cluster", cov_kwds={"groups": Data["observ"]})
     return reg
 
@@ -233,19 +230,40 @@ def areg_clus_abs(Data, drop_subset, y_variable, x_variable, dummy_variable):
     - reg: A StatsModels OLS regression object containing the results of the regression.
 
     """
-    df = Data.dropna(subset=drop_subset)
-    y = df[y_variable]
-    x = df[x_variable]
-    dummies = pd.get_dummies(df[dummy_variable])
+    matrix = design_matrix(Data)
+    if isinstance(drop_subset, str):
+        drop_subset = [drop_subset]
+    m = Data[drop_subset].notna().all(axis=1).to_numpy()
+    y = matrix.series(y_variable, rows=m)
+    x = matrix.frame(x_variable, rows=m)
+    groups = Data[dummy_variable][m]
+    dummies = pd.get_dummies(groups)
     X = pd.concat([x, dummies], axis=1)
     reg = smm.OLS(y, X).fit(
         cov_type="cluster",
-        cov_kwds={"groups": df[dummy_variable]},
+        cov_kwds={"groups": groups},
         use_t=True,
     )
     return reg
 
 
+def _two_way_effects(Y, X, weights=None):
+    """Fits Y on X with block and month fixed effects and block-clustered errors.
+
+    Equals `PanelOLS(Y, X, entity_effects=True, time_effects=True, drop_absorbed=True,
+    weights=weights).fit(cov_type="clustered", cluster_entity=True)`, with the effects
+    swept out by `fit_entity_effects`.
+
+    """
+    return fit_entity_effects(
+        Y.to_frame(),
+        X,
+        time_effects=True,
+        weights=weights,
+        drop_absorbed=True,
+    )[Y.name]
+
+
 def poisson_reg(
     Data,
     y_variable,
@@ -280,49 +298,21 @@ def poisson_reg(
       type_of_possion is 'fixed effects weighted irr'.
 
     """
-    data = Data.set_index(index_variables)
-    Y = data[y_variable]
-    X = data[x_variable]
+    matrix = design_matrix(Data)
+    index = pd.MultiIndex.from_frame(Data[index_variables])
+    Y = matrix.series(y_variable)
+    X = matrix.frame(x_variable)
+    Y.index = X.index = index
     if type_of_possion == "fixed effects":
-        model = PanelOLS(
-            Y,
-            X,
-            entity_effects=True,
-            time_effects=True,
-            drop_absorbed=True,
-        )
-        reg = model.fit(cov_type="clustered", cluster_entity=True)
-        params = reg.params
-        return reg #params
+        reg = _two_way_effects(Y, X)
+        return reg  # params
     elif type_of_possion == "fixed effects weighted":
-        w = Data[weight]
-        data["iweight"] = w
-        model = PanelOLS(
-            Y,
-            X,
-            entity_effects=True,
-            time_effects=True,
-            drop_absorbed=True,
-            weights=data["w"],
-        )
-        reg = model.fit(cov_type="clustered", cluster_entity=True)
-        params = reg.params
-        return reg #params
+        weights = matrix.series(weight)
+        weights.index = index
+        reg = _two_way_effects(Y, X, weights)
+        return reg  # params
     elif type_of_possion == "fixed effects weighted irr":
-        w = Data[weight]
-        data["iweight"] = w
-        model = PanelOLS(
-            Y,
-            X,
-            entity_effects=True,
-            time_effects=True,
-            drop_absorbed=True,
-            weights=data["w"],
-        )
-        reg = model.fit(cov_type="clustered", cluster_entity=True)
-        params = reg.params
-        predictions = reg.predict(X[x_irra])
-        irr_predictions = np.exp(predictions)
+        weights = matrix.series(weight)
+        weights.index = index
+        reg = _two_way_effects(Y, X, weights)
         return reg  # params, predictions, irr_predictions
-
-
@@ -18,39 +18,53 @@ from di_tella_2004_replication.analysis.crime_by_block_stats import (
 )
 from di_tella_2004_replication.config import BLD
 
+# The slim fact table of the panel and the table of the block characteristics.
+CRIME_BY_BLOCK = {
+    "panel": BLD / "python" / "data" / "CrimeByBlockPanel.pkl",
+    "blocks": BLD / "python" / "data" / "CrimeByBlockBlocks.pkl",
+}
 
-@pytask.mark.depends_on(BLD / "python" / "data" / "CrimeByBlockPanel.pkl")
+
+@pytask.mark.depends_on(CRIME_BY_BLOCK)
 @pytask.mark.produces(BLD / "python" / "models" / "fe_tot_models.pickle")
 def task_fit_fe_totals_python(depends_on, produces):
-    data = pd.read_pickle(depends_on)
-    model = fe_regression_models_totals(data)
+    model = fe_regression_models_totals(
+        pd.read_pickle(depends_on["panel"]),
+        blocks=pd.read_pickle(depends_on["blocks"]),
+    )
     with open(produces, "wb") as f:
         pickle.dump(model, f)
 
 
-@pytask.mark.depends_on(BLD / "python" / "data" / "CrimeByBlockPanel.pkl")
+@pytask.mark.depends_on(CRIME_BY_BLOCK)
 @pytask.mark.produces(BLD / "python" / "models" / "fe_dif_models.pickle")
 def task_fit_fe_dif_python(depends_on, produces):
-    data = pd.read_pickle(depends_on)
-    model = fe_regression_models_dif(data)
+    model = fe_regression_models_dif(
+        pd.read_pickle(depends_on["panel"]),
+        blocks=pd.read_pickle(depends_on["blocks"]),
+    )
     with open(produces, "wb") as f:
         pickle.dump(model, f)
 
 
-@pytask.mark.depends_on(BLD / "python" / "data" / "CrimeByBlockPanel.pkl")
+@pytask.mark.depends_on(CRIME_BY_BLOCK)
 @pytask.mark.produces(BLD / "python" / "models" / "abs_tot_models.pickle")
 def task_fit_abs_tot_python(depends_on, produces):
-    data = pd.read_pickle(depends_on)
-    model = abs_regression_models_totals(data)
+    model = abs_regression_models_totals(
+        pd.read_pickle(depends_on["panel"]),
+        blocks=pd.read_pickle(depends_on["blocks"]),
+    )
     with open(produces, "wb") as f:
         pickle.dump(model, f)
 
 
-@pytask.mark.depends_on(BLD / "python" / "data" / "CrimeByBlockPanel.pkl")
+@pytask.mark.depends_on(CRIME_BY_BLOCK)
 @pytask.mark.produces(BLD / "python" / "models" / "abs_dif_models.pickle")
 def task_fit_abs_dif_python(depends_on, produces):
-    data = pd.read_pickle(depends_on)
-    model = abs_regression_models_dif(data)
+    model = abs_regression_models_dif(
+        pd.read_pickle(depends_on["panel"]),
+        blocks=pd.read_pickle(depends_on["blocks"]),
+    )
     with open(produces, "wb") as f:
         pickle.dump(model, f)
 
@@ -75,37 +89,42 @@ def task_comparison_table_ind_chat_python(depends_on, produces):
 """WeeklyPanel"""
 
 
+from di_tella_2004_replication.analysis.design_matrix import shared_design_matrices
 from di_tella_2004_replication.analysis.weekly_panel_regression import (
     abs_regression_models_av_weekly,
     abs_regression_models_weekly,
 )
 
 
-@pytask.mark.depends_on(BLD / "python" / "data" / "WeeklyPanel.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "abs_reg_weekly_clustered.pickle")
-def task_abs_reg_weekly_clustered(depends_on, produces):
-    data = pd.read_pickle(depends_on)
-    model = abs_regression_models_weekly(data, "clustered")
-    with open(produces, "wb") as m:
-        pickle.dump(model, m)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "WeeklyPanel.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "abs_reg_weekly_robust.pickle")
-def task_abs_reg_weekly_robust(depends_on, produces):
-    data = pd.read_pickle(depends_on)
-    model = abs_regression_models_weekly(data, "robust")
-    with open(produces, "wb") as m:
-        pickle.dump(model, m)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "WeeklyPanel.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "abs_reg_av_weekly.pickle")
-def task_abs_reg_av_weekly(depends_on, produces):
-    data = pd.read_pickle(depends_on)
-    model = abs_regression_models_av_weekly(data)
-    with open(produces, "wb") as m:
-        pickle.dump(model, m)
+@pytask.mark.depends_on(
+    {
+        "panel": BLD / "python" / "data" / "WeeklyPanel.pkl",
+        "blocks": BLD / "python" / "data" / "WeeklyPanelBlocks.pkl",
+    },
+)
+@pytask.mark.produces(
+    {
+        "clustered": BLD / "python" / "models" / "abs_reg_weekly_clustered.pickle",
+        "robust": BLD / "python" / "models" / "abs_reg_weekly_robust.pickle",
+        "two_way": BLD / "python" / "models" / "abs_reg_weekly_two_way.pickle",
+        "av_weekly": BLD / "python" / "models" / "abs_reg_av_weekly.pickle",
+    },
+)
+def task_abs_reg_weekly(depends_on, produces):
+    # The fits share the design matrix of the data, and with it the absorption of
+    # the blocks.
+    data = pd.read_pickle(depends_on["panel"])
+    blocks = pd.read_pickle(depends_on["blocks"])
+    with shared_design_matrices():
+        models = {
+            "clustered": abs_regression_models_weekly(data, "clustered", blocks),
+            "robust": abs_regression_models_weekly(data, "robust", blocks),
+            "two_way": abs_regression_models_weekly(data, "two_way", blocks),
+            "av_weekly": abs_regression_models_av_weekly(data, blocks),
+        }
+    for name, model in models.items():
+        with open(produces[name], "wb") as m:
+            pickle.dump(model, m)
 
 
 """MonthlyPanel"""
@@ -121,413 +140,69 @@ from di_tella_2004_replication.analysis.monthly_panel_regression import (
     reg_robust,
 )
 from di_tella_2004_replication.config import BLD
+from di_tella_2004_replication.data_management.stage_store import read_stage
+
+
+def _monthly_models(*names):
+    """Returns the paths of the pickled models of the MonthlyPanel data."""
+    return {
+        name: BLD / "python" / "models" / f"MonthlyPanel_{name}.pickle"
+        for name in names
+    }
+
+
+NORMAL_REGRESSIONS = {
+    "normal_regression1": "total_thefts ~ jewish_inst",
+    "normal_regression2": "total_thefts ~ jewish_inst + jewish_inst_one_block_away_1",
+    "normal_regression3": (
+        "total_thefts ~ jewish_inst + jewish_inst_one_block_away_1 + cuad2"
+    ),
+}
+
+
+@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.arrow")
+@pytask.mark.produces(_monthly_models(*NORMAL_REGRESSIONS))
+def task_normal_regressions_monthly(depends_on, produces):
+    # The regressions only use the months after the attack, and the stage is read
+    # once with only the columns they need.
+    months = [f"month{i}" for i in range(5, 13)]
+    columns = [
+        "total_thefts",
+        "jewish_inst",
+        "jewish_inst_one_block_away_1",
+        "cuad2",
+        "post",
+        *months,
+    ]
+    data = read_stage(depends_on, columns=columns)
+    data = data[data["post"] == 1]
+    for name, formula in NORMAL_REGRESSIONS.items():
+        model = normal_regression(Data=data, formula=formula, columns=months)
+        with open(produces[name], "wb") as f:
+            pickle.dump(model, f)
 
 
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(
-    BLD / "python" / "models" / "MonthlyPanel_normal_regression1.pickle",
-)
-def task_normal_regression1_monthly(depends_on, produces):
-    model = normal_regression(
-        Data=pd.read_pickle(depends_on)[pd.read_pickle(depends_on)["post"] == 1],
-        formula="total_thefts ~ jewish_inst",
-        columns=[f"month{i}" for i in range(5, 13)],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(
-    BLD / "python" / "models" / "MonthlyPanel_normal_regression2.pickle",
-)
-def task_normal_regression2_monthly(depends_on, produces):
-    model = normal_regression(
-        Data=pd.read_pickle(depends_on)[pd.read_pickle(depends_on)["post"] == 1],
-        formula="total_thefts ~ jewish_inst + jewish_inst_one_block_away_1",
-        columns=[f"month{i}" for i in range(5, 13)],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
+@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.arrow")
 @pytask.mark.produces(
-    BLD / "python" / "models" / "MonthlyPanel_normal_regression3.pickle",
+    _monthly_models(
+        "areg_single",
+        "areg_double",
+        "areg_triple",
+        "areg_clus1",
+        "areg_clus2",
+        "areg_clus3",
+        "reg_robust1",
+        "areg_clus4",
+        "areg_clus_abs1",
+        "areg_double2",
+        "poisson1",
+        "poisson2",
+        "poisson3",
+        "areg_clus_abs2",
+        "areg_clus5",
+    ),
 )
-def task_normal_regression3_monthly(depends_on, produces):
-    model = normal_regression(
-        Data=pd.read_pickle(depends_on)[pd.read_pickle(depends_on)["post"] == 1],
-        formula="total_thefts ~ jewish_inst + jewish_inst_one_block_away_1 + cuad2",
-        columns=[f"month{i}" for i in range(5, 13)],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_single.pickle")
-def task_areg_single_monthly(depends_on, produces):
-    model = areg_single(
-        Data=pd.read_pickle(depends_on),
-        variable_log="jewish_inst",
-        a=1,
-        variable_fe="observ",
-        variable_y="total_thefts_c",
-        variable_x="jewish_inst_p",
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_double.pickle")
-def task_areg_double_monthly(depends_on, produces):
-    model = areg_double(
-        Data=pd.read_pickle(depends_on),
-        type_condition="equal",
-        variable_loga="jewish_inst",
-        variable_logb="jewish_inst_one_block_away_1",
-        a=1,
-        variable_fe="observ",
-        variable_y="total_thefts_c",
-        variable_x=["jewish_inst_p", "jewish_inst_one_block_away_1_p"],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_triple.pickle")
-def task_areg_triple_monthly(depends_on, produces):
-    model = areg_triple(
-        Data=pd.read_pickle(depends_on),
-        variable_loga="jewish_inst",
-        variable_logb="jewish_inst_one_block_away_1",
-        variable_logc="cuad2",
-        a=1,
-        variable_fe="observ",
-        variable_y="total_thefts_c",
-        variable_x=["jewish_inst_p", "jewish_inst_one_block_away_1_p", "cuad2p"],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_clus1.pickle")
-def task_areg_clus1_monthly(depends_on, produces):
-    model = areg_clus(
-        Data=pd.read_pickle(depends_on),
-        variable_y="total_thefts",
-        variable_x=[
-            "jewish_inst_p",
-            "month5",
-            "month6",
-            "month7",
-            "month8",
-            "month9",
-            "month10",
-            "month11",
-            "month12",
-        ],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_clus2.pickle")
-def task_areg_clus2_monthly(depends_on, produces):
-    model = areg_clus(
-        Data=pd.read_pickle(depends_on),
-        variable_y="total_thefts",
-        variable_x=[
-            "jewish_inst_p",
-            "jewish_inst_one_block_away_1_p",
-            "month5",
-            "month6",
-            "month7",
-            "month8",
-            "month9",
-            "month10",
-            "month11",
-            "month12",
-        ],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_clus3.pickle")
-def task_areg_clus3_monthly(depends_on, produces):
-    model = areg_clus(
-        Data=pd.read_pickle(depends_on),
-        variable_y="total_thefts",
-        variable_x=[
-            "jewish_inst_p",
-            "jewish_inst_one_block_away_1_p",
-            "cuad2p",
-            "month5",
-            "month6",
-            "month7",
-            "month8",
-            "month9",
-            "month10",
-            "month11",
-            "month12",
-        ],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_reg_robust1.pickle")
-def task_reg_robust1_monthly(depends_on, produces):
-    model = reg_robust(
-        Data=pd.read_pickle(depends_on),
-        variable_y="total_thefts",
-        variable_x=[
-            "jewish_inst",
-            "jewish_inst_one_block_away_1",
-            "cuad2",
-            "jewish_inst_p",
-            "jewish_inst_one_block_away_1_p",
-            "cuad2p",
-            "month5",
-            "month6",
-            "month7",
-            "month8",
-            "month9",
-            "month10",
-            "month11",
-            "month12",
-        ],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_clus4.pickle")
-def task_areg_clus4_monthly(depends_on, produces):
-    model = areg_clus(
-        Data=pd.read_pickle(depends_on),
-        variable_y="total_thefts2",
-        variable_x=[
-            "jewish_inst_p",
-            "jewish_inst_one_block_away_1_p",
-            "cuad2p",
-            "month5",
-            "month6",
-            "month7",
-            "month8",
-            "month9",
-            "month10",
-            "month11",
-            "month12",
-        ],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_clus_abs1.pickle")
-def task_areg_clus_abs1_monthly(depends_on, produces):
-    model = areg_clus_abs(
-        Data=pd.read_pickle(depends_on),
-        drop_subset=[
-            "total_thefts",
-            "jewish_inst_p",
-            "jewish_inst_one_block_away_1_p",
-            "cuad2p",
-            "month5",
-            "month6",
-            "month7",
-            "month8",
-            "month9",
-            "month10",
-            "month11",
-            "month12",
-        ],
-        y_variable="total_thefts",
-        x_variable=[
-            "jewish_inst_p",
-            "jewish_inst_one_block_away_1_p",
-            "cuad2p",
-            "month5",
-            "month6",
-            "month7",
-            "month8",
-            "month9",
-            "month10",
-            "month11",
-            "month12",
-        ],
-        dummy_variable="observ",
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_double2.pickle")
-def task_areg_double2_monthly(depends_on, produces):
-    model = areg_double(
-        Data=pd.read_pickle(depends_on),
-        type_condition="unequal",
-        variable_loga="totalpre",
-        variable_logb="totalpos",
-        a=0,
-        variable_fe="observ",
-        variable_y="total_thefts",
-        variable_x=[
-            "jewish_inst_p",
-            "jewish_inst_one_block_away_1_p",
-            "cuad2p",
-            "month5",
-            "month6",
-            "month7",
-            "month8",
-            "month9",
-            "month10",
-            "month11",
-            "month12",
-        ],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_poisson1.pickle")
-def task_poisson1_monthly(depends_on, produces):
-    model = poisson_reg(
-        Data=pd.read_pickle(depends_on),
-        y_variable="total_thefts",
-        x_variable=[
-            "jewish_inst_p",
-            "jewish_inst_one_block_away_1_p",
-            "cuad2p",
-            "month5",
-            "month6",
-            "month7",
-            "month8",
-            "month9",
-            "month10",
-            "month11",
-            "month12",
-        ],
-        index_variables=["observ", "month"],
-        type_of_possion="fixed effects",
-        weight=None,
-        x_irra=None,
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_poisson2.pickle")
-def task_poisson2_monthly(depends_on, produces):
-    model = poisson_reg(
-        Data=pd.read_pickle(depends_on),
-        y_variable="total_thefts",
-        x_variable=[
-            "jewish_inst_p",
-            "jewish_inst_one_block_away_1_p",
-            "cuad2p",
-            "month5",
-            "month6",
-            "month7",
-            "month8",
-            "month9",
-            "month10",
-            "month11",
-            "month12",
-        ],
-        index_variables=["observ", "month"],
-        type_of_possion="fixed effects",
-        weight="w",
-        x_irra=None,
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_poisson3.pickle")
-def task_poisson3_monthly(depends_on, produces):
-    model = poisson_reg(
-        Data=pd.read_pickle(depends_on),
-        y_variable="total_thefts",
-        x_variable=[
-            "jewish_inst_p",
-            "jewish_inst_one_block_away_1_p",
-            "cuad2p",
-            "month5",
-            "month6",
-            "month7",
-            "month8",
-            "month9",
-            "month10",
-            "month11",
-            "month12",
-        ],
-        index_variables=["observ", "month"],
-        type_of_possion="fixed effects",
-        weight="w",
-        x_irra=["jewish_inst_p", "jewish_inst_one_block_away_1_p", "cuad2p"],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_clus_abs2.pickle")
-def task_areg_clus_abs2_monthly(depends_on, produces):
-    model = areg_clus_abs(
-        Data=pd.read_pickle(depends_on),
-        drop_subset=[
-            "total_thefts",
-            "jewish_inst_p",
-            "jewish_inst_one_block_away_1_p",
-            "cuad2p",
-            "month5",
-            "month6",
-            "month7",
-            "month8",
-            "month9",
-            "month10",
-            "month11",
-            "month12",
-        ],
-        y_variable="total_thefts",
-        x_variable=[
-            "jewish_inst_p",
-            "jewish_inst_one_block_away_1_p",
-            "cuad2p",
-            "month5",
-            "month6",
-            "month7",
-            "month8",
-            "month9",
-            "month10",
-            "month11",
-            "month12",
-        ],
-        dummy_variable="code2",
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_clus5.pickle")
-def task_areg_clus5_monthly(depends_on, produces):
+def task_fit_monthly_panel2(depends_on, produces):
     list_names_place = [
         f"mbelg{i}"
         for i in [
@@ -560,146 +235,397 @@ def task_areg_clus5_monthly(depends_on, produces):
         "cuad2p",
         *list_names_place,
     ]
-    model = areg_clus(
-        Data=pd.read_pickle(depends_on),
-        variable_y="total_thefts",
-        variable_x=variablex,
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel3.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_clus6.pickle")
-def task_areg_clus6_monthly(depends_on, produces):
-    model = areg_clus(
-        Data=pd.read_pickle(depends_on),
-        variable_y="total_thefts",
-        variable_x=[
-            "public_building_or_embassy_p",
-            "public_building_or_embassy_1_p",
-            "public_building_or_embassy_cuad2p",
-            "n_public_building_or_embassy_p",
-            "n_public_building_or_embassy_1_p",
-            "n_public_building_or_embassy_cuad2p",
-        ],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel3.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_clus7.pickle")
-def task_areg_clus7_monthly(depends_on, produces):
-    model = areg_clus(
-        Data=pd.read_pickle(depends_on),
-        variable_y="total_thefts",
-        variable_x=[
-            "gas_station_p",
-            "gas_station_1_p",
-            "gas_station_cuad2p",
-            "n_gas_station_p",
-            "n_gas_station_1_p",
-            "n_gas_station_cuad2p",
-        ],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel3.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_clus8.pickle")
-def task_areg_clus8_monthly(depends_on, produces):
-    model = areg_clus(
-        Data=pd.read_pickle(depends_on),
-        variable_y="total_thefts",
-        variable_x=[
-            "bank_p",
-            "bank_1_p",
-            "bank_cuad2p",
-            "n_bank_p",
-            "n_bank_1_p",
-            "n_bank_cuad2p",
-        ],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel3.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_clus9.pickle")
-def task_areg_clus9_monthly(depends_on, produces):
-    model = areg_clus(
-        Data=pd.read_pickle(depends_on),
-        variable_y="total_thefts",
-        variable_x=[
-            "all_locations_p",
-            "all_locations_1_p",
-            "all_locations_cuad2p",
-            "n_all_locations_p",
-            "n_all_locations_1_p",
-            "n_all_locations_cuad2p",
-        ],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel_new.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_clus10.pickle")
-def task_areg_clus10_monthly(depends_on, produces):
-    model = areg_clus(
-        Data=pd.read_pickle(depends_on),
-        variable_y="total_thefts",
-        variable_x=[
-            "one_jewish_inst_1_p",
-            "one_jewish_inst_one_block_away_1_p",
-            "one_cuad2p",
-            "month5",
-            "month6",
-            "month7",
-        ],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel_new.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_clus11.pickle")
-def task_areg_clus11_monthly(depends_on, produces):
-    model = areg_clus(
-        Data=pd.read_pickle(depends_on),
-        variable_y="total_thefts",
-        variable_x=[
-            "two_jewish_inst_1_p",
-            "two_jewish_inst_one_block_away_1_p",
-            "two_cuad2p",
-            "month5",
-            "month6",
-            "month7",
-        ],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
-
-
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel_new.pkl")
-@pytask.mark.produces(BLD / "python" / "models" / "MonthlyPanel_areg_clus12.pickle")
-def task_areg_clus12_monthly(depends_on, produces):
-    model = areg_clus(
-        Data=pd.read_pickle(depends_on),
-        variable_y="total_thefts",
-        variable_x=[
-            "three_jewish_inst_1_p",
-            "three_jewish_inst_one_block_away_1_p",
-            "three_cuad2p",
-            "month5",
-            "month6",
-            "month7",
-        ],
-    )
-    with open(produces, "wb") as f:
-        pickle.dump(model, f)
+    # The fits share the design matrix of the data.
+    data = read_stage(depends_on)
+    with shared_design_matrices():
+        models = {
+            "areg_single": areg_single(
+                Data=data,
+                variable_log="jewish_inst",
+                a=1,
+                variable_fe="observ",
+                variable_y="total_thefts_c",
+                variable_x="jewish_inst_p",
+            ),
+            "areg_double": areg_double(
+                Data=data,
+                type_condition="equal",
+                variable_loga="jewish_inst",
+                variable_logb="jewish_inst_one_block_away_1",
+                a=1,
+                variable_fe="observ",
+                variable_y="total_thefts_c",
+                variable_x=["jewish_inst_p", "jewish_inst_one_block_away_1_p"],
+            ),
+            "areg_triple": areg_triple(
+                Data=data,
+                variable_loga="jewish_inst",
+                variable_logb="jewish_inst_one_block_away_1",
+                variable_logc="cuad2",
+                a=1,
+                variable_fe="observ",
+                variable_y="total_thefts_c",
+                variable_x=[
+                    "jewish_inst_p",
+                    "jewish_inst_one_block_away_1_p",
+                    "cuad2p",
+                ],
+            ),
+            "areg_clus1": areg_clus(
+                Data=data,
+                variable_y="total_thefts",
+                variable_x=[
+                    "jewish_inst_p",
+                    "month5",
+                    "month6",
+                    "month7",
+                    "month8",
+                    "month9",
+                    "month10",
+                    "month11",
+                    "month12",
+                ],
+            ),
+            "areg_clus2": areg_clus(
+                Data=data,
+                variable_y="total_thefts",
+                variable_x=[
+                    "jewish_inst_p",
+                    "jewish_inst_one_block_away_1_p",
+                    "month5",
+                    "month6",
+                    "month7",
+                    "month8",
+                    "month9",
+                    "month10",
+                    "month11",
+                    "month12",
+                ],
+            ),
+            "areg_clus3": areg_clus(
+                Data=data,
+                variable_y="total_thefts",
+                variable_x=[
+                    "jewish_inst_p",
+                    "jewish_inst_one_block_away_1_p",
+                    "cuad2p",
+                    "month5",
+                    "month6",
+                    "month7",
+                    "month8",
+                    "month9",
+                    "month10",
+                    "month11",
+                    "month12",
+                ],
+            ),
+            "reg_robust1": reg_robust(
+                Data=data,
+                variable_y="total_thefts",
+                variable_x=[
+                    "jewish_inst",
+                    "jewish_inst_one_block_away_1",
+                    "cuad2",
+                    "jewish_inst_p",
+                    "jewish_inst_one_block_away_1_p",
+                    "cuad2p",
+                    "month5",
+                    "month6",
+                    "month7",
+                    "month8",
+                    "month9",
+                    "month10",
+                    "month11",
+                    "month12",
+                ],
+            ),
+            "areg_clus4": areg_clus(
+                Data=data,
+                variable_y="total_thefts2",
+                variable_x=[
+                    "jewish_inst_p",
+                    "jewish_inst_one_block_away_1_p",
+                    "cuad2p",
+                    "month5",
+                    "month6",
+                    "month7",
+                    "month8",
+                    "month9",
+                    "month10",
+                    "month11",
+                    "month12",
+                ],
+            ),
+            "areg_clus_abs1": areg_clus_abs(
+                Data=data,
+                drop_subset=[
+                    "total_thefts",
+                    "jewish_inst_p",
+                    "jewish_inst_one_block_away_1_p",
+                    "cuad2p",
+                    "month5",
+                    "month6",
+                    "month7",
+                    "month8",
+                    "month9",
+                    "month10",
+                    "month11",
+                    "month12",
+                ],
+                y_variable="total_thefts",
+                x_variable=[
+                    "jewish_inst_p",
+                    "jewish_inst_one_block_away_1_p",
+                    "cuad2p",
+                    "month5",
+                    "month6",
+                    "month7",
+                    "month8",
+                    "month9",
+                    "month10",
+                    "month11",
+                    "month12",
+                ],
+                dummy_variable="observ",
+            ),
+            "areg_double2": areg_double(
+                Data=data,
+                type_condition="unequal",
+                variable_loga="totalpre",
+                variable_logb="totalpos",
+                a=0,
+                variable_fe="observ",
+                variable_y="total_thefts",
+                variable_x=[
+                    "jewish_inst_p",
+                    "jewish_inst_one_block_away_1_p",
+                    "cuad2p",
+                    "month5",
+                    "month6",
+                    "month7",
+                    "month8",
+                    "month9",
+                    "month10",
+                    "month11",
+                    "month12",
+                ],
+            ),
+            "poisson1": poisson_reg(
+                Data=data,
+                y_variable="total_thefts",
+                x_variable=[
+                    "jewish_inst_p",
+                    "jewish_inst_one_block_away_1_p",
+                    "cuad2p",
+                    "month5",
+                    "month6",
+                    "month7",
+                    "month8",
+                    "month9",
+                    "month10",
+                    "month11",
+                    "month12",
+                ],
+                index_variables=["observ", "month"],
+                type_of_possion="fixed effects",
+                weight=None,
+                x_irra=None,
+            ),
+            "poisson2": poisson_reg(
+                Data=data,
+                y_variable="total_thefts",
+                x_variable=[
+                    "jewish_inst_p",
+                    "jewish_inst_one_block_away_1_p",
+                    "cuad2p",
+                    "month5",
+                    "month6",
+                    "month7",
+                    "month8",
+                    "month9",
+                    "month10",
+                    "month11",
+                    "month12",
+                ],
+                index_variables=["observ", "month"],
+                type_of_possion="fixed effects",
+                weight="w",
+                x_irra=None,
+            ),
+            "poisson3": poisson_reg(
+                Data=data,
+                y_variable="total_thefts",
+                x_variable=[
+                    "jewish_inst_p",
+                    "jewish_inst_one_block_away_1_p",
+                    "cuad2p",
+                    "month5",
+                    "month6",
+                    "month7",
+                    "month8",
+                    "month9",
+                    "month10",
+                    "month11",
+                    "month12",
+                ],
+                index_variables=["observ", "month"],
+                type_of_possion="fixed effects",
+                weight="w",
+                x_irra=["jewish_inst_p", "jewish_inst_one_block_away_1_p", "cuad2p"],
+            ),
+            "areg_clus_abs2": areg_clus_abs(
+                Data=data,
+                drop_subset=[
+                    "total_thefts",
+                    "jewish_inst_p",
+                    "jewish_inst_one_block_away_1_p",
+                    "cuad2p",
+                    "month5",
+                    "month6",
+                    "month7",
+                    "month8",
+                    "month9",
+                    "month10",
+                    "month11",
+                    "month12",
+                ],
+                y_variable="total_thefts",
+                x_variable=[
+                    "jewish_inst_p",
+                    "jewish_inst_one_block_away_1_p",
+                    "cuad2p",
+                    "month5",
+                    "month6",
+                    "month7",
+                    "month8",
+                    "month9",
+                    "month10",
+                    "month11",
+                    "month12",
+                ],
+                dummy_variable="code2",
+            ),
+            "areg_clus5": areg_clus(
+                Data=data,
+                variable_y="total_thefts",
+                variable_x=variablex,
+            ),
+        }
+    for name, model in models.items():
+        with open(produces[name], "wb") as f:
+            pickle.dump(model, f)
+
+
+@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel3.arrow")
+@pytask.mark.produces(
+    _monthly_models("areg_clus6", "areg_clus7", "areg_clus8", "areg_clus9"),
+)
+def task_fit_monthly_panel3(depends_on, produces):
+    # The fits share the design matrix of the data.
+    data = read_stage(depends_on)
+    with shared_design_matrices():
+        models = {
+            "areg_clus6": areg_clus(
+                Data=data,
+                variable_y="total_thefts",
+                variable_x=[
+                    "public_building_or_embassy_p",
+                    "public_building_or_embassy_1_p",
+                    "public_building_or_embassy_cuad2p",
+                    "n_public_building_or_embassy_p",
+                    "n_public_building_or_embassy_1_p",
+                    "n_public_building_or_embassy_cuad2p",
+                ],
+            ),
+            "areg_clus7": areg_clus(
+                Data=data,
+                variable_y="total_thefts",
+                variable_x=[
+                    "gas_station_p",
+                    "gas_station_1_p",
+                    "gas_station_cuad2p",
+                    "n_gas_station_p",
+                    "n_gas_station_1_p",
+                    "n_gas_station_cuad2p",
+                ],
+            ),
+            "areg_clus8": areg_clus(
+                Data=data,
+                variable_y="total_thefts",
+                variable_x=[
+                    "bank_p",
+                    "bank_1_p",
+                    "bank_cuad2p",
+                    "n_bank_p",
+                    "n_bank_1_p",
+                    "n_bank_cuad2p",
+                ],
+            ),
+            "areg_clus9": areg_clus(
+                Data=data,
+                variable_y="total_thefts",
+                variable_x=[
+                    "all_locations_p",
+                    "all_locations_1_p",
+                    "all_locations_cuad2p",
+                    "n_all_locations_p",
+                    "n_all_locations_1_p",
+                    "n_all_locations_cuad2p",
+                ],
+            ),
+        }
+    for name, model in models.items():
+        with open(produces[name], "wb") as f:
+            pickle.dump(model, f)
+
+
+@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel_new.arrow")
+@pytask.mark.produces(_monthly_models("areg_clus10", "areg_clus11", "areg_clus12"))
+def task_fit_monthly_panel_new(depends_on, produces):
+    # The fits share the design matrix of the data.
+    data = read_stage(depends_on)
+    with shared_design_matrices():
+        models = {
+            "areg_clus10": areg_clus(
+                Data=data,
+                variable_y="total_thefts",
+                variable_x=[
+                    "one_jewish_inst_1_p",
+                    "one_jewish_inst_one_block_away_1_p",
+                    "one_cuad2p",
+                    "month5",
+                    "month6",
+                    "month7",
+                ],
+            ),
+            "areg_clus11": areg_clus(
+                Data=data,
+                variable_y="total_thefts",
+                variable_x=[
+                    "two_jewish_inst_1_p",
+                    "two_jewish_inst_one_block_away_1_p",
+                    "two_cuad2p",
+                    "month5",
+                    "month6",
+                    "month7",
+                ],
+            ),
+            "areg_clus12": areg_clus(
+                Data=data,
+                variable_y="total_thefts",
+                variable_x=[
+                    "three_jewish_inst_1_p",
+                    "three_jewish_inst_one_block_away_1_p",
+                    "three_cuad2p",
+                    "month5",
+                    "month6",
+                    "month7",
+                ],
+            ),
+        }
+    for name, model in models.items():
+        with open(produces[name], "wb") as f:
+            pickle.dump(model, f)
 
 
 from di_tella_2004_replication.analysis.monthly_panel_stats import (
@@ -708,26 +634,26 @@ from di_tella_2004_replication.analysis.monthly_panel_stats import (
 )
 
 
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel.pkl")
+@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel.arrow")
 @pytask.mark.produces(BLD / "python" / "stats" / "MonthlyPanel_WT1.pickle")
 def task_WT_monthly1(depends_on, produces):
-    model = WelchTest(Data=pd.read_pickle(depends_on), code1=1, code2=4)
+    model = WelchTest(Data=read_stage(depends_on), code1=1, code2=4)
     with open(produces, "wb") as f:
         pickle.dump(model, f)
 
 
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel.pkl")
+@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel.arrow")
 @pytask.mark.produces(BLD / "python" / "stats" / "MonthlyPanel_WT2.pickle")
 def task_WT_monthly2(depends_on, produces):
-    model = WelchTest(Data=pd.read_pickle(depends_on), code1=2, code2=4)
+    model = WelchTest(Data=read_stage(depends_on), code1=2, code2=4)
     with open(produces, "wb") as f:
         pickle.dump(model, f)
 
 
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel.pkl")
+@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel.arrow")
 @pytask.mark.produces(BLD / "python" / "stats" / "MonthlyPanel_WT3.pickle")
 def task_WT_monthly3(depends_on, produces):
-    model = WelchTest(Data=pd.read_pickle(depends_on), code1=3, code2=4)
+    model = WelchTest(Data=read_stage(depends_on), code1=3, code2=4)
     with open(produces, "wb") as f:
         pickle.dump(model, f)
 
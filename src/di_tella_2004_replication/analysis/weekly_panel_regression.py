@@ -1,8 +1,13 @@
-import statsmodels.api as sm
-from linearmodels.iv import absorbing
+from di_tella_2004_replication.analysis.design_matrix import design_matrix
+from di_tella_2004_replication.analysis.fixed_effects import block_absorber
+from di_tella_2004_replication.data_management.panel_tables import join_dimension
 
+REGRESSORS = ["treatment", "treatment_1d", "treatment_2d"] + [
+    f"week_dummy_{i}" for i in range(2, 39) if i not in [16, 17]
+]
 
-def abs_regression_models_weekly(df, type_of_regression):
+
+def abs_regression_models_weekly(df, type_of_regression, blocks=None):
     """Perform panel regression analysis for total thefts on the input dataframe using
     absorbing regression models, considering weekly dummy variables and different types
     of regression.
@@ -11,33 +16,38 @@ def abs_regression_models_weekly(df, type_of_regression):
      df (pandas.DataFrame): Input dataframe containing the necessary variables,
                             including 'tot_theft', 'treatment', 'treatment_1d',
                             'treatment_2d', 'block', and weekly dummy variables.
-     type_of_regression (str): Type of regression to perform, either "robust" or "clustered".
+     type_of_regression (str): Type of regression to perform, either "robust",
+                            "clustered" or "two_way", which clusters by block and
+                            week.
+     blocks (pandas.DataFrame, optional): Block dimension table to join the variables
+                            from that are missing in df.
 
     Returns:
     Fitted absorbing regression model results.
 
     """
-    abs_model = absorbing.AbsorbingLS(
-        df["total_thefts"],
-        sm.add_constant(
-            df[
-                ["treatment", "treatment_1d", "treatment_2d"]
-                + [f"week_dummy_{i}" for i in range(2, 39) if i not in [16, 17]]
-            ],
-        ),
-        absorb=df["block"].to_frame().astype(float),
-        drop_absorbed=True,
-    )
+    if blocks is not None:
+        df = join_dimension(df, blocks, ["total_thefts", *REGRESSORS])
+
+    matrix = design_matrix(df)
+    absorber = block_absorber(matrix, REGRESSORS)
+    dependent = matrix.frame(["total_thefts"])
 
     if type_of_regression == "robust":
-        abs_results = abs_model.fit(cov_type="robust", debiased=True)
+        abs_results = absorber.fit(dependent, cov_type="robust", debiased=True)
     elif type_of_regression == "clustered":
-        abs_results = abs_model.fit(cov_type="clustered")
+        abs_results = absorber.fit(dependent, cov_type="clustered")
+    elif type_of_regression == "two_way":
+        abs_results = absorber.fit(
+            dependent,
+            cov_type="clustered",
+            clusters=matrix.frame(["block", "week"]),
+        )
 
-    return abs_results
+    return abs_results["total_thefts"]
 
 
-def abs_regression_models_av_weekly(df):
+def abs_regression_models_av_weekly(df, blocks=None):
     """Perform panel regression analysis for average weekly thefts on the input
     dataframe using absorbing regression models, considering weekly dummy variables and
     clustering by entity.
@@ -46,6 +56,8 @@ def abs_regression_models_av_weekly(df):
     df (pandas.DataFrame): Input dataframe containing the necessary variables,
                            including 'av_weekly_thefts', 'treatment', 'treatment_1d',
                            'treatment_2d', 'block', and weekly dummy variables.
+    blocks (pandas.DataFrame, optional): Block dimension table to join the variables
+                           from that are missing in df.
 
     Returns:
     Fitted absorbing regression model results with clustered standard errors.
@@ -54,16 +66,12 @@ def abs_regression_models_av_weekly(df):
     Given a dataframe 'data' with the necessary variables, perform a panel regression analysis:
 
     """
-    abs_model = absorbing.AbsorbingLS(
-        df["av_weekly_thefts"],
-        sm.add_constant(
-            df[
-                ["treatment", "treatment_1d", "treatment_2d"]
-                + [f"week_dummy_{i}" for i in range(2, 39) if i not in [16, 17]]
-            ],
-        ),
-        absorb=df["block"].to_frame().astype(float),
-        drop_absorbed=True,
-    )
+    if blocks is not None:
+        df = join_dimension(df, blocks, ["av_weekly_thefts", *REGRESSORS])
 
-    return abs_model.fit(cov_type="clustered")
+    matrix = design_matrix(df)
+    abs_results = block_absorber(matrix, REGRESSORS).fit(
+        matrix.frame(["av_weekly_thefts"]),
+        cov_type="clustered",
+    )
+    return abs_results["av_weekly_thefts"]
@@ -9,4 +9,41 @@ PAPER_DIR = SRC.joinpath("..", "..", "paper").resolve()
 
 GROUPS = ["marital_status", "qualification"]
 
-__all__ = ["BLD", "SRC", "TEST_DIR", "GROUPS"]
+# Chunked reading of large raw data sets. With RAW_CHUNKSIZE, the Stata files are
+# decoded in chunks of that many rows by RAW_PROCESSES processes. With
+# BLOCKS_PER_PARTITION, the block-level panels are cleaned in partitions of that many
+# blocks. None reads and cleans every data set at once.
+RAW_CHUNKSIZE = None
+RAW_PROCESSES = 1
+BLOCKS_PER_PARTITION = None
+
+# Store the float columns of the cleaned data sets as float32. This halves their size
+# but changes the estimates in the last digits.
+FLOAT32 = False
+
+# Store the 0/1 indicators of the cleaned panels (time and distance dummies and their
+# interactions) as sparse columns. The design matrices keep them sparse and only
+# densify the columns a fit selects.
+SPARSE_DUMMIES = False
+
+# Run the stages of the monthly panel in one task that hands the data sets over in
+# memory instead of reading back the pickle of the previous stage.
+FUSE_MONTHLY_STAGES = True
+
+# Clean the data sets under the copy-on-write mode of pandas, so that selecting
+# columns or rows does not copy the data until it is modified.
+COPY_ON_WRITE = True
+
+__all__ = [
+    "BLD",
+    "SRC",
+    "TEST_DIR",
+    "GROUPS",
+    "RAW_CHUNKSIZE",
+    "RAW_PROCESSES",
+    "BLOCKS_PER_PARTITION",
+    "FLOAT32",
+    "SPARSE_DUMMIES",
+    "FUSE_MONTHLY_STAGES",
+    "COPY_ON_WRITE",
+]
@@ -1,7 +1,59 @@
 """Function(s) for cleaning the data set(s)."""
+import pandas as pd
+
 from di_tella_2004_replication.data_management.clean_crime_by_block import (
     _create_new_variables,
 )
+from di_tella_2004_replication.data_management.dtype_plan import apply_dtype_plan
+from di_tella_2004_replication.data_management.ingest import uses_raw_columns
+from di_tella_2004_replication.data_management.renaming import rename_columns
+
+WEEKLY_RAW_COLUMNS = [
+    "observ",
+    "barrio",
+    "calle",
+    "altura",
+    "institu1",
+    "institu3",
+    "distanci",
+    "edpub",
+    "estserv",
+    "banco",
+    "totrob",
+    "week",
+]
+
+NEIGHBORHOOD_NUMBERS = {"Belgrano": 1, "Once": 2, "V. Crespo": 3}
+
+# The columns of the block x week panel that are constant within a block.
+WEEKLY_DIMENSION_COLUMNS = [
+    "neighborhood",
+    "street",
+    "street_nr",
+    "jewish_inst",
+    "jewish_inst_one_block_away",
+    "distance_to_jewish_inst",
+    "public_building_or_embassy",
+    "gas_station",
+    "bank",
+    "jewish_inst_only_one_block_away",
+    "n_neighborhood",
+]
+
+
+WEEKLY_NAME_SUBSTITUTIONS = (
+    ("observ", "block"),
+    ("barrio", "neighborhood"),
+    ("calle", "street"),
+    ("altura", "street_nr"),
+    ("institu1", "jewish_inst"),
+    ("institu3", "jewish_inst_one_block_away"),
+    ("distanci", "distance_to_jewish_inst"),
+    ("edpub", "public_building_or_embassy"),
+    ("estserv", "gas_station"),
+    ("banco", "bank"),
+    ("totrob", "total_thefts"),
+)
 
 
 def _clean_column_names_weekly(df):
@@ -18,25 +70,16 @@ def _clean_column_names_weekly(df):
     df (pandas.DataFrame): The pandas DataFrame containing the data to be standardized.
 
     Returns:
-    pandas.DataFrame: The input DataFrame with the columns standardized to the specified format.
+    pandas.DataFrame: The data of the input DataFrame with the columns standardized to
+    the specified format. The input DataFrame is not modified.
 
     """
-    df.columns = (
-        df.columns.str.replace("observ", "block")
-        .str.replace("barrio", "neighborhood")
-        .str.replace("calle", "street")
-        .str.replace("altura", "street_nr")
-        .str.replace("institu1", "jewish_inst")
-        .str.replace("institu3", "jewish_inst_one_block_away")
-        .str.replace("distanci", "distance_to_jewish_inst")
-        .str.replace("edpub", "public_building_or_embassy")
-        .str.replace("estserv", "gas_station")
-        .str.replace("banco", "bank")
-        .str.replace("totrob", "total_thefts")
+    return df.set_axis(
+        rename_columns(df.columns, WEEKLY_NAME_SUBSTITUTIONS),
+        axis=1,
+        copy=False,
     )
 
-    return df
-
 
 def _neighborhood_numbering(df):
     """Assigns a unique integer to each neighborhood in the DataFrame `df`, based on its
@@ -47,23 +90,23 @@ def _neighborhood_numbering(df):
 
     Returns:
         pandas.DataFrame: A copy of the input DataFrame, with an additional column named
-        'n_neighborhood' that contains the integer code for each neighborhood.
+        'n_neighborhood' that contains the integer code for each neighborhood, or 0 for
+        neighborhoods that are not in NEIGHBORHOOD_NUMBERS.
 
     """
-    df["n_neighborhood"] = 0
-    df.loc[df["neighborhood"] == "Belgrano", "n_neighborhood"] = 1
-    df.loc[df["neighborhood"] == "Once", "n_neighborhood"] = 2
-    df.loc[df["neighborhood"] == "V. Crespo", "n_neighborhood"] = 3
+    numbers = df["neighborhood"].map(NEIGHBORHOOD_NUMBERS)
+    return df.assign(n_neighborhood=numbers.fillna(0).astype("int64"))
 
-    return df
 
-
-def process_weekly_panel(df):
+@uses_raw_columns(WEEKLY_RAW_COLUMNS)
+def process_weekly_panel(df, float32=False, sparse=False):
     """The process_weekly_panel function takes a pandas DataFrame as input, cleans and
     processes the data, and returns the processed DataFrame.
 
     Args:
     df (pandas.DataFrame): The input DataFrame containing the raw data.
+    float32 (bool): Whether to store the float columns as float32.
+    sparse (bool): Whether to store the 0/1 indicators as sparse columns.
 
     Returns:
     pandas.DataFrame: A processed DataFrame containing the following new columns:
@@ -73,13 +116,19 @@ def process_weekly_panel(df):
     - Neighborhood numbering.
     - A column that combines the week and block variables.
     - A column that calculates the average weekly thefts based on the total thefts.
+    All columns have the compact dtypes of `apply_dtype_plan`.
 
     """
     df = _clean_column_names_weekly(df)
     df = df.convert_dtypes()
     df = _create_new_variables(df, time_variable="week", event_time=18)
     df = _neighborhood_numbering(df)
-    df["neighborhood_week"] = 1 * df["week"] + 1000 * df["block"]
-    df["av_weekly_thefts"] = df["total_thefts"] * ((365 / 12) / 7)
+    new_variables = pd.DataFrame(
+        {
+            "neighborhood_week": 1 * df["week"] + 1000 * df["block"],
+            "av_weekly_thefts": df["total_thefts"] * ((365 / 12) / 7),
+        },
+    )
+    df = pd.concat([df, new_variables], axis=1)
 
-    return df
+    return apply_dtype_plan(df, float32=float32, sparse=sparse)
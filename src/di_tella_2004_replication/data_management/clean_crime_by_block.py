@@ -2,6 +2,77 @@
 import numpy as np
 import pandas as pd
 
+from di_tella_2004_replication.data_management.dtype_plan import apply_dtype_plan
+from di_tella_2004_replication.data_management.indicators import indicator_frame
+from di_tella_2004_replication.data_management.ingest import uses_raw_columns
+from di_tella_2004_replication.data_management.panel_tables import join_dimension
+from di_tella_2004_replication.data_management.renaming import rename_columns
+from di_tella_2004_replication.data_management.theft_cube import (
+    THEFT_RULES,
+    category_counts,
+    theft_cube,
+)
+
+BLOCK_RAW_COLUMNS = [
+    "observ",
+    "barrio",
+    "calle",
+    "altura",
+    "institu1",
+    "institu3",
+    "distanci",
+    "edpub",
+    "estserv",
+    "banco",
+    "distrito",
+    "frcensal",
+    "edad",
+    "mujer",
+    "propiet",
+    "tamhogar",
+    "nohacinado",
+    "nonbi",
+    "educjefe",
+    "ocupado",
+]
+THEFT_RAW_COLUMNS = [
+    f"rob{i}{field}"
+    for i in range(1, 24)
+    for field in ["", "dia", "mes", "hor", "val", "esq"]
+]
+
+THEFT_DIFFERENCES = [("hv", "lv"), ("night", "day"), ("weekday", "weekend")]
+
+BLOCK_NAME_SUBSTITUTIONS = (
+    ("rob", "theft"),
+    ("day", "week_day"),
+    ("dia", "day"),
+    ("mes", "month"),
+    ("hor", "hour"),
+    ("mak", "brand"),
+    ("esq", "corner"),
+    ("observ", "block"),
+    ("barrio", "neighborhood"),
+    ("calle", "street"),
+    ("altura", "street_nr"),
+    ("institu1", "jewish_inst"),
+    ("institu3", "jewish_inst_one_block_away"),
+    ("distanci", "distance_to_jewish_inst"),
+    ("edpub", "public_building_or_embassy"),
+    ("estserv", "gas_station"),
+    ("banco", "bank"),
+    ("distrito", "census_district"),
+    ("frcensal", "census_tract"),
+    ("edad", "av_age"),
+    ("mujer", "female_rate"),
+    ("propiet", "ownership_rate"),
+    ("tamhogar", "av_hh_size"),
+    ("nohacinado", "non_overcrowd_rate"),
+    ("nonbi", "non_unmet_basic_needs_rate"),
+    ("educjefe", "av_hh_head_schooling"),
+    ("ocupado", "employment_rate"),
+)
+
 
 def _clean_column_names_block(df):
     """This function takes a pandas DataFrame and standardizes the column names to a
@@ -17,41 +88,15 @@ def _clean_column_names_block(df):
     df (pandas.DataFrame): The pandas DataFrame containing the data to be standardized.
 
     Returns:
-    pandas.DataFrame: The input DataFrame with the columns standardized to the specified format.
+    pandas.DataFrame: The data of the input DataFrame with the columns standardized to
+    the specified format. The input DataFrame is not modified.
 
     """
-    df.columns = (
-        df.columns.str.replace("rob", "theft")
-        .str.replace("day", "week_day")
-        .str.replace("dia", "day")
-        .str.replace("mes", "month")
-        .str.replace("hor", "hour")
-        .str.replace("mak", "brand")
-        .str.replace("mak", "brand")
-        .str.replace("mak", "brand")
-        .str.replace("esq", "corner")
-        .str.replace("observ", "block")
-        .str.replace("barrio", "neighborhood")
-        .str.replace("calle", "street")
-        .str.replace("altura", "street_nr")
-        .str.replace("institu1", "jewish_inst")
-        .str.replace("institu3", "jewish_inst_one_block_away")
-        .str.replace("distanci", "distance_to_jewish_inst")
-        .str.replace("edpub", "public_building_or_embassy")
-        .str.replace("estserv", "gas_station")
-        .str.replace("banco", "bank")
-        .str.replace("distrito", "census_district")
-        .str.replace("frcensal", "census_tract")
-        .str.replace("edad", "av_age")
-        .str.replace("mujer", "female_rate")
-        .str.replace("propiet", "ownership_rate")
-        .str.replace("tamhogar", "av_hh_size")
-        .str.replace("nohacinado", "non_overcrowd_rate")
-        .str.replace("nonbi", "non_unmet_basic_needs_rate")
-        .str.replace("educjefe", "av_hh_head_schooling")
-        .str.replace("ocupado", "employment_rate")
+    return df.set_axis(
+        rename_columns(df.columns, BLOCK_NAME_SUBSTITUTIONS),
+        axis=1,
+        copy=False,
     )
-    return df
 
 
 def _convert_dtypes(df, float_cols=None, maxrange=24):
@@ -61,7 +106,7 @@ def _convert_dtypes(df, float_cols=None, maxrange=24):
     Parameters:
         df (pandas.DataFrame): The pandas DataFrame containing the data to be converted.
         float_cols (list of str, optional): A list of the column names to be converted to float. Defaults
-        to a list of theft columns and their values.
+        to the theft columns and their values that are present in df.
 
     Returns:
         pandas.DataFrame: The input DataFrame with the specified columns converted to float type
@@ -75,11 +120,10 @@ def _convert_dtypes(df, float_cols=None, maxrange=24):
         float_cols = [f"theft{i}" for i in range(1, maxrange)] + [
             f"theft{i}val" for i in range(1, maxrange)
         ]
+        float_cols = [col for col in float_cols if col in df.columns]
     df = df.convert_dtypes()
     df = df.set_index("block")
-    df[float_cols] = df[float_cols].astype(float)
-
-    return df
+    return df.astype(dict.fromkeys(float_cols, float))
 
 
 def _create_new_variables_ind(df):
@@ -93,9 +137,14 @@ def _create_new_variables_ind(df):
         overcrowding rate, and unemployment rate.
 
     """
-    df["unmet_basic_needs_rate"] = 1 - df["non_unmet_basic_needs_rate"]
-    df["overcrowd_rate"] = 1 - df["non_overcrowd_rate"]
-    df["unemployment_rate"] = 1 - df["employment_rate"]
+    new_variables = pd.DataFrame(
+        {
+            "unmet_basic_needs_rate": 1 - df["non_unmet_basic_needs_rate"],
+            "overcrowd_rate": 1 - df["non_overcrowd_rate"],
+            "unemployment_rate": 1 - df["employment_rate"],
+        },
+    )
+    df = pd.concat([df, new_variables], axis=1)
     df.sort_values(
         ["census_district", "census_tract", "jewish_inst"],
         ascending=[True, True, False],
@@ -105,152 +154,76 @@ def _create_new_variables_ind(df):
     return df
 
 
-def _split_theft_data(theft_data, month, maxrange=24):
-    """Splits the theft data into different categories based on specific conditions for
-    a given month.
+def _theft_panel(theft_data, months=range(4, 13), maxrange=24):
+    """Builds the block x month theft panel directly from the raw theft slots.
 
     Args:
-        theft_data (pd.DataFrame): The theft data to split.
-        month (int): The month to split the data for.
+        theft_data (pd.DataFrame): The theft data with one row per block.
+        months (iterable of int): The months to compute the totals for.
+        maxrange (int): One more than the number of theft slots.
 
     Returns:
-        pd.DataFrame: The split theft data.
+        pd.DataFrame: One row per block and month with the 'block' and 'month' (int8)
+        columns followed by the `tot_theft_{suffix}` and `dif_{suffix}` columns.
 
     """
-    new_cols = []
+    cube = theft_cube(theft_data, THEFT_RULES, months, maxrange)
+    totals = {
+        label: category_counts(cube, **{name: label}).ravel()
+        for name, rule in THEFT_RULES.items()
+        for label in rule["bins"]
+    }
+    n_blocks, n_months = len(theft_data), len(cube["months"])
 
-    for i in range(1, maxrange):
-        common_conditions = (theft_data[f"theft{i}"] != 0) & (
-            theft_data[f"theft{i}month"] == month
-        )
+    columns = {
+        "block": theft_data.index.repeat(n_months),
+        "month": np.tile(np.asarray(months, dtype=np.int8), n_blocks),
+    }
+    for first, second in THEFT_DIFFERENCES:
+        columns[f"tot_theft_{first}"] = totals[first]
+        columns[f"tot_theft_{second}"] = totals[second]
+        columns[f"dif_{first}_{second}"] = totals[first] - totals[second]
 
-        for suffix in ["hv", "lv", "night", "day", "weekday", "weekend"]:
-            condition = None
-
-            if suffix == "hv":
-                condition = common_conditions & theft_data[f"theft{i}val"].between(
-                    8403.826,
-                    100000,
-                )
-            elif suffix == "lv":
-                condition = common_conditions & theft_data[f"theft{i}val"].between(
-                    0,
-                    8403.826,
-                )
-            elif suffix == "night":
-                condition = common_conditions & (
-                    (theft_data[f"theft{i}hour"] <= 10)
-                    | (theft_data[f"theft{i}hour"] > 22)
-                )
-            elif suffix == "day":
-                condition = common_conditions & theft_data[f"theft{i}hour"].between(
-                    10,
-                    22,
-                    inclusive="right",
-                )
-            elif suffix == "weekday":
-                condition = common_conditions & theft_data[f"theft{i}day"].between(1, 5)
-            elif suffix == "weekend":
-                condition = common_conditions & theft_data[f"theft{i}day"].between(6, 7)
-
-            new_col_name = f"theft_{suffix}{i}{month}"
-            new_cols.append(new_col_name)
-            theft_data.loc[:, new_col_name] = 0
-            theft_data.loc[condition, new_col_name] = theft_data.loc[
-                condition,
-                f"theft{i}",
-            ]
-
-    return theft_data
-
-
-def _calculate_total_theft_by_suffix(theft_data, month):
-    """Calculates the total theft by suffix for a given month.
+    return pd.DataFrame(columns)
 
-    Args:
-        theft_data (pd.DataFrame): A DataFrame containing theft data.
-        month (Int): The month for which to calculate the total theft.
 
-    Returns:
-        pd.DataFrame: A DataFrame containing the calculated total theft by suffix.
-
-    """
-    for suffix in ["hv", "lv", "night", "day", "weekday", "weekend"]:
-        col_regex = f"theft_{suffix}\\d+{month}"
-        tot_col = f"tot_theft_{suffix}{month}"
-        theft_data[tot_col] = theft_data.filter(regex=col_regex).sum(axis=1)
-
-    return theft_data
-
-
-def _calculate_theft_differences(theft_data, month):
-    """Calculates the differences in total theft by suffix for a given month.
+def _create_new_variables_block(df):
+    """Adds the number of Jewish institutions only one block away to the block data.
 
     Args:
-        theft_data (pd.DataFrame): A DataFrame containing theft data.
-        month (Int): The month for which to calculate the differences.
+        df (pandas.DataFrame): The characteristics of the blocks.
 
     Returns:
-        pd.DataFrame: A DataFrame containing the calculated differences in theft by suffix.
+        pandas.DataFrame: The input DataFrame with the additional column
+        jewish_inst_only_one_block_away, the difference between the number of Jewish
+        institutions that are one block away and the number of Jewish institutions.
 
     """
-    theft_data[f"dif_hv_lv{month}"] = (
-        theft_data[f"tot_theft_hv{month}"] - theft_data[f"tot_theft_lv{month}"]
-    )
-    theft_data[f"dif_night_day{month}"] = (
-        theft_data[f"tot_theft_night{month}"] - theft_data[f"tot_theft_day{month}"]
-    )
-    theft_data[f"dif_weekday_weekend{month}"] = (
-        theft_data[f"tot_theft_weekday{month}"]
-        - theft_data[f"tot_theft_weekend{month}"]
+    jewish_inst_only_one_block_away = (
+        df["jewish_inst_one_block_away"] - df["jewish_inst"]
     )
-
-    return theft_data
-
-
-def _create_panel_data(ind_char_data, theft_data):
-    """Merges individual and theft data by block and month.
-
-    Args:
-    - ind_char_data (pd.DataFrame): DataFrame containing individual characteristics data by block.
-    - theft_data (pd.DataFrame): DataFrame containing theft data by block and month.
-
-    Returns:
-    - pd.DataFrame: Merged DataFrame with individual characteristics and theft data by block and month.
-
-    """
-    theft_data = pd.wide_to_long(
-        theft_data,
-        stubnames=[
-            "tot_theft_hv",
-            "tot_theft_lv",
-            "dif_hv_lv",
-            "tot_theft_night",
-            "tot_theft_day",
-            "dif_night_day",
-            "tot_theft_weekday",
-            "tot_theft_weekend",
-            "dif_weekday_weekend",
+    return pd.concat(
+        [
+            df,
+            jewish_inst_only_one_block_away.rename("jewish_inst_only_one_block_away"),
         ],
-        i=["block"],
-        j="month",
+        axis=1,
     )
 
-    theft_data = theft_data.reset_index(names=["block", "month"])
-
-    return pd.merge(ind_char_data, theft_data, how="left", on=["block"])
 
-
-def _create_new_variables(df, time_variable, event_time):
+def _create_new_variables(df, time_variable, event_time, blocks=None):
     """This function takes a pandas DataFrame as input and creates new variables based
     on the existing columns of the DataFrame.
 
     Args:
     df (pandas.DataFrame): A pandas DataFrame containing the data for creating new variables.
+    blocks (pandas.DataFrame, optional): The characteristics of the blocks, indexed by
+    block, if df is a fact table with a 'block' column. Only the distance to the
+    Jewish institutions is looked up. By default, it is taken from df.
 
     Returns:
     pandas.DataFrame: A pandas DataFrame with new variables added based on the existing columns of the input DataFrame. The new variables are:
-    - jewish_inst_only_one_block_away: The difference between the number of Jewish institutions that are one block away and the number of Jewish institutions.
+    - jewish_inst_only_one_block_away: The difference between the number of Jewish institutions that are one block away and the number of Jewish institutions, if blocks is not given.
     - month_dummy: A dummy variable for each month in the input data.
     - post: A dummy variable that takes the value 1 if the month is greater than 7, and 0 otherwise.
     - treatment: A treatment dummy variable based on the "sameblock" and "post" columns.
@@ -258,69 +231,164 @@ def _create_new_variables(df, time_variable, event_time):
     - treatment_2d: A treatment dummy variable that takes the value 1 if the distance between the observation and the Jewish institution is 2 blocks, and the month is greater than 7. Otherwise, it takes the value 0.
 
     """
-    df["jewish_inst_only_one_block_away"] = (
-        df["jewish_inst_one_block_away"] - df["jewish_inst"]
+    if blocks is None:
+        df = _create_new_variables_block(df)
+        distance = df
+    else:
+        distance = join_dimension(
+            df[["block"]],
+            blocks,
+            [
+                "jewish_inst",
+                "jewish_inst_only_one_block_away",
+                "distance_to_jewish_inst",
+            ],
+        )
+    time_dummies = indicator_frame(
+        df[time_variable],
+        prefix=f"{time_variable}_dummy",
+        dtype=bool,
+    )
+    post = pd.Series(np.where(df[time_variable] > event_time, 1, 0), index=df.index)
+    treatments = pd.DataFrame(
+        {
+            "post": post,
+            "treatment": distance["jewish_inst"] * post,
+            "treatment_1d": distance["jewish_inst_only_one_block_away"] * post,
+            "treatment_2d": np.where(distance["distance_to_jewish_inst"] == 2, 1, 0)
+            * post,
+        },
     )
-    df[f"{time_variable}_dummy"] = df[time_variable]
-    df = pd.get_dummies(df, columns=[f"{time_variable}_dummy"], drop_first=False)
-    df["post"] = np.where(df[time_variable] > event_time, 1, 0)
-    df["treatment"] = df["jewish_inst"] * df["post"]
-    df["treatment_1d"] = df["jewish_inst_only_one_block_away"] * df["post"]
-    df["treatment_2d"] = np.where(df["distance_to_jewish_inst"] == 2, 1, 0) * df["post"]
+    return pd.concat([df, time_dummies, treatments], axis=1)
 
-    return df
 
+@uses_raw_columns(BLOCK_RAW_COLUMNS + THEFT_RAW_COLUMNS)
+def clean_crime_by_block(df):
+    """Cleans the raw crime-by-block data set once for all of its outputs.
 
-def process_crime_by_block(df, maxrange=24):
-    """Processes the crime data in the given DataFrame, `df`, and returns a panel data
-    structure with information on theft and individual characteristics by block and
-    month.
+    The column names are standardized and the dtypes converted, with the blocks as
+    the index. Both `crime_by_block_panel` and `ind_char_table` start from this base,
+    so it can be cached and shared between them.
 
     Args:
-        df (pandas.DataFrame): A DataFrame containing crime data.
+        df (pandas.DataFrame): The raw crime-by-block data set.
 
     Returns:
-        pandas.DataFrame: A panel data structure with information on theft and
-        individual characteristics by block and month.
+        pandas.DataFrame: The cleaned data set with one row per block.
 
     """
     df = _clean_column_names_block(df)
-    df = _convert_dtypes(df)
+    return _convert_dtypes(df)
 
-    theft_data = df.loc[:, df.columns.str.startswith("theft")]
-    ind_char_data = df[[col for col in df.columns if not col.startswith("theft")]]
 
-    for i in range(1, maxrange):
-        theft_data.loc[theft_data[f"theft{i}corner"] == 1, f"theft{i}"] = 0.25
+def block_table(base, float32=False):
+    """Builds the table of the block characteristics from the cleaned crime-by-block
+    data set.
 
-    for month in range(4, 13):
-        theft_data = _split_theft_data(theft_data, month)
-        theft_data = _calculate_total_theft_by_suffix(theft_data, month)
-        theft_data = _calculate_theft_differences(theft_data, month)
+    This is the dimension table of the panel of `crime_by_block_panel`: the
+    characteristics of the blocks and their census tracts are stored once per block
+    instead of once per block and month.
 
-    theft_cols = [col for col in theft_data.columns if col.startswith("theft")]
-    theft_data = theft_data.drop(columns=theft_cols)
-    theft_data = theft_data.reset_index(names=["block"])
+    Args:
+        base (pandas.DataFrame): The output of `clean_crime_by_block`. The theft
+            columns are not used.
+        float32 (bool): Whether to store the float columns as float32.
 
-    crime_by_block_panel = _create_panel_data(ind_char_data, theft_data)
-    crime_by_block_panel = _create_new_variables(
-        crime_by_block_panel,
+    Returns:
+        pandas.DataFrame: The characteristics of the blocks, indexed by block, with
+        the compact dtypes of `apply_dtype_plan`.
+
+    """
+    ind_char_data = base[[col for col in base.columns if not col.startswith("theft")]]
+    blocks = _create_new_variables_block(ind_char_data)
+    return apply_dtype_plan(blocks, float32=float32)
+
+
+def crime_by_block_panel(base, maxrange=24, float32=False, sparse=False):
+    """Builds the block x month panel from the cleaned crime-by-block data set.
+
+    The panel is the fact table of the thefts and treatments. The characteristics of
+    the blocks are in `block_table` and can be attached with `join_dimension`.
+
+    Args:
+        base (pandas.DataFrame): The output of `clean_crime_by_block`.
+        maxrange (int): One more than the number of theft slots.
+        float32 (bool): Whether to store the float columns as float32.
+        sparse (bool): Whether to store the 0/1 indicators as sparse columns.
+
+    Returns:
+        pandas.DataFrame: A panel data structure with information on theft by block
+        and month, with the compact dtypes of `apply_dtype_plan`.
+
+    """
+    theft_data = base[[col for col in base.columns if col.startswith("theft")]]
+    blocks = _create_new_variables_block(
+        base[["jewish_inst", "jewish_inst_one_block_away", "distance_to_jewish_inst"]],
+    )
+
+    panel = _theft_panel(theft_data, maxrange=maxrange)
+    panel = _create_new_variables(
+        panel,
         time_variable="month",
         event_time=7,
+        blocks=blocks,
     )
-    crime_by_block_panel = crime_by_block_panel.set_index(["block", "month"])
+    panel = panel.set_index(["block", "month"])
 
-    return crime_by_block_panel
+    return apply_dtype_plan(panel, float32=float32, sparse=sparse)
 
 
-def process_ind_char_data(df):
-    df = _clean_column_names_block(df)
-    df = _convert_dtypes(df)
+def ind_char_table(base, float32=False):
+    """Builds the table of census tract characteristics from the cleaned crime-by-block
+    data set.
+
+    Args:
+        base (pandas.DataFrame): The output of `clean_crime_by_block`. The theft
+            columns are not used.
+        float32 (bool): Whether to store the float columns as float32.
+
+    Returns:
+        pandas.DataFrame: The characteristics of the blocks and their census tracts,
+        with the first block of every census tract, with the compact dtypes of
+        `apply_dtype_plan`.
 
-    ind_char_data = df[[col for col in df.columns if not col.startswith("theft")]]
+    """
+    ind_char_data = base[[col for col in base.columns if not col.startswith("theft")]]
 
     ind_char_data = _create_new_variables_ind(ind_char_data)
     ind_char_data = ind_char_data.drop_duplicates(
         subset=["census_district", "census_tract"],
     )
-    return ind_char_data
+    return apply_dtype_plan(ind_char_data, float32=float32)
+
+
+@uses_raw_columns(BLOCK_RAW_COLUMNS + THEFT_RAW_COLUMNS)
+def process_crime_by_block(df, maxrange=24, float32=False, sparse=False):
+    """Processes the crime data in the given DataFrame, `df`, and returns a panel data
+    structure with information on theft and individual characteristics by block and
+    month.
+
+    Args:
+        df (pandas.DataFrame): A DataFrame containing crime data.
+        float32 (bool): Whether to store the float columns as float32.
+        sparse (bool): Whether to store the 0/1 indicators as sparse columns.
+
+    Returns:
+        pandas.DataFrame: A panel data structure with information on theft and
+        individual characteristics by block and month, with the compact dtypes of
+        `apply_dtype_plan`.
+
+    """
+    base = clean_crime_by_block(df)
+    panel = crime_by_block_panel(
+        base,
+        maxrange=maxrange,
+        float32=float32,
+        sparse=sparse,
+    )
+    return join_dimension(panel, block_table(base, float32=float32))
+
+
+@uses_raw_columns(BLOCK_RAW_COLUMNS)
+def process_ind_char_data(df, float32=False):
+    return ind_char_table(clean_crime_by_block(df), float32=float32)
@@ -0,0 +1,258 @@
+"""Function(s) for computing derived variables from a declarative specification."""
+import ast
+from graphlib import CycleError, TopologicalSorter
+
+import numpy as np
+import pandas as pd
+
+from di_tella_2004_replication.config import SRC
+from di_tella_2004_replication.data_management.indicators import (
+    indicator,
+    shared_indicators,
+)
+from di_tella_2004_replication.utilities import read_yaml
+
+MONTHLY_SPEC = SRC / "data_management" / "monthly_variables.yaml"
+VIRTUAL_COLUMNS = "virtual_columns"
+
+
+def _group_codes(by):
+    """Returns the group code of every row."""
+    return pd.factorize(by, use_na_sentinel=False)[0]
+
+
+def group_sum(values, by):
+    """Returns the sum of values within the group of every row, ignoring NaN."""
+    codes = _group_codes(by)
+    sums = np.bincount(codes, weights=np.nan_to_num(values, nan=0.0))
+    return sums[codes]
+
+
+def group_cumsum(values, by):
+    """Returns the running sum of values within the group of every row, in row order.
+
+    NaN values stay NaN and are skipped by the running sum.
+
+    """
+    return pd.Series(values).groupby(_group_codes(by)).cumsum().to_numpy()
+
+
+HELPERS = {
+    "where": np.where,
+    "isin": np.isin,
+    "select": np.select,
+    "group_sum": group_sum,
+    "group_cumsum": group_cumsum,
+    "indicator": indicator,
+    "nan": np.nan,
+}
+
+
+def _expand(item):
+    """Expands an item of a specification into (name, expression) pairs."""
+    loops = item.get("for", {})
+    lengths = {len(values) for values in loops.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"The lists in 'for' must have the same length: {loops}")
+
+    definitions = item["define"]
+    if not loops:
+        return [(name, str(expr)) for name, expr in definitions.items()]
+
+    keys = list(loops)
+    return [
+        (name.format(**fill), str(expr).format(**fill))
+        for values in zip(*loops.values())
+        for fill in [dict(zip(keys, values))]
+        for name, expr in definitions.items()
+    ]
+
+
+def _compile_expression(name, expression):
+    """Parses an expression and returns its code and the names it uses."""
+    tree = ast.parse(expression, mode="eval")
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute | ast.Lambda) or (
+            isinstance(node, ast.Name) and node.id.startswith("_")
+        ):
+            raise ValueError(f"Unsupported syntax in the definition of {name}.")
+    names = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+    return compile(tree, f"<{name}>", "eval"), names.difference(HELPERS)
+
+
+def compile_plan(spec):
+    """Compiles the specification of a stage into an execution plan.
+
+    Items marked `virtual: true` are not computed. Their expressions are kept as
+    recipes in the attribute "virtual_columns" of the data set and evaluated by the
+    design matrix of a fit that uses them.
+
+    Args:
+        spec (dict): The specification of a stage, with the optional keys "drop" (an
+            expression selecting the rows to remove), "sort" (the columns to sort the
+            rows by) and "variables" (the list of definitions).
+
+    Returns:
+        dict: The plan, holding the compiled expressions, the order in which they are
+            evaluated, the order in which the variables are stored and the recipes of
+            the virtual columns.
+
+    """
+    items = spec.get("variables", [])
+    definitions = [
+        pair for item in items if not item.get("virtual") for pair in _expand(item)
+    ]
+    virtual = dict(
+        pair for item in items if item.get("virtual") for pair in _expand(item)
+    )
+    names = [name for name, _ in definitions]
+    all_names = [*names, *virtual]
+    duplicates = {name for name in all_names if all_names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"Variables defined more than once: {sorted(duplicates)}")
+
+    for name, expression in virtual.items():
+        _compile_expression(name, expression)
+
+    expressions = {}
+    dependencies = {}
+    for name, expression in definitions:
+        expressions[name], used = _compile_expression(name, expression)
+        if used.intersection(virtual):
+            raise ValueError(f"{name} uses virtual columns, which are not computed.")
+        dependencies[name] = used.intersection(names).difference([name])
+
+    try:
+        evaluation_order = list(TopologicalSorter(dependencies).static_order())
+    except CycleError as error:
+        raise ValueError(f"Circular definitions: {error.args[1]}") from error
+
+    drop = spec.get("drop")
+    return {
+        "drop": None if drop is None else _compile_expression("drop", drop)[0],
+        "sort": spec.get("sort"),
+        "expressions": expressions,
+        "evaluation_order": evaluation_order,
+        "variables": names,
+        "virtual": virtual,
+    }
+
+
+def _evaluate(code, df, results, helpers=HELPERS, columns=None):
+    """Evaluates compiled code on the columns of df and the results computed so far.
+
+    The arrays of the columns of df are kept in columns, if given, so that every
+    expression sees the same array of a column.
+
+    """
+    namespace = dict(helpers)
+    columns = {} if columns is None else columns
+    for name in code.co_names:
+        if name in results:
+            namespace[name] = results[name]
+        elif name in df.columns:
+            if name not in columns:
+                columns[name] = df[name].to_numpy()
+            namespace[name] = columns[name]
+    values = eval(code, {"__builtins__": {}}, namespace)
+    if np.ndim(values) == 0:
+        values = np.full(len(df), values)
+    return values
+
+
+def _own(values):
+    """Returns values, copied if they are a view on other data (e.g. a column of df)."""
+    return values if values.flags.owndata else values.copy()
+
+
+def _row_positions(df, plan):
+    """Returns the positions of the rows kept by a plan, in their new order."""
+    rows = np.arange(len(df))
+    if plan["drop"] is not None:
+        rows = rows[~_evaluate(plan["drop"], df, {}).astype(bool)]
+    if plan["sort"]:
+        keys = df[plan["sort"]].take(rows).reset_index(drop=True)
+        rows = rows[keys.sort_values(plan["sort"]).index]
+    return rows
+
+
+def run_plan(df, plan):
+    """Computes the derived variables of a plan and adds them to a data set at once.
+
+    New variables are appended in the order of the specification. Variables that
+    already exist in df are replaced in place. The recipes of virtual columns are
+    added to the attribute "virtual_columns". Dropping and sorting rows take the
+    rows of df once, and the derived variables are attached without consolidating
+    them into a copy.
+
+    Args:
+        df (pandas.DataFrame): The data set.
+        plan (dict): The plan returned by `compile_plan`.
+
+    Returns:
+        pandas.DataFrame: The data set with the derived variables.
+
+    """
+    rows = _row_positions(df, plan)
+    if not np.array_equal(rows, np.arange(len(df))):
+        df = df.take(rows)
+
+    # The indicators of a column are built together once per run.
+    helpers = {**HELPERS, "indicator": shared_indicators()}
+    columns = {}
+    results = {}
+    for name in plan["evaluation_order"]:
+        results[name] = _evaluate(
+            plan["expressions"][name],
+            df,
+            results,
+            helpers,
+            columns,
+        )
+
+    replaced = [name for name in plan["variables"] if name in df.columns]
+    derived = pd.DataFrame(
+        {name: _own(results[name]) for name in plan["variables"]},
+        index=df.index,
+        copy=False,
+    )
+    out = pd.concat([df.drop(columns=replaced), derived], axis=1)
+    if replaced:
+        new = [name for name in plan["variables"] if name not in df.columns]
+        out = out[[*df.columns, *new]]
+    out.attrs = dict(df.attrs)
+    if plan["virtual"]:
+        out.attrs[VIRTUAL_COLUMNS] = {
+            **df.attrs.get(VIRTUAL_COLUMNS, {}),
+            **plan["virtual"],
+        }
+    return out
+
+
+def evaluate_virtual(expression, column):
+    """Evaluates the recipe of a virtual column.
+
+    Args:
+        expression (str): The recipe, an expression of the specification.
+        column (callable): Returns the values of the column with the given name.
+
+    Returns:
+        numpy.ndarray: The values of the virtual column.
+
+    """
+    code, names = _compile_expression(expression, expression)
+    namespace = {**HELPERS, **{name: column(name) for name in names}}
+    return eval(code, {"__builtins__": {}}, namespace)
+
+
+def load_plans(path=MONTHLY_SPEC):
+    """Loads a specification of derived variables and compiles every stage.
+
+    Args:
+        path (str or pathlib.Path): Path to the YAML specification.
+
+    Returns:
+        dict: The plans by stage name.
+
+    """
+    return {stage: compile_plan(spec) for stage, spec in read_yaml(path).items()}
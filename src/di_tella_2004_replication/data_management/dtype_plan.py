@@ -0,0 +1,150 @@
+"""Function(s) for storing the cleaned data sets with compact NumPy dtypes."""
+import re
+
+import numpy as np
+import pandas as pd
+
+DUMMY_PATTERNS = [
+    r"(month|week)_dummy_\d+",
+    r"month\d+",
+    r"(\w+_)?cuad\d+p?",
+    r"post\d*",
+    r"treatment(_\dd)?",
+    r"belgrano|once|vcrespo",
+    r"m(belg|once|vcre)[a-z]{3}",
+]
+# A sparse uint8 column takes 5 bytes per non-zero value (value plus int32 position)
+# instead of 1 byte per row, so only indicators that are mostly zeros become sparse.
+SPARSE_MAX_DENSITY = 0.1
+CATEGORICAL_COLUMNS = ["neighborhood", "street"]
+ID_COLUMNS = ["block", "observ"]
+
+
+def _is_dummy(name):
+    """Checks whether a column name belongs to a 0/1 indicator of the dtype plan."""
+    return any(re.fullmatch(pattern, str(name)) for pattern in DUMMY_PATTERNS)
+
+
+def _to_numpy(series, float32=False):
+    """Converts a column to a NumPy-backed dtype without losing values.
+
+    Nullable integers and booleans stay integer/boolean if they hold no missing values
+    and become float64 otherwise. Nullable strings become objects with NaN for missing.
+
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return series
+    if pd.api.types.is_string_dtype(dtype) or dtype == object:
+        return series.astype(object).where(series.notna(), np.nan)
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        has_na = series.isna().any()
+        if pd.api.types.is_bool_dtype(dtype) and not has_na:
+            series = series.astype(bool)
+        elif pd.api.types.is_integer_dtype(dtype) and not has_na:
+            series = series.astype("int64")
+        else:
+            series = series.astype("float64")
+    if float32 and series.dtype == "float64":
+        series = series.astype("float32")
+    return series
+
+
+def _is_binary(series):
+    """Checks whether a column holds only the values 0 and 1 and no missing values."""
+    if series.isna().any():
+        return False
+    return bool(series.isin([0, 1]).all())
+
+
+def _fits_int16(series):
+    """Checks whether a column holds integers that fit into int16 and no missing."""
+    if series.isna().any() or not pd.api.types.is_numeric_dtype(series.dtype):
+        return False
+    values = series.to_numpy(dtype="float64")
+    info = np.iinfo(np.int16)
+    return bool(
+        (values == np.round(values)).all()
+        and (values >= info.min).all()
+        and (values <= info.max).all(),
+    )
+
+
+def _to_indicator(series, sparse=False):
+    """Converts a 0/1 column to bool (if it is boolean) or uint8.
+
+    With sparse, columns with at most SPARSE_MAX_DENSITY ones become sparse.
+
+    """
+    if isinstance(series.dtype, pd.SparseDtype):
+        return series
+    dtype = bool if pd.api.types.is_bool_dtype(series.dtype) else np.uint8
+    if sparse and series.astype(bool).mean() <= SPARSE_MAX_DENSITY:
+        return series.astype(pd.SparseDtype(dtype, fill_value=dtype(0)))
+    return series.astype(dtype)
+
+
+def _apply_column_plan(series, float32=False, sparse=False):
+    """Converts a single column (or index level) according to the dtype plan."""
+    name = series.name
+    if name in ID_COLUMNS and _fits_int16(series):
+        return series.astype("int16")
+    if name in CATEGORICAL_COLUMNS:
+        return _to_numpy(series).astype("category")
+    if _is_dummy(name) and _is_binary(series):
+        return _to_indicator(series, sparse=sparse)
+    return _to_numpy(series, float32=float32)
+
+
+def _apply_index_plan(index, float32=False):
+    """Converts the levels of an index according to the dtype plan."""
+    levels = [
+        _apply_column_plan(
+            pd.Series(index.get_level_values(i), name=name),
+            float32=float32,
+        )
+        for i, name in enumerate(index.names)
+    ]
+    if isinstance(index, pd.MultiIndex):
+        return pd.MultiIndex.from_arrays(levels, names=index.names)
+    if isinstance(index, pd.RangeIndex):
+        return index
+    return pd.Index(levels[0], name=index.name)
+
+
+def apply_dtype_plan(df, float32=False, sparse=False):
+    """Stores a cleaned data set with compact, NumPy-backed dtypes.
+
+    - 0/1 indicators (month and week dummies, cuad*, post, treatment* and the
+      neighborhood dummies of the monthly panel) become uint8, or stay bool if they
+      are bool already. With sparse, the ones that are mostly zeros become sparse
+      with fill value 0, and indicators that are sparse already stay sparse.
+    - neighborhood and street become categorical.
+    - block and observ become int16.
+    - All other nullable extension columns become the NumPy dtype that holds their
+      values, so the estimators never receive extension arrays.
+
+    Columns that do not hold what the plan expects, e.g. an indicator with missing
+    values, are only converted to their NumPy dtype.
+
+    Args:
+        df (pandas.DataFrame): The cleaned data set.
+        float32 (bool): Whether to store the float columns as float32. This halves
+            their size but changes the estimates in the last digits.
+        sparse (bool): Whether to store the 0/1 indicators as sparse columns. They
+            are mostly zeros, so this saves most of their memory.
+
+    Returns:
+        pandas.DataFrame: The data set with the same values and compact dtypes.
+
+    """
+    converted = pd.concat(
+        [
+            _apply_column_plan(df[name], float32=float32, sparse=sparse)
+            for name in df.columns
+        ],
+        axis=1,
+    )
+    converted.index = _apply_index_plan(df.index, float32=float32)
+    converted.attrs = dict(df.attrs)
+    return converted
@@ -0,0 +1,102 @@
+"""Function(s) for building the 0/1 indicators of a column in one step."""
+import numpy as np
+import pandas as pd
+
+
+def _levels(values, levels):
+    """Returns the levels as an Index, defaulting to the sorted observed values."""
+    if levels is None:
+        levels = pd.unique(values[pd.notna(values)])
+        levels = np.sort(levels)
+    return pd.Index(levels)
+
+
+def indicator_matrix(values, levels=None, dtype="uint8"):
+    """Returns the indicators of all levels of values as one matrix.
+
+    The values are converted to integer codes once, and the matrix is a single
+    gather from an identity matrix whose extra last row holds the zeros for values
+    that are not a level.
+
+    Args:
+        values (array-like): The column, e.g. the month of every row.
+        levels (array-like, optional): The levels to build indicators for. Defaults
+            to the sorted observed values, as `pandas.get_dummies` does.
+        dtype (str or numpy.dtype): The dtype of the indicators.
+
+    Returns:
+        tuple: The matrix with one column per level and the levels.
+
+    """
+    values = np.asarray(values)
+    levels = _levels(values, levels)
+    codes = levels.get_indexer(values)
+    matrix = np.eye(len(levels) + 1, len(levels), dtype=dtype)[codes]
+    return matrix, levels
+
+
+def indicator(values, levels, level):
+    """Returns the indicator of a single level.
+
+    Args:
+        values (array-like): The column.
+        levels (array-like): All levels of the column.
+        level: The level.
+
+    Returns:
+        numpy.ndarray: The uint8 indicator.
+
+    """
+    levels = pd.Index(levels)
+    codes = levels.get_indexer(np.asarray(values))
+    return (codes == levels.get_loc(level)).astype(np.uint8)
+
+
+def shared_indicators():
+    """Returns an `indicator` function that builds the indicators of a column once.
+
+    The first call for a column builds the indicators of all its levels together, and
+    later calls for the same column object and levels take theirs from that matrix.
+    The matrices are kept as long as the function, e.g. while the variables of one
+    panel are derived.
+
+    Returns:
+        callable: A function with the arguments and result of `indicator`.
+
+    """
+    matrices = {}
+
+    def shared_indicator(values, levels, level):
+        # The cache holds the column itself, so its id is not reused meanwhile.
+        key = (id(values), tuple(levels))
+        if key not in matrices:
+            matrices[key] = (values, *indicator_matrix(values, levels))
+        _, matrix, levels = matrices[key]
+        return matrix[:, levels.get_loc(level)]
+
+    return shared_indicator
+
+
+def indicator_frame(series, levels=None, prefix=None, dtype="uint8", columns=None):
+    """Returns the indicators of all levels of a column as a DataFrame.
+
+    Args:
+        series (pandas.Series): The column.
+        levels (array-like, optional): The levels. Defaults to the sorted observed
+            values.
+        prefix (str, optional): The prefix of the column names, which are named
+            "{prefix}_{level}" like in `pandas.get_dummies`. Defaults to the name of
+            the series.
+        dtype (str or numpy.dtype): The dtype of the indicators.
+        columns (list of str, optional): The column names, one per level. Overrides
+            prefix.
+
+    Returns:
+        pandas.DataFrame: The indicators, indexed like the series.
+
+    """
+    matrix, levels = indicator_matrix(series.to_numpy(), levels=levels, dtype=dtype)
+    if columns is None:
+        prefix = series.name if prefix is None else prefix
+        columns = [f"{prefix}_{level}" for level in levels]
+    return pd.DataFrame(matrix, index=series.index, columns=columns, copy=False)
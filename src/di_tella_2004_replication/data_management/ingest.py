@@ -0,0 +1,303 @@
+"""Function(s) for caching the raw Stata files in a columnar format."""
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyreadstat
+
+from di_tella_2004_replication.data_management.dtype_plan import apply_dtype_plan
+
+HASH_KEY = b"source_sha256"
+READSTAT_TYPES = {
+    "string": pa.string(),
+    "int8": pa.int64(),
+    "int16": pa.int64(),
+    "int32": pa.int64(),
+    "float": pa.float64(),
+    "double": pa.float64(),
+}
+# The Stata display formats that pyreadstat decodes to dates, datetimes and times.
+DATE_FORMATS = {
+    "%td": pa.date32(),
+    "%d": pa.date32(),
+    "%tdD_m_Y": pa.date32(),
+    "%tdCCYY-NN-DD": pa.date32(),
+    "%tc": pa.timestamp("ns"),
+    "%tC": pa.timestamp("ns"),
+    "%tcHH:MM:SS": pa.time64("us"),
+    "%tcHH:MM": pa.time64("us"),
+}
+
+
+def _file_hash(path, chunk_size=2**20):
+    """Computes the SHA-256 digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as stream:
+        for chunk in iter(lambda: stream.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cached_hash(path):
+    """Returns the source hash stored in a cached file, or None if there is none."""
+    try:
+        with pa.memory_map(str(path)) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    return metadata.get(HASH_KEY, b"").decode() or None
+
+
+def _arrow_schema(meta, columns=None):
+    """Derives the Arrow schema of a Stata file from its metadata.
+
+    The schema is fixed up front so that chunks in which a column happens to be all
+    missing are still written with the type of the full column. The types are the
+    ones that Arrow infers from the output of `pyreadstat.read_dta` for the whole
+    file: columns with a date format become dates, datetimes or times, and integer
+    columns become int64, with missing values as nulls.
+
+    """
+    names = meta.column_names if columns is None else columns
+    return pa.schema(
+        [
+            (
+                name,
+                DATE_FORMATS.get(
+                    meta.original_variable_types[name],
+                    READSTAT_TYPES[meta.readstat_variable_types[name]],
+                ),
+            )
+            for name in names
+        ],
+    )
+
+
+def read_dta_chunks(source, chunksize=100_000, columns=None, num_processes=1):
+    """Reads a Stata file in chunks of rows.
+
+    Args:
+        source (str or pathlib.Path): Path to the Stata file.
+        chunksize (int): The number of rows per chunk.
+        columns (list of str, optional): The columns to read. Defaults to all.
+        num_processes (int): The number of processes that decode each chunk. With 1,
+            the chunks are decoded in the current process.
+
+    Yields:
+        pandas.DataFrame: The chunks, indexed by their row positions in the file.
+
+    """
+    if columns is not None:
+        meta = pyreadstat.read_dta(source, metadataonly=True)[1]
+        columns = _in_file_order(meta.column_names, columns)
+    chunks = pyreadstat.read_file_in_chunks(
+        pyreadstat.read_dta,
+        source,
+        chunksize=chunksize,
+        multiprocess=num_processes > 1,
+        num_processes=num_processes,
+        usecols=columns,
+    )
+    start = 0
+    for chunk, _ in chunks:
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+
+
+def cache_dta(source, target, chunksize=None, num_processes=1):
+    """Converts a Stata file to an Arrow (Feather v2) file, unless it is cached already.
+
+    The file is written uncompressed so that it can be memory-mapped. The SHA-256
+    digest of the Stata file is stored in the metadata of the Arrow file, so the slow
+    Stata parsing is skipped whenever the cached file was produced from a file with the
+    same content.
+
+    Args:
+        source (str or pathlib.Path): Path to the Stata file.
+        target (str or pathlib.Path): Path to the Arrow file.
+        chunksize (int, optional): If given, the Stata file is decoded and written in
+            chunks of this many rows, so that it is never held in memory at once.
+        num_processes (int): The number of processes that decode each chunk. Only used
+            if chunksize is given.
+
+    Returns:
+        bool: True if the Stata file was parsed, False if the cache was reused.
+
+    """
+    digest = _file_hash(source)
+    if _cached_hash(target) == digest:
+        return False
+
+    if chunksize is None:
+        data, meta = pyreadstat.read_dta(source)
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        table = table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), HASH_KEY: digest.encode()},
+        )
+        feather.write_feather(table, target, compression="uncompressed")
+        return True
+
+    meta = pyreadstat.read_dta(source, metadataonly=True)[1]
+    schema = _arrow_schema(meta).with_metadata({HASH_KEY: digest.encode()})
+    with pa.OSFile(str(target), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for chunk in read_dta_chunks(source, chunksize, num_processes=num_processes):
+            batch = pa.RecordBatch.from_pandas(
+                chunk,
+                schema=schema,
+                preserve_index=False,
+            )
+            writer.write_batch(batch)
+    return True
+
+
+def uses_raw_columns(columns):
+    """Declares the raw columns that a cleaning function consumes.
+
+    The columns are stored in the `raw_columns` attribute of the decorated function so
+    that the ingestion can skip all other columns.
+
+    Args:
+        columns (list of str): The names of the columns in the raw data set.
+
+    Returns:
+        function: The decorator.
+
+    """
+
+    def decorator(func):
+        func.raw_columns = list(columns)
+        return func
+
+    return decorator
+
+
+def _in_file_order(names, columns):
+    """Orders the requested columns as in the file and checks that they all exist."""
+    missing = set(columns).difference(names)
+    if missing:
+        raise KeyError(f"Columns not in the raw data set: {sorted(missing)}")
+    wanted = set(columns)
+    return [name for name in names if name in wanted]
+
+
+def read_cached(path, columns=None):
+    """Reads a cached raw data set through a memory map.
+
+    Args:
+        path (str or pathlib.Path): Path to the Arrow file written by `cache_dta`.
+        columns (list of str, optional): The columns to read. Defaults to all.
+
+    Returns:
+        pandas.DataFrame: The raw data set, with the columns in file order.
+
+    """
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        if columns is not None:
+            columns = _in_file_order(reader.schema.names, columns)
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+def read_raw(path, columns=None):
+    """Reads a raw data set from a Stata file or from its cached Arrow file.
+
+    Args:
+        path (str or pathlib.Path): Path to a .dta file or to an Arrow file written by
+            `cache_dta`.
+        columns (list of str, optional): The columns to read, e.g. the `raw_columns`
+            of the cleaning function that consumes the data. Defaults to all.
+
+    Returns:
+        pandas.DataFrame: The raw data set, with the columns in file order.
+
+    """
+    if str(path).endswith(".dta"):
+        if columns is not None:
+            meta = pyreadstat.read_dta(path, metadataonly=True)[1]
+            columns = _in_file_order(meta.column_names, columns)
+        data, meta = pyreadstat.read_dta(path, usecols=columns)
+        return data
+    return read_cached(path, columns)
+
+
+def read_cached_partitions(path, entities_per_partition, columns=None, entity="observ"):
+    """Reads a cached raw data set in partitions that each hold whole entities.
+
+    The rows of an entity do not have to be contiguous in the file. Only the entity
+    column is read up front, and every partition is taken from the memory-mapped file,
+    so at most one partition is held in memory.
+
+    Args:
+        path (str or pathlib.Path): Path to the Arrow file written by `cache_dta`.
+        entities_per_partition (int): The number of entities in each partition, in
+            order of their first appearance in the file.
+        columns (list of str, optional): The columns to read. Defaults to all.
+        entity (str): The name of the entity identifier in the raw data set.
+
+    Yields:
+        pandas.DataFrame: The partitions, with the rows in file order and indexed by
+            their row positions in the file.
+
+    """
+    with pa.memory_map(str(path)) as source:
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(_in_file_order(table.schema.names, columns))
+        codes = pd.factorize(table.column(entity).to_pandas())[0]
+        partition = codes // entities_per_partition
+        order = np.argsort(partition, kind="stable")
+        bounds = np.searchsorted(partition[order], np.arange(partition.max() + 2))
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            rows = order[start:stop]
+            chunk = table.take(rows).to_pandas()
+            chunk.index = pd.Index(rows, dtype="int64")
+            yield chunk
+
+
+def partition_frame(df, entities_per_partition, entity="observ"):
+    """Splits a data set in memory into partitions that each hold whole entities.
+
+    Args:
+        df (pandas.DataFrame): The data set.
+        entities_per_partition (int): The number of entities in each partition, in
+            order of their first appearance in df.
+        entity (str): The name of the entity identifier, a column or index level.
+
+    Yields:
+        pandas.DataFrame: The partitions, with the rows in their order in df.
+
+    """
+    keys = df.index.get_level_values(entity) if entity in df.index.names else df[entity]
+    partition = pd.factorize(keys)[0] // entities_per_partition
+    for _, chunk in df.groupby(partition, sort=True):
+        yield chunk
+
+
+def process_in_partitions(partitions, func, float32=False, sparse=False):
+    """Applies a cleaning function to every partition and stacks the results.
+
+    This is only equivalent to cleaning the whole data set if the function treats
+    every entity on its own, as `crime_by_block_panel` and `process_weekly_panel` do.
+
+    Args:
+        partitions (iterable of pandas.DataFrame): The raw data in partitions that each
+            hold whole entities, e.g. from `read_cached_partitions`.
+        func (function): The cleaning function, taking the float32 and sparse options
+            of `apply_dtype_plan`.
+        float32 (bool): Whether to store the float columns as float32.
+        sparse (bool): Whether to store the 0/1 indicators that are mostly zeros as
+            sparse columns.
+
+    Returns:
+        pandas.DataFrame: The cleaned data.
+
+    """
+    cleaned = pd.concat(
+        [func(partition, float32=float32, sparse=False) for partition in partitions],
+    )
+    # Categoricals with different categories per partition are stacked as objects,
+    # and whether an indicator is mostly zeros is only known for the whole data.
+    return apply_dtype_plan(cleaned, float32=float32, sparse=sparse)
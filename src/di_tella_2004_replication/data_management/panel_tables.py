@@ -0,0 +1,78 @@
+"""Function(s) for storing panels as a block dimension table plus a slim fact table."""
+import pandas as pd
+
+
+def _entity_keys(df, entity):
+    """Returns the entity identifier of every row, from a column or an index level."""
+    if entity in df.columns:
+        return df[entity]
+    return df.index.get_level_values(entity)
+
+
+def split_panel(panel, dimension_columns, entity="block"):
+    """Splits a panel into an entity-level dimension table and a slim fact table.
+
+    The dimension columns are stored once per entity in the dimension table.
+    Everything else stays in the fact table, which keeps the keys (entity, time) of
+    the panel.
+
+    Args:
+        panel (pandas.DataFrame): The panel, with `entity` as a column or index level.
+        dimension_columns (list of str): The columns to move to the dimension table.
+        entity (str): The name of the entity identifier.
+
+    Returns:
+        tuple: The dimension table indexed by `entity` and the fact table.
+
+    Raises:
+        ValueError: If a dimension column is not constant within every entity.
+
+    """
+    grouped = panel.groupby(_entity_keys(panel, entity), sort=False)
+
+    n_unique = grouped[dimension_columns].nunique(dropna=False)
+    varying = n_unique.columns[(n_unique > 1).any()].tolist()
+    if varying:
+        raise ValueError(f"Columns that vary within a {entity}: {varying}")
+
+    dimension = grouped[dimension_columns].first()
+    dimension.index.name = entity
+    fact = panel.drop(columns=dimension_columns)
+
+    return dimension, fact
+
+
+def join_dimension(fact, dimension, columns=None):
+    """Attaches columns of a dimension table to a fact table.
+
+    Only the requested columns that the fact table does not already hold are looked
+    up, so models that only need fact columns never pay for the join.
+
+    Args:
+        fact (pandas.DataFrame): The fact table, with the identifier of the dimension
+            table as a column or index level.
+        dimension (pandas.DataFrame): The dimension table indexed by the identifier.
+        columns (list of str, optional): The columns needed. Defaults to all columns
+            of the dimension table.
+
+    Returns:
+        pandas.DataFrame: The fact table with the missing columns attached.
+
+    """
+    if columns is None:
+        columns = dimension.columns
+    missing = [col for col in columns if col not in fact.columns]
+    if not missing:
+        return fact
+
+    positions = dimension.index.get_indexer(
+        _entity_keys(fact, dimension.index.name),
+    )
+    if (positions == -1).any():
+        raise ValueError(
+            f"The fact table holds {dimension.index.name} values that are not in the "
+            "dimension table.",
+        )
+
+    joined = dimension[missing].take(positions).set_axis(fact.index)
+    return pd.concat([fact, joined], axis=1)
@@ -0,0 +1,73 @@
+"""Function(s) for renaming columns with a table of substring substitutions."""
+import functools
+import re
+
+
+@functools.cache
+def compile_substitutions(substitutions):
+    """Compiles a table of substring substitutions into a single regular expression.
+
+    The expression replaces every pattern in one scan of a name, instead of one scan
+    per substitution like chained `str.replace` calls. Where patterns overlap in a
+    name, the leftmost match wins, and among matches at the same position the one
+    listed first. This differs from chained substitutions for some tables, e.g. when
+    a replacement contains a later pattern, which chained substitutions would replace
+    again. Such tables are rejected. Whether overlapping patterns meet depends on the
+    names, so the tables of the data sets are checked against chained substitutions
+    on their raw columns by the tests. Repeated patterns are ignored, since the first
+    substitution leaves nothing for them to replace.
+
+    Args:
+        substitutions (tuple of tuple): The (pattern, replacement) pairs, in the
+            order in which they are applied.
+
+    Returns:
+        tuple: The compiled expression and the replacement of every pattern.
+
+    Raises:
+        ValueError: If a replacement contains a later pattern.
+
+    """
+    table = {}
+    for pattern, replacement in substitutions:
+        table.setdefault(pattern, replacement)
+
+    patterns = list(table)
+    for i, earlier in enumerate(patterns):
+        for later in patterns[i + 1 :]:
+            if later in table[earlier]:
+                raise ValueError(
+                    f"The substitution of {later!r} depends on the one of {earlier!r}.",
+                )
+    return re.compile("|".join(map(re.escape, patterns))), table
+
+
+@functools.lru_cache(maxsize=256)
+def _renamed(columns, substitutions):
+    """Returns the new names of a tuple of columns."""
+    expression, table = compile_substitutions(substitutions)
+
+    def replace(match):
+        return table[match.group(0)]
+
+    return tuple(
+        expression.sub(replace, col) if isinstance(col, str) else col for col in columns
+    )
+
+
+def rename_columns(columns, substitutions):
+    """Renames columns with a table of substring substitutions in one pass.
+
+    The result is memoized per tuple of columns, so renaming the columns of many
+    files with the same layout costs a dictionary lookup after the first file.
+
+    Args:
+        columns (iterable): The column names. Names that are not strings are kept.
+        substitutions (tuple of tuple): The (pattern, replacement) pairs, in the
+            order in which chained `str.replace` calls would apply them.
+
+    Returns:
+        list: The new column names.
+
+    """
+    return list(_renamed(tuple(columns), tuple(substitutions)))
@@ -0,0 +1,164 @@
+"""Function(s) for storing the stages of a pipeline as column deltas."""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+STAGE_KEY = b"di_tella_stage"
+ROWS_COLUMN = "__parent_row__"
+
+
+def _index_columns(n_levels):
+    """Returns the names under which the index levels are stored."""
+    return [f"__index_level_{i}__" for i in range(n_levels)]
+
+
+def _stage_metadata(table):
+    """Returns the stage metadata of an Arrow table written by `write_stage`."""
+    metadata = table.schema.metadata or {}
+    if STAGE_KEY not in metadata:
+        raise ValueError("The file was not written by write_stage.")
+    return json.loads(metadata[STAGE_KEY])
+
+
+def _open(path):
+    """Opens a stage through a memory map, without reading any column."""
+    table = feather.read_table(path, memory_map=True)
+    return table, _stage_metadata(table)
+
+
+def _parent_rows(parent_index, index):
+    """Returns the positions of the rows of a stage in its parent."""
+    if not parent_index.is_unique:
+        raise ValueError("The index of the parent stage must be unique.")
+    rows = parent_index.get_indexer(index)
+    if (rows == -1).any():
+        raise ValueError("The stage holds rows that are not in its parent stage.")
+    return rows
+
+
+def _read_columns(path, columns):
+    """Returns the columns of a stage as an Arrow table, resolving its parents."""
+    path = Path(path)
+    table, metadata = _open(path)
+    own = [col for col in columns if col in table.column_names]
+    inherited = [col for col in columns if col not in own]
+    if not inherited:
+        return table.select(columns)
+    if metadata["parent"] is None:
+        raise KeyError(f"Columns not in the stage: {inherited}")
+
+    parent = _read_columns(path.parent / metadata["parent"], inherited)
+    if ROWS_COLUMN in table.column_names:
+        parent = parent.take(table.column(ROWS_COLUMN))
+    for name in own:
+        parent = parent.append_column(name, table.column(name))
+    return parent.select(columns)
+
+
+def write_stage(df, path, parent=None):
+    """Stores a stage of a pipeline, keeping only what differs from its parent stage.
+
+    Without a parent, the whole data set is stored. With a parent, only the columns
+    that are new or changed are stored, plus the positions of the rows in the parent
+    if the stage drops or reorders rows. The file is an uncompressed Arrow file, so
+    `read_stage` can memory-map it. Sparse columns are stored dense and made sparse
+    again by `read_stage`. The attributes of df (e.g. the recipes of virtual columns)
+    are stored as JSON.
+
+    Args:
+        df (pandas.DataFrame): The data set of the stage. Its index must be unique
+            and its rows must all be rows of the parent stage.
+        path (str or pathlib.Path): Path of the Arrow file.
+        parent (str or pathlib.Path, optional): Path of the parent stage, written by
+            `write_stage`. It must be kept next to the stage.
+
+    """
+    path = Path(path)
+    metadata = {
+        "parent": None,
+        "columns": [str(col) for col in df.columns],
+        "index_names": list(df.index.names),
+        "attrs": df.attrs,
+        "sparse": {
+            str(col): df[col].dtype.subtype.str
+            for col in df.columns
+            if isinstance(df[col].dtype, pd.SparseDtype)
+        },
+    }
+    index = df.index.to_frame(index=False)
+    index.columns = _index_columns(df.index.nlevels)
+
+    if parent is None:
+        frame = pd.concat([df.reset_index(drop=True), index], axis=1)
+    else:
+        base = read_stage(parent)
+        rows = _parent_rows(base.index, df.index)
+        keeps_rows = np.array_equal(rows, np.arange(len(base)))
+        base = base.iloc[rows]
+        stored = [
+            col
+            for col in df.columns
+            if col not in base.columns
+            or base[col].dtype != df[col].dtype
+            or not np.array_equal(
+                base[col].to_numpy(),
+                df[col].to_numpy(),
+                equal_nan=pd.api.types.is_float_dtype(df[col].dtype),
+            )
+        ]
+        frame = df[stored].reset_index(drop=True)
+        if not keeps_rows:
+            frame[ROWS_COLUMN] = rows
+        metadata["parent"] = os.path.relpath(parent, path.parent)
+
+    sparse = frame.columns.intersection(list(metadata["sparse"]))
+    if len(sparse):
+        frame = frame.astype({col: frame[col].dtype.subtype for col in sparse})
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({STAGE_KEY: json.dumps(metadata)})
+    feather.write_feather(table, path, compression="uncompressed")
+
+
+def read_stage(path, columns=None):
+    """Reads a stage written by `write_stage`, reassembling it from its parents.
+
+    Only the requested columns are read. Columns inherited from a parent stage are
+    read from the memory-mapped parent file, and they are not copied unless the stage
+    drops or reorders the rows of its parent.
+
+    Args:
+        path (str or pathlib.Path): Path of the Arrow file.
+        columns (list of str, optional): The columns to read. Defaults to all.
+
+    Returns:
+        pandas.DataFrame: The data set of the stage.
+
+    """
+    _, metadata = _open(path)
+    if columns is None:
+        columns = metadata["columns"]
+    index_columns = _index_columns(len(metadata["index_names"]))
+
+    table = _read_columns(path, [*columns, *index_columns])
+    df = table.to_pandas(split_blocks=True)
+    df = df.set_index(index_columns)
+    df.index.names = metadata["index_names"]
+    sparse = {
+        col: np.dtype(subtype)
+        for col, subtype in metadata.get("sparse", {}).items()
+        if col in df.columns
+    }
+    if sparse:
+        df = df.astype(
+            {
+                col: pd.SparseDtype(subtype, fill_value=subtype.type(0))
+                for col, subtype in sparse.items()
+            },
+        )
+    df.attrs = metadata.get("attrs", {})
+    return df
@@ -1,82 +1,216 @@
 """Tasks for managing the data."""
+from functools import wraps
+
 import pandas as pd
-import pyreadstat
 import pytask
 
-from di_tella_2004_replication.config import BLD, SRC
+from di_tella_2004_replication.config import (
+    BLD,
+    BLOCKS_PER_PARTITION,
+    COPY_ON_WRITE,
+    FLOAT32,
+    FUSE_MONTHLY_STAGES,
+    RAW_CHUNKSIZE,
+    RAW_PROCESSES,
+    SPARSE_DUMMIES,
+    SRC,
+)
 from di_tella_2004_replication.data_management.clean_crime_by_block import (
-    process_crime_by_block,
-    process_ind_char_data,
+    block_table,
+    clean_crime_by_block,
+    crime_by_block_panel,
+    ind_char_table,
 )
 from di_tella_2004_replication.data_management.clean_MonthlyPanel import (
+    MONTHLY_NEW_COLUMNS,
+    monthly_panels,
     monthlypanel_1,
     monthlypanel_2,
     monthlypanel_3,
     monthlypanel_new,
 )
 from di_tella_2004_replication.data_management.clean_WeeklyPanel import (
+    WEEKLY_DIMENSION_COLUMNS,
     process_weekly_panel,
 )
+from di_tella_2004_replication.data_management.derived_variables import MONTHLY_SPEC
+from di_tella_2004_replication.data_management.ingest import (
+    cache_dta,
+    partition_frame,
+    process_in_partitions,
+    read_cached_partitions,
+    read_raw,
+)
+from di_tella_2004_replication.data_management.panel_tables import split_panel
+from di_tella_2004_replication.data_management.stage_store import (
+    read_stage,
+    write_stage,
+)
+
+RAW = BLD / "python" / "raw"
+
+
+def _copy_on_write(task):
+    """Runs a task under the copy-on-write mode of pandas if COPY_ON_WRITE is set."""
+
+    @wraps(task)
+    def wrapper(*args, **kwargs):
+        with pd.option_context("mode.copy_on_write", COPY_ON_WRITE):
+            return task(*args, **kwargs)
+
+    return wrapper
+
+
+for name in ["CrimebyBlock", "MonthlyPanel", "WeeklyPanel"]:
 
+    @pytask.mark.task(id=name)
+    @pytask.mark.produces(RAW / f"{name}.arrow")
+    @pytask.mark.depends_on(SRC / "data" / f"{name}.dta")
+    def task_cache_raw_data(depends_on, produces):
+        """Convert the Stata file to a columnar file that is parsed only once."""
+        cache_dta(
+            depends_on,
+            produces,
+            chunksize=RAW_CHUNKSIZE,
+            num_processes=RAW_PROCESSES,
+        )
 
-@pytask.mark.produces(BLD / "python" / "data" / "CrimeByBlockPanel.pkl")
-@pytask.mark.depends_on(SRC / "data" / "CrimebyBlock.dta")
+
+@pytask.mark.produces(BLD / "python" / "data" / "CrimeByBlockBase.pkl")
+@pytask.mark.depends_on(RAW / "CrimebyBlock.arrow")
+@_copy_on_write
+def task_clean_crime_by_block_python(depends_on, produces):
+    """Clean the data shared by the crime-by-block outputs (Python version)."""
+    data = read_raw(depends_on, columns=clean_crime_by_block.raw_columns)
+    clean_crime_by_block(data).to_pickle(produces)
+
+
+@pytask.mark.produces(
+    {
+        "panel": BLD / "python" / "data" / "CrimeByBlockPanel.pkl",
+        "blocks": BLD / "python" / "data" / "CrimeByBlockBlocks.pkl",
+    },
+)
+@pytask.mark.depends_on(BLD / "python" / "data" / "CrimeByBlockBase.pkl")
+@_copy_on_write
 def task_process_crime_by_block_python(depends_on, produces):
     """Clean the data (Python version)."""
-    data, meta = pyreadstat.read_dta(depends_on)
-    crime_data = process_crime_by_block(data)
-    crime_data.to_pickle(produces)
+    base = pd.read_pickle(depends_on)
+    if BLOCKS_PER_PARTITION is None:
+        crime_data = crime_by_block_panel(base, float32=FLOAT32, sparse=SPARSE_DUMMIES)
+    else:
+        partitions = partition_frame(base, BLOCKS_PER_PARTITION, entity="block")
+        crime_data = process_in_partitions(
+            partitions,
+            crime_by_block_panel,
+            float32=FLOAT32,
+            sparse=SPARSE_DUMMIES,
+        )
+    crime_data.to_pickle(produces["panel"])
+    block_table(base, float32=FLOAT32).to_pickle(produces["blocks"])
 
 
 @pytask.mark.produces(BLD / "python" / "data" / "CrimeByBlockIndChar.pkl")
-@pytask.mark.depends_on(SRC / "data" / "CrimebyBlock.dta")
+@pytask.mark.depends_on(BLD / "python" / "data" / "CrimeByBlockBase.pkl")
+@_copy_on_write
 def task_process_ind_char_python(depends_on, produces):
     """Clean the data (Python version)."""
-    data, meta = pyreadstat.read_dta(depends_on)
-    ind_char_data = process_ind_char_data(data)
+    ind_char_data = ind_char_table(pd.read_pickle(depends_on), float32=FLOAT32)
     ind_char_data.to_pickle(produces)
 
 
-@pytask.mark.produces(BLD / "python" / "data" / "WeeklyPanel.pkl")
-@pytask.mark.depends_on(SRC / "data" / "WeeklyPanel.dta")
+@pytask.mark.produces(
+    {
+        "panel": BLD / "python" / "data" / "WeeklyPanel.pkl",
+        "blocks": BLD / "python" / "data" / "WeeklyPanelBlocks.pkl",
+    },
+)
+@pytask.mark.depends_on(RAW / "WeeklyPanel.arrow")
+@_copy_on_write
 def task_process_weekly_panel_python(depends_on, produces):
     """Clean the data (Python version)."""
-    data, meta = pyreadstat.read_dta(depends_on)
-    weekly_panel = process_weekly_panel(data)
-    weekly_panel.to_pickle(produces)
+    columns = process_weekly_panel.raw_columns
+    if BLOCKS_PER_PARTITION is None:
+        weekly_panel = process_weekly_panel(
+            read_raw(depends_on, columns=columns),
+            float32=FLOAT32,
+            sparse=SPARSE_DUMMIES,
+        )
+    else:
+        partitions = read_cached_partitions(depends_on, BLOCKS_PER_PARTITION, columns)
+        weekly_panel = process_in_partitions(
+            partitions,
+            process_weekly_panel,
+            float32=FLOAT32,
+            sparse=SPARSE_DUMMIES,
+        )
+        # The raw rows are ordered by week, so the partitions interleave.
+        weekly_panel = weekly_panel.sort_index()
+    blocks, weekly_panel = split_panel(weekly_panel, WEEKLY_DIMENSION_COLUMNS)
+    weekly_panel.to_pickle(produces["panel"])
+    blocks.to_pickle(produces["blocks"])
 
 
-@pytask.mark.produces(BLD / "python" / "data" / "MonthlyPanel.pkl")
-@pytask.mark.depends_on(SRC / "data" / "MonthlyPanel.dta")
-def task_monthlypanel_1(depends_on, produces):
-    """Clean the data (Python version)."""
-    data, meta = pyreadstat.read_dta(depends_on)
-    MonthlyPanel = monthlypanel_1(data)
-    MonthlyPanel.to_pickle(produces)
+if FUSE_MONTHLY_STAGES:
 
+    @pytask.mark.produces(
+        {
+            name: BLD / "python" / "data" / f"{name}.arrow"
+            for name in ["MonthlyPanel", "MonthlyPanel2", "MonthlyPanel3"]
+        },
+    )
+    @pytask.mark.depends_on({"data": RAW / "MonthlyPanel.arrow", "spec": MONTHLY_SPEC})
+    @_copy_on_write
+    def task_monthly_panels(depends_on, produces):
+        """Clean the data (Python version), running all monthly stages at once."""
+        data = read_raw(depends_on["data"], columns=monthly_panels.raw_columns)
+        panels = monthly_panels(data, float32=FLOAT32, sparse=SPARSE_DUMMIES)
+        parent = None
+        for name, panel in panels.items():
+            write_stage(panel, produces[name], parent=parent)
+            parent = produces[name]
 
-@pytask.mark.produces(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel.pkl")
-def task_monthlypanel_2(depends_on, produces):
-    """Clean the data (Python version)."""
-    data = pd.read_pickle(depends_on)
-    MonthlyPanel2 = monthlypanel_2(data)
-    MonthlyPanel2.to_pickle(produces)
+else:
 
+    @pytask.mark.produces(BLD / "python" / "data" / "MonthlyPanel.arrow")
+    @pytask.mark.depends_on({"data": RAW / "MonthlyPanel.arrow", "spec": MONTHLY_SPEC})
+    @_copy_on_write
+    def task_monthlypanel_1(depends_on, produces):
+        """Clean the data (Python version)."""
+        data = read_raw(depends_on["data"], columns=monthlypanel_1.raw_columns)
+        MonthlyPanel = monthlypanel_1(data, float32=FLOAT32, sparse=SPARSE_DUMMIES)
+        write_stage(MonthlyPanel, produces)
 
-@pytask.mark.produces(BLD / "python" / "data" / "MonthlyPanel3.pkl")
-@pytask.mark.depends_on(BLD / "python" / "data" / "MonthlyPanel2.pkl")
-def task_monthlypanel_3(depends_on, produces):
-    """Clean the data (Python version)."""
-    data = pd.read_pickle(depends_on)
-    MonthlyPanel3 = monthlypanel_3(data)
-    MonthlyPanel3.to_pickle(produces)
+    @pytask.mark.produces(BLD / "python" / "data" / "MonthlyPanel2.arrow")
+    @pytask.mark.depends_on(
+        {"data": BLD / "python" / "data" / "MonthlyPanel.arrow", "spec": MONTHLY_SPEC},
+    )
+    @_copy_on_write
+    def task_monthlypanel_2(depends_on, produces):
+        """Clean the data (Python version)."""
+        data = read_stage(depends_on["data"])
+        MonthlyPanel2 = monthlypanel_2(data, float32=FLOAT32, sparse=SPARSE_DUMMIES)
+        write_stage(MonthlyPanel2, produces, parent=depends_on["data"])
 
+    @pytask.mark.produces(BLD / "python" / "data" / "MonthlyPanel3.arrow")
+    @pytask.mark.depends_on(
+        {"data": BLD / "python" / "data" / "MonthlyPanel2.arrow", "spec": MONTHLY_SPEC},
+    )
+    @_copy_on_write
+    def task_monthlypanel_3(depends_on, produces):
+        """Clean the data (Python version)."""
+        data = read_stage(depends_on["data"])
+        MonthlyPanel3 = monthlypanel_3(data, float32=FLOAT32, sparse=SPARSE_DUMMIES)
+        write_stage(MonthlyPanel3, produces, parent=depends_on["data"])
 
-@pytask.mark.produces(BLD / "python" / "data" / "MonthlyPanel_new.pkl")
-@pytask.mark.depends_on(SRC / "data" / "MonthlyPanel.dta")
+
+@pytask.mark.produces(BLD / "python" / "data" / "MonthlyPanel_new.arrow")
+@pytask.mark.depends_on(
+    {"data": BLD / "python" / "data" / "MonthlyPanel.arrow", "spec": MONTHLY_SPEC},
+)
+@_copy_on_write
 def task_monthlypanel_new(depends_on, produces):
     """Clean the data (Python version)."""
-    data, meta = pyreadstat.read_dta(depends_on)
-    MonthlyPanel_new = monthlypanel_new(data)
-    MonthlyPanel_new.to_pickle(produces)
+    data = read_stage(depends_on["data"], columns=MONTHLY_NEW_COLUMNS)
+    MonthlyPanel_new = monthlypanel_new(data, float32=FLOAT32, sparse=SPARSE_DUMMIES)
+    write_stage(MonthlyPanel_new, produces, parent=depends_on["data"])
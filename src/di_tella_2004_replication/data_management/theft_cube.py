@@ -0,0 +1,268 @@
+"""Function(s) for counting thefts by block, month and category."""
+import numpy as np
+import pandas as pd
+
+# Binning rules for the theft slots. Every rule bins one field of the slots, and
+# every bin is a union of intervals. Bins of a rule may overlap, like the value bins,
+# which share the cut-off.
+THEFT_RULES = {
+    "value": {
+        "field": "val",
+        "bins": {
+            "hv": [pd.Interval(8403.826, 100000, closed="both")],
+            "lv": [pd.Interval(0, 8403.826, closed="both")],
+        },
+    },
+    "time": {
+        "field": "hour",
+        "bins": {
+            "night": [
+                pd.Interval(-np.inf, 10, closed="right"),
+                pd.Interval(22, np.inf, closed="neither"),
+            ],
+            "day": [pd.Interval(10, 22, closed="right")],
+        },
+    },
+    "week": {
+        "field": "day",
+        "bins": {
+            "weekday": [pd.Interval(1, 5, closed="both")],
+            "weekend": [pd.Interval(6, 7, closed="both")],
+        },
+    },
+}
+
+SLOT_FIELDS = {
+    "theft": "",
+    "month": "month",
+    "val": "val",
+    "hour": "hour",
+    "day": "day",
+    "corner": "corner",
+}
+
+
+def stack_theft_slots(theft_data, maxrange=24):
+    """Stacks the per-slot theft columns into one (blocks x slots) array per field.
+
+    Args:
+        theft_data (pd.DataFrame): The theft data with one row per block.
+        maxrange (int): One more than the number of theft slots.
+
+    Returns:
+        dict: Maps "theft", "month", "val", "hour", "day" and "corner" to float
+        arrays of shape (blocks, slots). Missing values are NaN.
+
+    """
+    slots = range(1, maxrange)
+    return {
+        key: theft_data[[f"theft{i}{suffix}" for i in slots]].to_numpy(
+            dtype=float,
+            na_value=np.nan,
+        )
+        for key, suffix in SLOT_FIELDS.items()
+        if f"theft{slots[0]}{suffix}" in theft_data.columns
+    }
+
+
+def theft_weights(slots):
+    """Returns the theft count carried by each slot, 0.25 for thefts on a corner."""
+    theft = slots["theft"]
+    if "corner" in slots:
+        theft = np.where(slots["corner"] == 1, 0.25, theft)
+    return np.where(theft != 0, np.nan_to_num(theft), 0.0)
+
+
+def bin_membership(values, bins):
+    """Flags which bins of a rule every value falls into.
+
+    Args:
+        values (np.ndarray): The values, e.g. the hours of the theft slots.
+        bins (dict): Maps the label of every bin to a list of pd.Interval.
+
+    Returns:
+        np.ndarray: Boolean array with the shape of values plus one axis for the
+        bins. Missing values are in no bin.
+
+    """
+    values = np.asarray(values, dtype=float)
+    membership = np.zeros((*values.shape, len(bins)), dtype=bool)
+    for j, intervals in enumerate(bins.values()):
+        for interval in intervals:
+            if interval.closed_left:
+                above = values >= interval.left
+            else:
+                above = values > interval.left
+            if interval.closed_right:
+                below = values <= interval.right
+            else:
+                below = values < interval.right
+            membership[..., j] |= above & below
+    return membership
+
+
+def _pattern_codes(membership):
+    """Codes every combination of bins that occurs as one integer.
+
+    Returns:
+        tuple: The code of every value and the bins of every code as a boolean array
+        of shape (codes, bins).
+
+    """
+    n_bins = membership.shape[-1]
+    if n_bins > 62:
+        raise ValueError("A rule can have at most 62 bins.")
+    bits = membership.astype(np.int64) @ (np.int64(1) << np.arange(n_bins))
+    patterns, codes = np.unique(bits, return_inverse=True)
+    if len(patterns) == 0:
+        patterns = np.zeros(1, dtype=np.int64)
+    return codes, (patterns[:, None] >> np.arange(n_bins)) & 1 == 1
+
+
+def theft_cube(theft_data, rules=None, months=range(4, 13), maxrange=24):
+    """Counts thefts by block, month and the cross-product of the bins of all rules.
+
+    Every theft slot gets one code per rule for the combination of bins it falls
+    into, and the counts are a single `np.bincount` over the combined keys of block,
+    month and codes. Because a slot has exactly one code per rule, bins may overlap
+    and slots may fall into no bin. Use `category_counts` to slice the cube.
+
+    Args:
+        theft_data (pd.DataFrame): The theft data with one row per block.
+        rules (dict, optional): The binning rules, see THEFT_RULES. Defaults to
+            THEFT_RULES.
+        months (iterable of int): The months to count thefts for.
+        maxrange (int): One more than the number of theft slots.
+
+    Returns:
+        dict: The "counts" with shape (blocks, months, codes of every rule), the
+        "blocks" and "months", and for every rule in "rules" its "labels" and the
+        "patterns" of bins of its codes.
+
+    """
+    rules = THEFT_RULES if rules is None else rules
+    months = np.asarray(months)
+    slots = stack_theft_slots(theft_data, maxrange)
+    weights = theft_weights(slots)
+
+    month = pd.Index(months.astype(float)).get_indexer(slots["month"].ravel())
+    keep = (month >= 0) & (weights.ravel() != 0)
+    block = np.repeat(np.arange(len(theft_data)), weights.shape[1])
+    keys = [block[keep], month[keep]]
+    shape = [len(theft_data), len(months)]
+
+    coded_rules = {}
+    for name, rule in rules.items():
+        membership = bin_membership(slots[rule["field"]].ravel()[keep], rule["bins"])
+        codes, patterns = _pattern_codes(membership)
+        keys.append(codes)
+        shape.append(len(patterns))
+        coded_rules[name] = {"labels": list(rule["bins"]), "patterns": patterns}
+
+    flat = np.ravel_multi_index(keys, shape)
+    counts = np.bincount(flat, weights=weights.ravel()[keep], minlength=np.prod(shape))
+    return {
+        "counts": counts.reshape(shape),
+        "blocks": theft_data.index,
+        "months": months,
+        "rules": coded_rules,
+    }
+
+
+def category_counts(cube, **selection):
+    """Slices a theft cube into the counts of one category by block and month.
+
+    Args:
+        cube (dict): The output of `theft_cube`.
+        **selection: Maps rule names to the label of a bin, e.g. value="hv" or
+            value="hv", time="night" for their cross-product. Rules that are not
+            selected are summed over.
+
+    Returns:
+        np.ndarray: The counts with shape (blocks, months).
+
+    """
+    unknown = set(selection) - set(cube["rules"])
+    if unknown:
+        raise ValueError(f"Unknown rules: {sorted(unknown)}")
+
+    counts = cube["counts"]
+    for name, rule in reversed(cube["rules"].items()):
+        if name in selection:
+            selected = rule["patterns"][:, rule["labels"].index(selection[name])]
+        else:
+            selected = np.ones(len(rule["patterns"]), dtype=bool)
+        counts = counts @ selected.astype(float)
+    return counts
+
+
+def value_threshold_sweep(
+    theft_data,
+    thresholds,
+    months=range(4, 13),
+    maxrange=24,
+    lower=0,
+    upper=100000,
+):
+    """Counts high- and low-value thefts by block and month for many cut-offs at once.
+
+    For a cut-off c, high-value thefts have a value in [c, upper] and low-value thefts
+    in [lower, c], like the "hv" and "lv" bins of THEFT_RULES. Every theft is located
+    once in the sorted cut-offs and counted in a (block-months x cut-offs) histogram,
+    whose cumulative sums are the counts above and below every cut-off. The cost
+    hardly grows with the number of cut-offs.
+
+    Args:
+        theft_data (pd.DataFrame): The theft data with one row per block.
+        thresholds (array-like): The cut-offs.
+        months (iterable of int): The months to count thefts for.
+        maxrange (int): One more than the number of theft slots.
+        lower (float): The lowest value of a low-value theft.
+        upper (float): The highest value of a high-value theft.
+
+    Returns:
+        dict: "tot_theft_hv", "tot_theft_lv" and "dif_hv_lv", each a DataFrame with
+        one row per block and month, ordered like `_theft_panel` of
+        clean_crime_by_block, and one column per cut-off.
+
+    """
+    thresholds = np.asarray(thresholds, dtype=float)
+    grid = np.sort(thresholds)
+    months = np.asarray(months)
+    slots = stack_theft_slots(theft_data, maxrange)
+    weights = theft_weights(slots).ravel()
+    value = slots["val"].ravel()
+
+    month = pd.Index(months.astype(float)).get_indexer(slots["month"].ravel())
+    block = np.repeat(np.arange(len(theft_data)), slots["val"].shape[1])
+    group = block * len(months) + month
+    n_groups, n_bins = len(theft_data) * len(months), len(grid) + 1
+    counted = (month >= 0) & (weights != 0)
+
+    def histogram(keep, position):
+        flat = group[keep] * n_bins + position[keep]
+        counts = np.bincount(flat, weights=weights[keep], minlength=n_groups * n_bins)
+        return counts.reshape(n_groups, n_bins)
+
+    # Low-value thefts are below every cut-off from the first one that is >= value.
+    low = histogram(counted & (value >= lower), np.searchsorted(grid, value, "left"))
+    low = np.cumsum(low, axis=1)[:, :-1]
+    # High-value thefts are above every cut-off before the first one that is > value.
+    high = histogram(counted & (value <= upper), np.searchsorted(grid, value, "right"))
+    high = np.cumsum(high[:, ::-1], axis=1)[:, ::-1][:, 1:]
+
+    order = np.searchsorted(grid, thresholds)
+    index = pd.MultiIndex.from_arrays(
+        [
+            theft_data.index.repeat(len(months)),
+            np.tile(months.astype(np.int8), len(theft_data)),
+        ],
+        names=["block", "month"],
+    )
+    columns = pd.Index(thresholds, name="threshold")
+    totals = {
+        "tot_theft_hv": pd.DataFrame(high[:, order], index=index, columns=columns),
+        "tot_theft_lv": pd.DataFrame(low[:, order], index=index, columns=columns),
+    }
+    totals["dif_hv_lv"] = totals["tot_theft_hv"] - totals["tot_theft_lv"]
+    return totals
@@ -128,6 +128,16 @@ def task_create_results_abs_reg_weekly_clustered_python(depends_on, produces):
             f.writelines(table)
 
 
+@pytask.mark.depends_on(BLD / "python" / "models" / "abs_reg_weekly_two_way.pickle")
+@pytask.mark.produces(BLD / "python" / "tables" / "abs_reg_weekly_two_way.tex")
+def task_create_results_abs_reg_weekly_two_way_python(depends_on, produces):
+    with open(depends_on, "rb") as f:
+        model = pickle.load(f)
+        table = model.summary.as_latex()
+        with open(produces, "w") as f:
+            f.writelines(table)
+
+
 @pytask.mark.depends_on(BLD / "python" / "models" / "abs_reg_weekly_robust.pickle")
 @pytask.mark.produces(BLD / "python" / "tables" / "abs_reg_weekly_robust.tex")
 def task_create_results__abs_reg_weekly_robust__python(depends_on, produces):
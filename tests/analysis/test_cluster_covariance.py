@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+import statsmodels.api as smm
+from di_tella_2004_replication.analysis.cluster_covariance import ClusterCovariance
+
+
+@pytest.fixture()
+def regression():
+    rng = np.random.default_rng(0)
+    nobs = 300
+    blocks = rng.integers(0, 30, nobs)
+    weeks = rng.integers(0, 12, nobs)
+    x = np.column_stack([np.ones(nobs), rng.normal(size=(nobs, 2))])
+    y = np.column_stack(
+        [
+            x @ [1.0, 0.5, -0.2] + rng.normal(size=30)[blocks] + rng.normal(size=nobs),
+            rng.poisson(2.0, nobs).astype(float),
+        ],
+    )
+    return x, y, blocks, weeks
+
+
+def _statsmodels_correction(x):
+    nobs, n_vars = x.shape
+    return (nobs - 1) / (nobs - n_vars)
+
+
+def test_one_way_cov_matches_statsmodels(regression):
+    x, y, blocks, _ = regression
+    design = ClusterCovariance(x, [blocks])
+    params = np.linalg.lstsq(x, y, rcond=None)[0]
+    cov = design.cov(
+        y - x @ params,
+        scale=_statsmodels_correction(x),
+        group_debias=True,
+    )
+    for j in range(y.shape[1]):
+        expected = smm.OLS(y[:, j], x).fit(
+            cov_type="cluster",
+            cov_kwds={"groups": blocks},
+        )
+        np.testing.assert_allclose(cov[j], expected.cov_params(), rtol=1e-10)
+
+
+def test_two_way_cov_matches_statsmodels(regression):
+    x, y, blocks, weeks = regression
+    design = ClusterCovariance(x, [blocks, weeks])
+    expected = smm.OLS(y[:, 0], x).fit(
+        cov_type="cluster",
+        cov_kwds={"groups": np.column_stack([blocks, weeks])},
+    )
+    cov = design.cov(
+        expected.resid,
+        scale=_statsmodels_correction(x),
+        group_debias=True,
+    )
+    assert cov.shape == (3, 3)
+    np.testing.assert_allclose(cov, expected.cov_params(), rtol=1e-10)
+
+
+def test_cov_without_adjustments_is_the_sandwich(regression):
+    x, y, blocks, _ = regression
+    eps = y[:, 0] - x @ np.linalg.lstsq(x, y[:, 0], rcond=None)[0]
+    sums = np.stack([(x * eps[:, None])[blocks == g].sum(axis=0) for g in range(30)])
+    bread = np.linalg.inv(x.T @ x)
+    expected = bread @ sums.T @ sums @ bread
+    cov = ClusterCovariance(x, [blocks]).cov(eps)
+    np.testing.assert_allclose(cov, expected, rtol=1e-10)
+
+
+def test_cluster_covariance_rejects_three_dimensions(regression):
+    x, _, blocks, weeks = regression
+    with pytest.raises(ValueError, match="one or two dimensions"):
+        ClusterCovariance(x, [blocks, weeks, blocks])
+
+
+def test_cluster_covariance_rejects_missing_labels(regression):
+    x, _, blocks, _ = regression
+    labels = blocks.astype(float)
+    labels[5] = np.nan
+    with pytest.raises(ValueError, match="missing values"):
+        ClusterCovariance(x, [labels])
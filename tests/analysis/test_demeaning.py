@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from di_tella_2004_replication.analysis.demeaning import Demeaner
+from linearmodels.panel.data import PanelData
+
+
+@pytest.fixture()
+def unbalanced():
+    rng = np.random.default_rng(0)
+    index = pd.MultiIndex.from_product([range(50), range(8)], names=["block", "month"])
+    index = index[rng.random(len(index)) > 0.2]
+    values = pd.DataFrame(
+        {
+            "y": rng.normal(size=len(index)),
+            "x": rng.poisson(3.0, len(index)).astype(float),
+        },
+        index=index,
+    )
+    weights = pd.Series(rng.uniform(0.5, 2.0, len(index)), index=index)
+    return values, weights
+
+
+def _groups(values):
+    return [
+        values.index.get_level_values("block"),
+        values.index.get_level_values("month"),
+    ]
+
+
+def test_demean_one_effect_matches_panel_data(unbalanced):
+    values, _ = unbalanced
+    result = Demeaner(_groups(values)[:1]).demean(values)
+    expected = PanelData(values).demean("entity").values2d
+    np.testing.assert_allclose(result, expected, atol=1e-12)
+
+
+def test_demean_two_effects_matches_panel_data(unbalanced):
+    values, _ = unbalanced
+    result = Demeaner(_groups(values)).demean(values)
+    expected = PanelData(values).demean("both").values2d
+    np.testing.assert_allclose(result, expected, atol=1e-10)
+
+
+def test_demean_weighted_two_effects_matches_panel_data(unbalanced):
+    values, weights = unbalanced
+    result = Demeaner(_groups(values), weights=weights).demean(values)
+    expected = PanelData(values).demean("both", weights=PanelData(weights)).values2d
+    np.testing.assert_allclose(
+        result,
+        expected / np.sqrt(weights.to_numpy())[:, None],
+        atol=1e-10,
+    )
+
+
+def test_group_means_are_weighted_means(unbalanced):
+    values, weights = unbalanced
+    result = Demeaner(_groups(values)[1:], weights=weights).group_means(values["y"])
+    weighted_sums = (values["y"] * weights).groupby("month").sum()
+    expected = weighted_sums / weights.groupby("month").sum()
+    np.testing.assert_allclose(result[:, 0], expected)
+
+
+@pytest.fixture()
+def weakly_connected():
+    # Every entity is seen in two adjacent periods, shared with one other entity.
+    rng = np.random.default_rng(0)
+    entity = np.repeat(np.arange(500), 2)
+    period = entity // 2 + np.tile([0, 1], 500)
+    index = pd.MultiIndex.from_arrays([entity, period], names=["block", "month"])
+    return pd.DataFrame({"y": rng.normal(size=len(index))}, index=index)
+
+
+@pytest.mark.parametrize("max_iterations", [1, 1000])
+def test_demean_weakly_connected_panel_falls_back_to_lsmr(
+    weakly_connected,
+    max_iterations,
+):
+    demeaner = Demeaner(_groups(weakly_connected), max_iterations=max_iterations)
+    result = demeaner.demean(weakly_connected)
+    expected = PanelData(weakly_connected).demean("both").values2d
+    np.testing.assert_allclose(result, expected, atol=1e-8)
+
+
+def test_demeaner_rejects_missing_labels():
+    with pytest.raises(ValueError, match="missing values"):
+        Demeaner([[1.0, np.nan, 2.0]])
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+from di_tella_2004_replication.analysis.design_matrix import (
+    DesignMatrix,
+    design_matrix,
+    shared_design_matrices,
+)
+
+
+@pytest.fixture()
+def data():
+    return pd.DataFrame(
+        {
+            "y": [1.0, 2.0, 0.0, 4.0, 1.0],
+            "x": np.array([0, 1, 0, 1, 1], dtype="uint8"),
+            "z": [True, False, True, True, False],
+            "one": [1.0, 1.0, 1.0, 1.0, 1.0],
+            "neighborhood": pd.Categorical(["Once"] * 5),
+        },
+    )
+
+
+def test_design_matrix_frame_matches_add_constant(data):
+    matrix = DesignMatrix(data)
+    pd.testing.assert_frame_equal(
+        matrix.frame(["x", "z"], constant=True),
+        sm.add_constant(data[["x", "z"]]).astype(float),
+    )
+    pd.testing.assert_frame_equal(
+        matrix.frame(["x", "one"], constant=True),
+        data[["x", "one"]].astype(float),
+    )
+
+
+def test_design_matrix_rows(data):
+    matrix = DesignMatrix(data)
+    rows = (data["x"] == 1).to_numpy()
+    pd.testing.assert_frame_equal(
+        matrix.frame(["x", "y"], constant=True, rows=rows),
+        data.loc[rows, ["x", "y"]].astype(float),
+    )
+    pd.testing.assert_series_equal(matrix.series("y", rows=rows), data["y"][rows])
+
+
+def test_design_matrix_is_shared_inside_a_block(data):
+    with shared_design_matrices():
+        matrix = design_matrix(data)
+        assert design_matrix(data) is matrix
+        assert design_matrix(data, dtype="float32").series("y").dtype == np.float32
+        assert design_matrix(data.copy()) is not matrix
+    assert design_matrix(data) is not matrix
+
+
+def test_design_matrix_sees_modified_data_outside_a_block(data):
+    design_matrix(data)
+    data.loc[0, "y"] = 100.0
+    assert design_matrix(data).series("y")[0] == 100.0
+
+
+def test_design_matrix_columns(data):
+    matrix = DesignMatrix(data)
+    assert list(matrix.columns) == ["const", "y", "x", "z", "one"]
+    assert matrix.frame(["x", "z"]).to_numpy().flags["F_CONTIGUOUS"]
+    with pytest.raises(KeyError, match="neighborhood"):
+        matrix.frame(["neighborhood"])
+
+
+def test_design_matrix_converts_the_selected_columns_once(data):
+    matrix = DesignMatrix(data)
+    assert not matrix._values
+    matrix.frame(["x"], constant=True)
+    assert sorted(matrix._values) == [0, 2]
+    converted = matrix._values[2]
+    matrix.frame(["x", "y"])
+    assert matrix._values[2] is converted
+    assert sorted(matrix._values) == [0, 1, 2]
+
+
+def test_design_matrix_sparse_columns(data):
+    dense = DesignMatrix(data)
+    sparse_data = data.astype({"x": pd.SparseDtype("uint8", fill_value=0)})
+    matrix = DesignMatrix(sparse_data)
+    rows = data["z"].to_numpy()
+    pd.testing.assert_frame_equal(
+        matrix.frame(["y", "x", "z"], constant=True, rows=rows),
+        dense.frame(["y", "x", "z"], constant=True, rows=rows),
+    )
+    pd.testing.assert_series_equal(matrix.series("x"), dense.series("x"))
+    assert matrix.columns[2] == "x"
+    assert 2 not in matrix._values
+
+
+def test_design_matrix_virtual_columns(data):
+    data.attrs["virtual_columns"] = {"x_z": "x * z", "n_x_z": "(1 - x) * x_z"}
+    matrix = DesignMatrix(data)
+    assert list(matrix.columns) == ["const", "y", "x", "z", "one", "x_z", "n_x_z"]
+    result = matrix.frame(["x_z", "y"], constant=True)
+    np.testing.assert_array_equal(result["x_z"], data["x"] * data["z"])
+    np.testing.assert_array_equal(matrix.series("n_x_z"), np.zeros(5))
+    assert list(result.columns) == ["const", "x_z", "y"]
@@ -0,0 +1,185 @@
+import pickle
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from di_tella_2004_replication.analysis.design_matrix import design_matrix
+from di_tella_2004_replication.analysis.fixed_effects import (
+    Absorber,
+    block_absorber,
+    fit_entity_effects,
+)
+from linearmodels import PanelOLS
+from linearmodels.iv.absorbing import AbsorbingLS
+from linearmodels.panel.utility import AbsorbingEffectWarning
+
+
+@pytest.fixture()
+def panel():
+    rng = np.random.default_rng(0)
+    index = pd.MultiIndex.from_product([range(40), range(6)], names=["block", "month"])
+    x = pd.DataFrame(
+        {
+            "const": 1.0,
+            "treatment": rng.integers(0, 2, len(index)).astype(float),
+            "month_dummy": (index.get_level_values("month") > 2).astype(float),
+        },
+        index=index,
+    )
+    effects = np.repeat(rng.normal(size=40), 6)
+    y = pd.DataFrame(
+        {
+            "y1": x["treatment"] + effects + rng.normal(size=len(index)),
+            "y2": rng.poisson(1.0, len(index)).astype(float),
+        },
+        index=index,
+    )
+    return y, x
+
+
+@pytest.mark.parametrize("time_effects", [False, True])
+@pytest.mark.parametrize("weighted", [False, True])
+def test_fit_entity_effects_matches_panel_ols(panel, time_effects, weighted):
+    y, x = panel
+    # Drop some observations, so that the panel is unbalanced.
+    y, x = y.drop(y.index[::7]), x.drop(x.index[::7])
+    weights = None
+    if weighted:
+        weights = pd.Series(np.linspace(0.5, 2.0, len(y)), index=y.index)
+    options = {
+        "time_effects": time_effects,
+        "weights": weights,
+        "drop_absorbed": time_effects,
+    }
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", AbsorbingEffectWarning)
+        results = fit_entity_effects(y, x, **options)
+    for name in y.columns:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", AbsorbingEffectWarning)
+            expected = PanelOLS(y[name], x, entity_effects=True, **options).fit(
+                cov_type="clustered",
+                cluster_entity=True,
+            )
+        result = results[name]
+        pd.testing.assert_series_equal(result.params, expected.params)
+        pd.testing.assert_frame_equal(result.cov, expected.cov)
+        for stat in [
+            "rsquared",
+            "rsquared_between",
+            "rsquared_overall",
+            "rsquared_within",
+            "corr_squared_overall",
+            "corr_squared_between",
+            "corr_squared_within",
+            "loglik",
+            "s2",
+        ]:
+            assert getattr(result, stat) == pytest.approx(getattr(expected, stat))
+        assert result.f_statistic.stat == pytest.approx(expected.f_statistic.stat)
+        assert result.f_statistic_robust.stat == pytest.approx(
+            expected.f_statistic_robust.stat,
+        )
+        assert result.f_pooled.stat == pytest.approx(expected.f_pooled.stat)
+        pd.testing.assert_series_equal(result.entity_info, expected.entity_info)
+        pd.testing.assert_series_equal(result.time_info, expected.time_info)
+        assert result.model.dependent.vars == [name]
+        assert list(result.model.exog.vars) == list(expected.model.exog.vars)
+        pd.testing.assert_frame_equal(
+            result.estimated_effects,
+            expected.estimated_effects,
+        )
+
+
+def test_fit_entity_effects_weakly_connected_two_way_panel():
+    # Every entity is seen in two adjacent periods, shared with one other entity,
+    # where alternating projections converge too slowly.
+    rng = np.random.default_rng(0)
+    entity = np.repeat(np.arange(500), 2)
+    period = entity // 2 + np.tile([0, 1], 500)
+    index = pd.MultiIndex.from_arrays([entity, period], names=["block", "month"])
+    x = pd.DataFrame({"const": 1.0, "x": rng.normal(size=len(index))}, index=index)
+    y = pd.DataFrame({"y": -0.4 * x["x"] + rng.normal(size=len(index))}, index=index)
+    result = fit_entity_effects(y, x, time_effects=True)["y"]
+    expected = PanelOLS(y["y"], x, entity_effects=True, time_effects=True).fit(
+        cov_type="clustered",
+        cluster_entity=True,
+    )
+    pd.testing.assert_series_equal(result.params, expected.params)
+    pd.testing.assert_frame_equal(result.cov, expected.cov)
+
+
+def test_fit_entity_effects_results_pickle(panel):
+    results = pickle.loads(pickle.dumps(fit_entity_effects(*panel)))
+    assert results["y2"].summary.tables[1].data[1][0] == "const"
+
+
+def test_fit_entity_effects_drops_absorbed_regressors(panel):
+    y, x = panel
+    with pytest.warns(AbsorbingEffectWarning, match="month_dummy"):
+        results = fit_entity_effects(y, x, time_effects=True, drop_absorbed=True)
+    assert list(results["y1"].params.index) == ["const", "treatment"]
+
+
+def test_fit_entity_effects_rejects_missing_values(panel):
+    y, x = panel
+    y.iloc[3, 1] = np.nan
+    with pytest.raises(ValueError, match="missing values"):
+        fit_entity_effects(y, x)
+
+
+@pytest.fixture()
+def flat_panel(panel):
+    y, x = panel
+    return pd.concat([y, x.drop(columns="const")], axis=1).reset_index()
+
+
+@pytest.mark.parametrize("categorical", [True, False])
+def test_absorber_matches_absorbing_ls(flat_panel, categorical):
+    matrix = design_matrix(flat_panel)
+    absorb = matrix.frame(["block"])
+    if categorical:
+        absorb = absorb.astype("category")
+    absorber = Absorber(matrix, ["treatment", "month_dummy"], absorb)
+    fits = [
+        {"cov_type": "robust", "debiased": True},
+        {"cov_type": "clustered"},
+        {"cov_type": "clustered", "debiased": True, "clusters": absorb},
+        {"cov_type": "clustered", "clusters": matrix.frame(["block", "month"])},
+        {"cov_type": "unadjusted"},
+    ]
+    for fit in fits:
+        results = absorber.fit(matrix.frame(["y1", "y2"]), **fit)
+        for name in ["y1", "y2"]:
+            expected = AbsorbingLS(
+                matrix.series(name),
+                matrix.frame(["treatment", "month_dummy"], constant=True),
+                absorb=absorb,
+                drop_absorbed=True,
+            ).fit(**fit)
+            result = results[name]
+            pd.testing.assert_series_equal(result.params, expected.params)
+            pd.testing.assert_frame_equal(result.cov, expected.cov)
+            assert result.df_model == expected.df_model
+            assert result.rsquared == pytest.approx(expected.rsquared)
+            assert result.f_statistic.stat == pytest.approx(expected.f_statistic.stat)
+            assert result.rsquared_adj == pytest.approx(expected.rsquared_adj)
+            assert result.absorbed_rsquared == pytest.approx(expected.absorbed_rsquared)
+            assert result.s2 == pytest.approx(expected.s2)
+            assert result.model.dependent.cols == [name]
+
+
+def test_absorber_rejects_other_covariances(flat_panel):
+    matrix = design_matrix(flat_panel)
+    absorber = Absorber(matrix, ["treatment"], matrix.frame(["block"]))
+    with pytest.raises(ValueError, match="kernel"):
+        absorber.fit(matrix.frame(["y1"]), cov_type="kernel")
+
+
+def test_block_absorber_is_cached_per_design_matrix(flat_panel):
+    matrix = design_matrix(flat_panel)
+    absorber = block_absorber(matrix, ["treatment"])
+    assert block_absorber(matrix, ["treatment"]) is absorber
+    assert block_absorber(matrix, ["month_dummy"]) is not absorber
+    assert block_absorber(design_matrix(flat_panel), ["treatment"]) is not absorber
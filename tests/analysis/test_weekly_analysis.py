@@ -18,6 +18,11 @@ def test_abs_regression_models_weekly(weekly_data):
     assert isinstance(abs_results, absorbing.AbsorbingLSResults)
 
 
+def test_abs_regression_models_weekly_two_way(weekly_data):
+    abs_results = abs_regression_models_weekly(weekly_data, "two_way")
+    assert abs_results.cov_config["clusters"].shape == (len(weekly_data), 2)
+
+
 def test_abs_regression_models_av_weekly(weekly_data):
     abs_results = abs_regression_models_av_weekly(weekly_data)
     assert isinstance(abs_results, absorbing.AbsorbingLSResults)
@@ -1,18 +1,18 @@
+import numpy as np
 import pandas as pd
 import pyreadstat
 import pytest
 from di_tella_2004_replication.config import SRC
 from di_tella_2004_replication.data_management.clean_MonthlyPanel import (
     _clean_column_names_mon,
-    _complex_variable_generator,
-    _egenerator_sum,
-    _generate_dummy_variables_fixed_extension,
-    _generate_similar_named_variables,
-    _generate_variables_based_on_various_lists,
-    _generate_variables_different_conditions,
-    _generate_various_variables_conditional,
-    _rep_variables_based_on_condition,
+    _monthly_plans,
+    monthly_panels,
+    monthlypanel_1,
+    monthlypanel_2,
+    monthlypanel_3,
+    monthlypanel_new,
 )
+from di_tella_2004_replication.data_management.derived_variables import run_plan
 
 
 @pytest.fixture()
@@ -22,24 +22,18 @@ def original_data():
 
 
 @pytest.fixture()
-def input_data_generate_similar_named_variables():
-    df = pd.DataFrame(
+def cleaned_panel():
+    return pd.DataFrame(
         {
-            "cuad0": [1, 2, 3],
-            "cuad1": [4, 5, 6],
-            "cuad2": [7, 8, 9],
-            "cuad3": [10, 11, 12],
-            "cuad4": [13, 14, 15],
-            "post": [25, 26, 27],
+            "observ": [1, 1, 1, 1, 2, 2, 2],
+            "neighborhood": ["Belgrano"] * 4 + ["Once"] * 3,
+            "month": [4, 72, 8, 73, 5, 73, 72],
+            "distance_to_jewish_inst": [0, 0, 0, 0, 2, 2, 2],
+            "jewish_inst": [1, 1, 1, 1, 0, 0, 0],
+            "jewish_inst_one_block_away": [1, 1, 1, 1, 0, 0, 0],
+            "total_thefts": [1.0, 0.25, 2.0, 1.0, 0.5, 1.0, 0.5],
         },
     )
-    original_variables = (["cuad0", "cuad1", "cuad2", "cuad3", "cuad4"],)
-    fixed_variable = "post"
-    return (
-        df,
-        original_variables,
-        fixed_variable,
-    )
 
 
 def test_clean_column_names_mon(original_data):
@@ -62,318 +56,130 @@ def test_clean_column_names_mon(original_data):
     assert all(col in list_var for col in new_df.columns)
 
 
-def test_generate_dummy_variables_fixed_extension():
-    df = pd.DataFrame(
-        {"month": [5, 6, 7, 8, 9], "variable_conditional_extension": [5, 6, 7, 8, 9]},
-    )
+def test_monthly_plans_are_compiled_once():
+    assert _monthly_plans() is _monthly_plans()
 
-    new_df = _generate_dummy_variables_fixed_extension(
-        df,
-        "variable_conditional_extension",
-        "month{}",
-        range_loop=range(5, 13),
-        original_value_variable=0,
-        final_value_variable=1,
-    )
 
-    expected_columns = [
-        "month5",
-        "month6",
-        "month7",
-        "month8",
-        "month9",
-        "month10",
-        "month11",
-        "month12",
+def test_monthlypanel_1_plan_indicators(cleaned_panel):
+    result = run_plan(cleaned_panel, _monthly_plans()["monthlypanel_1"])
+    assert result[["observ", "month"]].values.tolist() == [
+        [1, 4],
+        [1, 8],
+        [1, 72],
+        [1, 73],
+        [2, 5],
+        [2, 72],
+        [2, 73],
     ]
-    assert set(expected_columns).issubset(set(new_df.columns))
-
-
-def test_rep_variables_based_on_condition():
-    df = pd.DataFrame(
-        {"conditional_var": [10, 20, 30, 40, 50], "var_to_replace": [0, 0, 0, 0, 0]},
-    )
-
-    new_df = _rep_variables_based_on_condition(
-        df,
-        "bigger than",
-        "conditional_var",
-        "var_to_replace",
-        25,
-        1,
-    )
-
-    assert list(new_df["var_to_replace"]) == [0, 0, 1, 1, 1]
-
-
-@pytest.fixture()
-def input_data_generate_similar_named_variables():
-    df = pd.DataFrame(
-        {"cuad0": [1, 1, 1], "cuad1": [1, 1, 1], "fixed": [1, 2, 3]},
-    )
-    original_variables = ["cuad0", "cuad1"]
-    fixed_variable = "fixed"
-    return (df, original_variables, fixed_variable)
-
-
-def test_generate_similar_named_variables(input_data_generate_similar_named_variables):
-    (
-        df,
-        original_variables,
-        fixed_variable,
-    ) = input_data_generate_similar_named_variables
-
-    new_df = _generate_similar_named_variables(
-        df,
-        original_variables,
-        fixed_variable,
+    assert {f"month{i}" for i in range(5, 13)}.issubset(result.columns)
+    assert list(result["month5"]) == [0, 0, 0, 0, 1, 0, 0]
+    assert list(result["month8"]) == [0, 1, 0, 0, 0, 0, 0]
+    assert list(result["post"]) == [0, 1, 1, 1, 0, 1, 1]
+    assert list(result["cuad2"]) == [0, 0, 0, 0, 1, 1, 1]
+    assert list(result["cuad0p"]) == [0, 1, 1, 1, 0, 0, 0]
+    assert list(result["cuad2p"]) == [0, 0, 0, 0, 0, 1, 1]
+
+
+def test_monthlypanel_1_plan_codes(cleaned_panel):
+    result = run_plan(cleaned_panel, _monthly_plans()["monthlypanel_1"])
+    assert list(result["code"]) == [1, 1, 1, 1, 3, 3, 3]
+    assert list(result["othermonth1"]) == [4, 8, 7.2, 7.3, 5, 7.2, 7.3]
+    assert list(result["jewish_inst_p"]) == [0, 1, 1, 1, 0, 0, 0]
+
+
+def test_monthlypanel_1_plan_total_thefts2(cleaned_panel):
+    result = run_plan(cleaned_panel, _monthly_plans()["monthlypanel_1"])
+    assert list(result["total_thefts2"]) == [1.0, 2.0, 0.25, 1.25, 0.5, 0.5, 1.5]
+
+
+def test_monthlypanel_2_plan(cleaned_panel):
+    plans = _monthly_plans()
+    result = run_plan(
+        run_plan(cleaned_panel, plans["monthlypanel_1"]),
+        plans["monthlypanel_2"],
+    )
+    assert result[["observ", "month"]].values.tolist() == [[1, 4], [1, 8], [2, 5]]
+    np.testing.assert_allclose(result["total_thefts_c"], [1.0, 60 / 31, 15 / 17])
+    assert list(result["totalpre"]) == [1.0, 1.0, 0.5]
+    assert list(result["totalpos"]) == [2.0, 2.0, 0.0]
+    np.testing.assert_array_equal(result["theftscoll"], [0.25, 0.4, np.nan])
+    assert list(result["code2"]) == [1004, 1008, 2005]
+    assert list(result["mbelgapr"]) == [1, 0, 0]
+    assert list(result["mbelgago"]) == [0, 1, 0]
+    assert list(result["moncemay"]) == [0, 0, 1]
+
+
+def test_monthlypanel_1_dtype_plan(original_data):
+    result = monthlypanel_1(original_data)
+    assert result["observ"].dtype == "int16"
+    assert result["neighborhood"].dtype == "category"
+    assert (result[[f"cuad{i}" for i in range(8)]].dtypes == "uint8").all()
+    assert not any(
+        isinstance(dtype, pd.api.extensions.ExtensionDtype)
+        and not isinstance(dtype, pd.CategoricalDtype)
+        for dtype in result.dtypes
+    )
+
+
+def _total_thefts2_reference(df, cond1=72, cond2=73):
+    running_sums = {}
+    values = []
+    for observ, month, thefts in zip(df["observ"], df["month"], df["total_thefts"]):
+        if month in [cond1, cond2]:
+            running_sums[observ] = running_sums.get(observ, 0) + thefts
+            values.append(running_sums[observ])
+        else:
+            values.append(thefts)
+    return pd.Series(values, index=df.index, name="total_thefts2", dtype=float)
+
+
+def test_monthlypanel_1_total_thefts2_matches_reference(original_data):
+    result = monthlypanel_1(original_data[monthlypanel_1.raw_columns])
+    pd.testing.assert_series_equal(
+        result["total_thefts2"],
+        _total_thefts2_reference(result),
+        check_dtype=False,
+    )
+
+
+def test_monthly_panels_match_stage_by_stage_cleaning(original_data, tmp_path):
+    panels = monthly_panels(original_data[monthly_panels.raw_columns])
+
+    expected = monthlypanel_1(original_data[monthlypanel_1.raw_columns])
+    expected.to_pickle(tmp_path / "MonthlyPanel.pkl")
+    expected2 = monthlypanel_2(pd.read_pickle(tmp_path / "MonthlyPanel.pkl"))
+    expected2.to_pickle(tmp_path / "MonthlyPanel2.pkl")
+    expected3 = monthlypanel_3(pd.read_pickle(tmp_path / "MonthlyPanel2.pkl"))
+
+    pd.testing.assert_frame_equal(panels["MonthlyPanel"], expected)
+    pd.testing.assert_frame_equal(panels["MonthlyPanel2"], expected2)
+    pd.testing.assert_frame_equal(panels["MonthlyPanel3"], expected3)
+
+
+def test_monthlypanel_new_from_monthlypanel_1_matches_raw_cleaning(original_data):
+    expected = _clean_column_names_mon(original_data[monthlypanel_1.raw_columns].copy())
+    expected["jewish_inst_one_block_away_1"] = (
+        expected["jewish_inst_one_block_away"] - expected["jewish_inst"]
+    )
+    expected["cuad2"] = (expected["distance_to_jewish_inst"] == 2).astype(int)
+    for i in range(5, 8):
+        expected[f"month{i}"] = (expected["month"] == i).astype(int)
+    for i, first_month in enumerate([5, 6, 7], start=1):
+        expected[f"post{i}"] = (expected["month"] >= first_month).astype(int)
+    for n in ["one", "two", "three"]:
+        expected[f"{n}_jewish_inst_1_p"] = expected["jewish_inst"] * expected["post1"]
+        expected[f"{n}_jewish_inst_one_block_away_1_p"] = (
+            expected["jewish_inst_one_block_away_1"] * expected["post2"]
+        )
+        expected[f"{n}_cuad2p"] = expected["cuad2"] * expected["post3"]
+
+    result = monthlypanel_new(
+        monthlypanel_1(original_data[monthlypanel_1.raw_columns]),
+    )
+    assert list(result.columns) == list(expected.columns)
+    assert result.index.equals(expected.index)
+    pd.testing.assert_frame_equal(
+        result.drop(columns=["observ", "neighborhood", "street"]),
+        expected.drop(columns=["observ", "neighborhood", "street"]),
+        check_dtype=False,
     )
-
-    list_var = ["cuad0p", "cuad1p"]
-    assert all(col in new_df.columns for col in list_var)
-
-
-"_generate_variables_different_conditions"
-
-
-@pytest.fixture()
-def input_data_generate_variables_different_conditions():
-    df = pd.DataFrame({"var1": [1, 2, 3, 4, 5], "var_con": [5, 7, 8, 10, 12]})
-    new_variable_v_cond = "new"
-    ori_variable_v_cond = "var1"
-    variable_conditional_v_cond = "var_con"
-    multiple1_v_cond = 0.5
-    multiple2_v_cond = 0.75
-    return (
-        df,
-        new_variable_v_cond,
-        ori_variable_v_cond,
-        variable_conditional_v_cond,
-        multiple1_v_cond,
-        multiple2_v_cond,
-    )
-
-
-def test_generate_variables_different_conditions(
-    input_data_generate_variables_different_conditions,
-):
-    (
-        df,
-        new_variable_v_cond,
-        ori_variable_v_cond,
-        variable_conditional_v_cond,
-        multiple1_v_cond,
-        multiple2_v_cond,
-    ) = input_data_generate_variables_different_conditions
-
-    new_df = _generate_variables_different_conditions(
-        df,
-        new_variable_v_cond,
-        ori_variable_v_cond,
-        variable_conditional_v_cond,
-        multiple1_v_cond=multiple1_v_cond,
-        multiple2_v_cond=multiple2_v_cond,
-    )
-
-    assert "new" in new_df.columns
-
-    tolerance = 1e-9
-    assert new_df.loc[0, "new"] == pytest.approx(0.5, rel=tolerance, abs=tolerance)
-
-
-@pytest.fixture()
-def input_data_egenerator_sum():
-    df = pd.DataFrame(
-        {
-            "by": [1, 1, 2, 2, 2],
-            "filter": [3, 4, 5, 6, 7],
-            "conditional": [8, 8, 9, 9, 9],
-            "egenerator": [10, 11, 12, 13, 14],
-        },
-    )
-    new_egenerator_variable = "variable_new"
-    by_variable = "by"
-    variable_egenerator_filter = "filter"
-    condional_egenerator_variable = "conditional"
-    egenerator_variable_tochange = "egenerator"
-    return (
-        df,
-        new_egenerator_variable,
-        by_variable,
-        variable_egenerator_filter,
-        condional_egenerator_variable,
-        egenerator_variable_tochange,
-    )
-
-
-def test_egenerator_sum(input_data_egenerator_sum):
-    (
-        df,
-        new_egenerator_variable,
-        by_variable,
-        variable_egenerator_filter,
-        condional_egenerator_variable,
-        egenerator_variable_tochange,
-    ) = input_data_egenerator_sum
-
-    new_df = _egenerator_sum(
-        df,
-        new_egenerator_variable,
-        by_variable,
-        variable_egenerator_filter,
-        condional_egenerator_variable,
-        egenerator_variable_tochange,
-    )
-
-    assert new_df[new_egenerator_variable].equals(pd.Series([7, 7, 18, 18, 18]))
-
-
-@pytest.fixture()
-def input_data_complex_variable_generator():
-    df = pd.DataFrame(
-        {
-            "month": [1, 2, 3, 4, 5],
-            "neighborhood": ["Belgrano", "Once", "V. Crespo", "Belgrano", "Once"],
-            "n_neighborhood": [0, 0, 0, 0, 0],
-        },
-    )
-    list_names_complexa = ["Belgrano", "Once", "V. Crespo"]
-    variable_replace_condition_complex = "neighborhood"
-    variable_replace_complex = "n_neighborhood"
-    generate_var_complex = "code2"
-    variable_condition_complex = "month"
-    list_names_complexb = ["belgrano", "once", "vcrespo"]
-    return (
-        df,
-        list_names_complexa,
-        variable_replace_condition_complex,
-        variable_replace_complex,
-        generate_var_complex,
-        variable_condition_complex,
-        list_names_complexb,
-    )
-
-
-def test_complex_variable_generator(input_data_complex_variable_generator):
-    (
-        df,
-        list_names_complexa,
-        variable_replace_condition_complex,
-        variable_replace_complex,
-        generate_var_complex,
-        variable_condition_complex,
-        list_names_complexb,
-    ) = input_data_complex_variable_generator
-
-    new_df = _complex_variable_generator(
-        df,
-        list_names_complexa,
-        variable_replace_condition_complex,
-        variable_replace_complex,
-        generate_var_complex,
-        variable_condition_complex,
-        list_names_complexb,
-    )
-
-    expected_generate_var = pd.Series([1001, 2002, 3003, 1004, 2005], name="code2")
-    pd.testing.assert_series_equal(new_df[generate_var_complex], expected_generate_var)
-
-
-@pytest.fixture()
-def input_data_generate_variables_based_on_various_lists():
-    df = pd.DataFrame(
-        {
-            "month4": [1, 2, 3, 4, 5],
-            "month5": [6, 7, 8, 9, 10],
-            "month6": [11, 12, 13, 14, 15],
-            "month7": [16, 17, 18, 19, 20],
-            "month8": [21, 22, 23, 24, 25],
-            "month9": [26, 27, 28, 29, 30],
-            "month10": [31, 32, 33, 34, 35],
-            "month11": [36, 37, 38, 39, 40],
-            "month12": [41, 42, 43, 44, 45],
-            "belgrano": [1, 2, 3, 4, 5],
-            "once": [6, 7, 8, 9, 10],
-            "vcrespo": [11, 12, 13, 14, 15],
-        },
-    )
-    list_names_variouslists = ["belgrano", "once", "vcrespo"]
-    return (df, list_names_variouslists)
-
-
-def test_generate_variables_based_on_various_lists(
-    input_data_generate_variables_based_on_various_lists,
-):
-
-    (df, list_names_variouslists) = input_data_generate_variables_based_on_various_lists
-
-    new_df = _generate_variables_based_on_various_lists(df, list_names_variouslists)
-
-    assert list(new_df["mbelgapr"]) == [1, 4, 9, 16, 25]
-    assert list(new_df["monceapr"]) == [6, 14, 24, 36, 50]
-    assert list(new_df["mvcreapr"]) == [11, 24, 39, 56, 75]
-
-
-@pytest.fixture()
-def input_data_generate_variable_based_on_three_or_conditions():
-    df = pd.DataFrame(
-        {
-            "public_building_or_embassy": [0, 1, 0, 0],
-            "gas_station": [1, 0, 0, 1],
-            "bank": [0, 1, 0, 0],
-        },
-    )
-    generate_variable_three_conditions = "all_locations"
-    column1_three_conditions = "public_building_or_embassy"
-    column2_three_conditions = "gas_station"
-    column3_three_conditions = "bank"
-    return (
-        df,
-        generate_variable_three_conditions,
-        column1_three_conditions,
-        column2_three_conditions,
-        column3_three_conditions,
-    )
-
-
-@pytest.fixture()
-def input_data_generate_multiplevariables_listbased():
-    df = pd.DataFrame(
-        {
-            "var1": [1, 2, 3],
-            "var2": [4, 5, 6],
-            "var3": [7, 8, 9],
-            "var4": [10, 11, 12],
-        },
-    )
-    return df
-
-
-@pytest.fixture()
-def input_data_generate_various_variables_conditional():
-    df = pd.DataFrame({"month": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]})
-    list_genenerate_variables_conditional = ["post1", "post2", "post3"]
-    conditional_variable = "month"
-    return (df, list_genenerate_variables_conditional, conditional_variable)
-
-
-def test_generate_various_variables_conditional(
-    input_data_generate_various_variables_conditional,
-):
-    (
-        df,
-        list_genenerate_variables_conditional,
-        conditional_variable,
-    ) = input_data_generate_various_variables_conditional
-
-    # Call the function being tested
-    new_df = _generate_various_variables_conditional(
-        df,
-        list_genenerate_variables_conditional,
-        conditional_variable,
-    )
-
-    # Quick asserts
-    assert list(new_df["post1"]) == [0, 0, 0, 0, 1, 1, 1, 1, 1, 1]
-    assert list(new_df["post2"]) == [0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
-    assert list(new_df["post3"]) == [0, 0, 0, 0, 0, 0, 1, 1, 1, 1]
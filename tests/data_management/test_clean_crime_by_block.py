@@ -3,17 +3,20 @@ import pyreadstat
 import pytest
 from di_tella_2004_replication.config import SRC
 from di_tella_2004_replication.data_management.clean_crime_by_block import (
-    _calculate_theft_differences,
-    _calculate_total_theft_by_suffix,
     _clean_column_names_block,
     _convert_dtypes,
     _create_new_variables,
+    _create_new_variables_block,
     _create_new_variables_ind,
-    _create_panel_data,
-    _split_theft_data,
+    _theft_panel,
+    block_table,
+    clean_crime_by_block,
+    crime_by_block_panel,
+    ind_char_table,
     process_crime_by_block,
     process_ind_char_data,
 )
+from di_tella_2004_replication.data_management.panel_tables import join_dimension
 
 
 @pytest.fixture()
@@ -71,35 +74,6 @@ def theft_df():
     )
 
 
-@pytest.fixture()
-def theft_df_expected_cols():
-    return [
-        "block",
-        "theft1",
-        "theft1val",
-        "theft2",
-        "theft2val",
-        "theft1hour",
-        "theft2hour",
-        "theft1day",
-        "theft2day",
-        "theft1month",
-        "theft2month",
-        "theft_hv11",
-        "theft_lv11",
-        "theft_night11",
-        "theft_day11",
-        "theft_weekday11",
-        "theft_weekend11",
-        "theft_hv21",
-        "theft_lv21",
-        "theft_night21",
-        "theft_day21",
-        "theft_weekday21",
-        "theft_weekend21",
-    ]
-
-
 @pytest.fixture()
 def expected_total_theft_by_suffix():
     return {
@@ -148,9 +122,61 @@ def test_convert_dtypes(expected_df):
     )
 
 
-def test_split_theft_data_shape(theft_df):
-    theft_data = _split_theft_data(theft_df, month=1, maxrange=3)
-    assert theft_data.shape == (2, 23)
+def test_theft_panel_shape(theft_df):
+    panel = _theft_panel(theft_df.set_index("block"), months=[1], maxrange=3)
+    assert panel.shape == (2, 11)
+
+
+@pytest.mark.parametrize(
+    ("suffix", "expected"),
+    [
+        ("hv", [0, 0, 1, 0.25]),
+        ("lv", [1, 0, 0, 0]),
+        ("night", [1, 0, 0, 0.25]),
+        ("day", [0, 0, 1, 0]),
+        ("weekday", [1, 0, 0, 0.25]),
+        ("weekend", [0, 0, 1, 0]),
+    ],
+)
+def test_theft_panel_totals(theft_df, suffix, expected):
+    panel = _theft_panel(theft_df.set_index("block"), months=[1, 2], maxrange=3)
+    assert panel[f"tot_theft_{suffix}"].tolist() == expected
+
+
+def test_theft_panel_values(theft_df):
+    theft_df["theft1corner"] = [0, 1]
+    theft_df["theft2corner"] = [0, 0]
+    panel = _theft_panel(theft_df.set_index("block"), months=[1, 2], maxrange=3)
+    assert panel["block"].tolist() == [1, 1, 2, 2]
+    assert panel["month"].tolist() == [1, 2, 1, 2]
+    assert panel["month"].dtype == "int8"
+    assert panel["tot_theft_lv"].tolist() == [1, 0, 0, 0]
+    assert panel["tot_theft_hv"].tolist() == [0, 0, 0.25, 0.25]
+    assert panel["dif_night_day"].tolist() == [1, 0, -0.25, 0.25]
+    assert panel.shape == (4, 11)
+
+
+def _single_theft(slot, month, maxrange=24):
+    columns = {"block": [1]}
+    for i in range(1, maxrange):
+        stolen = i == slot
+        columns[f"theft{i}"] = [1.0 if stolen else 0.0]
+        columns[f"theft{i}val"] = [10000.0 if stolen else None]
+        columns[f"theft{i}hour"] = [12.0 if stolen else None]
+        columns[f"theft{i}day"] = [3.0 if stolen else None]
+        columns[f"theft{i}month"] = [float(month) if stolen else 0.0]
+    return pd.DataFrame(columns).set_index("block")
+
+
+@pytest.mark.parametrize("slot", [10, 11, 12, 21])
+@pytest.mark.parametrize("month", [10, 11])
+def test_theft_panel_counts_month_10_and_11_slots_once(slot, month):
+    panel = _theft_panel(_single_theft(slot, month=month)).set_index("month")
+    expected = [float(m == month) for m in range(4, 13)]
+    assert panel["tot_theft_hv"].tolist() == expected
+    assert panel["tot_theft_day"].tolist() == expected
+    assert panel["tot_theft_weekday"].tolist() == expected
+    assert (panel["tot_theft_lv"] == 0).all()
 
 
 def test_create_new_variables_ind(ind_char_new_variables):
@@ -166,50 +192,29 @@ def test_create_new_variables_ind(ind_char_new_variables):
     ]
 
 
-def test_calculate_total_thefts_by_suffix(original_data):
-    df = _clean_column_names_block(original_data)
-    df = _convert_dtypes(df)
-
-    theft_data = df.loc[:, df.columns.str.startswith("theft")]
-
-    for i in range(1, 24):
-        theft_data.loc[theft_data[f"theft{i}corner"] == 1, f"theft{i}"] = 0.25
-
-    for month in range(4, 13):
-        theft_data = _split_theft_data(theft_data, month)
-        theft_data = _calculate_total_theft_by_suffix(theft_data, month)
-        cols_list = [
-            f"tot_theft_{suffix}{month}"
-            for suffix in ["hv", "lv", "night", "day", "weekday", "weekend"]
-        ]
-
-    assert set(cols_list).issubset(set(theft_data.columns))
+def test_theft_panel_totals_by_suffix(original_data):
+    theft_data = clean_crime_by_block(original_data).filter(regex="^theft")
+    theft_panel = _theft_panel(theft_data)
+    cols_list = [
+        f"tot_theft_{suffix}"
+        for suffix in ["hv", "lv", "night", "day", "weekday", "weekend"]
+    ]
+    assert set(cols_list).issubset(set(theft_panel.columns))
+    assert len(theft_panel) == 9 * len(theft_data)
 
 
-def test_create_panel_data_and_new_variables(original_data):
+def test_create_new_variables(original_data):
     df = _clean_column_names_block(original_data)
     df = _convert_dtypes(df)
 
-    theft_data = df.loc[:, df.columns.str.startswith("theft")]
+    theft_data = _theft_panel(df.loc[:, df.columns.str.startswith("theft")])
     ind_char_data = df[[col for col in df.columns if not col.startswith("theft")]]
 
-    for i in range(1, 24):
-        theft_data.loc[theft_data[f"theft{i}corner"] == 1, f"theft{i}"] = 0.25
-
-    for month in range(4, 13):
-        theft_data = _split_theft_data(theft_data, month)
-        theft_data = _calculate_total_theft_by_suffix(theft_data, month)
-        theft_data = _calculate_theft_differences(theft_data, month)
-
-    theft_cols = [col for col in theft_data.columns if col.startswith("theft")]
-    theft_data = theft_data.drop(columns=theft_cols)
-    theft_data = theft_data.reset_index(names=["block"])
-
-    crime_by_block_panel = _create_panel_data(ind_char_data, theft_data)
     crime_by_block_panel = _create_new_variables(
-        crime_by_block_panel,
+        theft_data,
         time_variable="month",
         event_time=7,
+        blocks=_create_new_variables_block(ind_char_data),
     )
 
     assert not (
@@ -248,3 +253,39 @@ def test_process_ind_char_data(original_data):
     df = process_ind_char_data(original_data)
     assert not any(col.startswith("theft") for col in df.columns)
     assert not df.duplicated(subset=["census_district", "census_tract"]).any()
+
+
+def test_process_crime_by_block_raw_columns(original_data):
+    projected = original_data[process_crime_by_block.raw_columns]
+    pd.testing.assert_frame_equal(
+        process_crime_by_block(projected),
+        process_crime_by_block(original_data),
+    )
+
+
+def test_process_ind_char_data_raw_columns(original_data):
+    projected = original_data[process_ind_char_data.raw_columns]
+    pd.testing.assert_frame_equal(
+        process_ind_char_data(projected),
+        process_ind_char_data(original_data),
+    )
+
+
+def test_outputs_from_shared_base(original_data):
+    base = clean_crime_by_block(original_data)
+    pd.testing.assert_frame_equal(
+        join_dimension(crime_by_block_panel(base), block_table(base)),
+        process_crime_by_block(original_data),
+    )
+    pd.testing.assert_frame_equal(
+        ind_char_table(base),
+        process_ind_char_data(original_data),
+    )
+
+
+def test_panel_holds_no_block_characteristics(original_data):
+    base = clean_crime_by_block(original_data)
+    panel, blocks = crime_by_block_panel(base), block_table(base)
+    assert not set(panel.columns) & set(blocks.columns)
+    assert blocks.index.equals(panel.index.unique("block"))
+    assert "jewish_inst_only_one_block_away" in blocks.columns
@@ -0,0 +1,49 @@
+import tracemalloc
+import warnings
+
+import pandas as pd
+import pyreadstat
+import pytest
+from di_tella_2004_replication.config import SRC
+from di_tella_2004_replication.data_management.clean_crime_by_block import (
+    process_crime_by_block,
+    process_ind_char_data,
+)
+from di_tella_2004_replication.data_management.clean_MonthlyPanel import (
+    monthly_panels,
+)
+from di_tella_2004_replication.data_management.clean_WeeklyPanel import (
+    process_weekly_panel,
+)
+
+PROCESSORS = [
+    ("CrimeByBlock", process_crime_by_block),
+    ("CrimeByBlock", process_ind_char_data),
+    ("WeeklyPanel", process_weekly_panel),
+    ("MonthlyPanel", monthly_panels),
+]
+
+
+def _size(data):
+    frames = data.values() if isinstance(data, dict) else [data]
+    return sum(frame.memory_usage(deep=True).sum() for frame in frames)
+
+
+@pytest.mark.parametrize(("name", "process"), PROCESSORS)
+def test_processing_under_copy_on_write(name, process):
+    data, _ = pyreadstat.read_dta(SRC / "data" / f"{name}.dta")
+    data = data[process.raw_columns]
+    original = data.copy()
+
+    with pd.option_context("mode.copy_on_write", True), warnings.catch_warnings():
+        warnings.simplefilter("error", pd.errors.PerformanceWarning)
+        warnings.simplefilter("error", pd.errors.SettingWithCopyWarning)
+        tracemalloc.start()
+        try:
+            result = process(data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    pd.testing.assert_frame_equal(data, original)
+    assert peak < 1.6 * max(_size(data), _size(result))
@@ -0,0 +1,217 @@
+import numpy as np
+import pandas as pd
+import pyreadstat
+import pytest
+from di_tella_2004_replication.config import SRC
+from di_tella_2004_replication.data_management.clean_MonthlyPanel import (
+    _clean_column_names_mon,
+    monthlypanel_1,
+)
+from di_tella_2004_replication.data_management.derived_variables import (
+    compile_plan,
+    evaluate_virtual,
+    group_cumsum,
+    group_sum,
+    load_plans,
+    run_plan,
+)
+
+
+@pytest.fixture()
+def panel():
+    return pd.DataFrame(
+        {
+            "observ": [2, 1, 2, 1],
+            "month": [5, 5, 4, 4],
+            "thefts": [1.0, np.nan, 3.0, 2.0],
+        },
+    )
+
+
+def test_compile_plan_expands_for(panel):
+    plan = compile_plan(
+        {
+            "variables": [
+                {
+                    "for": {"i": [4, 5], "s": ["a", "b"]},
+                    "define": {"m{s}": "month == {i}"},
+                },
+            ],
+        },
+    )
+    result = run_plan(panel, plan)
+    assert plan["variables"] == ["ma", "mb"]
+    assert result["ma"].tolist() == [False, False, True, True]
+    assert result["mb"].tolist() == [True, True, False, False]
+
+
+def test_run_plan_resolves_dependencies(panel):
+    plan = compile_plan(
+        {
+            "variables": [
+                {
+                    "define": {
+                        "total": "group_sum(thefts2, observ)",
+                        "thefts2": "thefts * 2",
+                    },
+                },
+            ],
+        },
+    )
+    result = run_plan(panel, plan)
+    assert plan["evaluation_order"] == ["thefts2", "total"]
+    assert list(result.columns) == ["observ", "month", "thefts", "total", "thefts2"]
+    assert result["total"].tolist() == [8.0, 4.0, 8.0, 4.0]
+
+
+def test_run_plan_drops_sorts_and_replaces_in_place(panel):
+    plan = compile_plan(
+        {
+            "drop": "month == 5",
+            "sort": ["observ"],
+            "variables": [{"define": {"w": 0.25, "thefts": "where(thefts > 2, 1, 0)"}}],
+        },
+    )
+    result = run_plan(panel, plan)
+    assert list(result.columns) == ["observ", "month", "thefts", "w"]
+    assert result.index.tolist() == [3, 2]
+    assert result["thefts"].tolist() == [0, 1]
+    assert result["w"].tolist() == [0.25, 0.25]
+    assert panel["thefts"].tolist()[2] == 3.0
+
+
+def test_run_plan_builds_the_indicators_of_a_column_once(panel, monkeypatch):
+    from di_tella_2004_replication.data_management import indicators
+
+    calls = []
+    build = indicators.indicator_matrix
+    monkeypatch.setattr(
+        indicators,
+        "indicator_matrix",
+        lambda *args: calls.append(args) or build(*args),
+    )
+    plan = compile_plan(
+        {
+            "variables": [
+                {
+                    "for": {"i": [4, 5]},
+                    "define": {"month{i}": "indicator(month, [4, 5], {i})"},
+                },
+            ],
+        },
+    )
+    result = run_plan(panel, plan)
+    assert result["month4"].tolist() == [0, 0, 1, 1]
+    assert result["month5"].tolist() == [1, 1, 0, 0]
+    run_plan(panel, plan)
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize(
+    "variables",
+    [
+        [{"define": {"x": "month.sum()"}}],
+        [{"define": {"x": "__import__('os')"}}],
+        [{"define": {"x": "y + 1", "y": "x + 1"}}],
+        [{"define": {"x": "month"}}, {"define": {"x": "observ"}}],
+    ],
+)
+def test_compile_plan_rejects_invalid_specification(variables):
+    with pytest.raises(ValueError):
+        compile_plan({"variables": variables})
+
+
+def test_group_helpers(panel):
+    assert group_sum(panel["thefts"].to_numpy(), panel["observ"]).tolist() == [
+        4.0,
+        2.0,
+        4.0,
+        2.0,
+    ]
+    running = group_cumsum(panel["thefts"].to_numpy(), panel["observ"])
+    np.testing.assert_array_equal(running, [1.0, np.nan, 4.0, 2.0])
+
+
+def test_monthly_specification_compiles():
+    plans = load_plans()
+    assert list(plans) == [
+        "monthlypanel_1",
+        "monthlypanel_2",
+        "monthlypanel_3",
+        "monthlypanel_new",
+    ]
+
+
+def test_monthlypanel_1_matches_step_by_step_cleaning():
+    data, _ = pyreadstat.read_dta(SRC / "data" / "MonthlyPanel.dta")
+    expected = _clean_column_names_mon(data[monthlypanel_1.raw_columns].copy())
+    for i in range(5, 13):
+        expected[f"month{i}"] = (expected["month"] == i).astype(int)
+    expected["jewish_inst_one_block_away_1"] = (
+        expected["jewish_inst_one_block_away"] - expected["jewish_inst"]
+    )
+    expected["post"] = (expected["month"] > 7).astype(int)
+    for i in range(8):
+        expected[f"cuad{i}"] = (expected["distance_to_jewish_inst"] == i).astype(int)
+    for i in range(8):
+        expected[f"cuad{i}p"] = expected[f"cuad{i}"] * expected["post"]
+    expected["code"] = 4
+    for code, column in enumerate(
+        ["jewish_inst", "jewish_inst_one_block_away_1", "cuad2"],
+        start=1,
+    ):
+        expected.loc[expected[column] == 1, "code"] = code
+    expected["jewish_inst_p"] = expected["jewish_inst"] * expected["post"]
+    expected["jewish_inst_one_block_away_1_p"] = (
+        expected["jewish_inst_one_block_away_1"] * expected["post"]
+    )
+    expected["othermonth1"] = expected["month"].replace({72: 7.2, 73: 7.3})
+    expected = expected.sort_values(["observ", "month"])
+    in_72_73 = expected["month"].isin([72, 73])
+    expected["total_thefts2"] = expected["total_thefts"].where(
+        ~in_72_73,
+        expected["total_thefts"].where(in_72_73).groupby(expected["observ"]).cumsum(),
+    )
+
+    result = monthlypanel_1(data[monthlypanel_1.raw_columns])
+    assert list(result.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(
+        result.drop(columns=["observ", "neighborhood", "street"]),
+        expected.drop(columns=["observ", "neighborhood", "street"]),
+        check_dtype=False,
+    )
+
+
+def test_run_plan_keeps_virtual_columns_as_recipes(panel):
+    plan = compile_plan(
+        {
+            "variables": [
+                {"define": {"post": "where(month > 4, 1, 0)"}},
+                {
+                    "for": {"var": ["post", "month"]},
+                    "virtual": True,
+                    "define": {"{var}_thefts": "{var} * thefts"},
+                },
+            ],
+        },
+    )
+    result = run_plan(panel, plan)
+    assert "post_thefts" not in result.columns
+    assert result.attrs["virtual_columns"] == {
+        "post_thefts": "post * thefts",
+        "month_thefts": "month * thefts",
+    }
+    values = evaluate_virtual("post * thefts", lambda name: result[name].to_numpy())
+    np.testing.assert_array_equal(values, [1.0, np.nan, 0.0, 0.0])
+
+
+def test_compile_plan_rejects_variables_using_virtual_columns():
+    with pytest.raises(ValueError, match="virtual"):
+        compile_plan(
+            {
+                "variables": [
+                    {"virtual": True, "define": {"x": "month * 2"}},
+                    {"define": {"y": "x + 1"}},
+                ],
+            },
+        )
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+from di_tella_2004_replication.data_management.dtype_plan import apply_dtype_plan
+
+
+@pytest.fixture()
+def cleaned():
+    return pd.DataFrame(
+        {
+            "block": pd.array([1, 1, 2, 2], dtype="Int64"),
+            "neighborhood": pd.array(
+                ["Once", "Once", "Belgrano", None],
+                dtype="string",
+            ),
+            "month_dummy_5": [True, False, True, False],
+            "cuad2p": [0, 1, 0, 1],
+            "treatment": pd.array([0, 1, 0, 1], dtype="Int64"),
+            "post": pd.array([0, 1, 0, None], dtype="Int64"),
+            "jewish_inst": pd.array([1, 1, 0, 0], dtype="Int64"),
+            "av_age": pd.array([30.5, 30.5, None, 41.0], dtype="Float64"),
+            "total_thefts": [0.0, 0.25, 1.0, 0.0],
+        },
+    )
+
+
+def test_apply_dtype_plan_dtypes(cleaned):
+    compact = apply_dtype_plan(cleaned)
+    assert compact.dtypes.astype(str).to_dict() == {
+        "block": "int16",
+        "neighborhood": "category",
+        "month_dummy_5": "bool",
+        "cuad2p": "uint8",
+        "treatment": "uint8",
+        "post": "float64",
+        "jewish_inst": "int64",
+        "av_age": "float64",
+        "total_thefts": "float64",
+    }
+
+
+def test_apply_dtype_plan_keeps_values(cleaned):
+    compact = apply_dtype_plan(cleaned)
+    for column in cleaned.columns:
+        np.testing.assert_array_equal(
+            compact[column].astype(object).where(compact[column].notna(), None),
+            cleaned[column].astype(object).where(cleaned[column].notna(), None),
+        )
+
+
+def test_apply_dtype_plan_index(cleaned):
+    compact = apply_dtype_plan(cleaned.set_index(["block", "cuad2p"]))
+    assert compact.index.names == ["block", "cuad2p"]
+    assert str(compact.index.levels[0].dtype) == "int16"
+    assert compact.index.get_level_values("block").tolist() == [1, 1, 2, 2]
+
+
+def test_apply_dtype_plan_float32(cleaned):
+    compact = apply_dtype_plan(cleaned, float32=True)
+    assert compact["av_age"].dtype == "float32"
+    assert compact["total_thefts"].dtype == "float32"
+    assert compact["cuad2p"].dtype == "uint8"
+
+
+def test_apply_dtype_plan_is_idempotent(cleaned):
+    compact = apply_dtype_plan(cleaned)
+    pd.testing.assert_frame_equal(apply_dtype_plan(compact), compact)
+
+
+def test_apply_dtype_plan_sparse(cleaned):
+    cleaned["month_dummy_6"] = False
+    compact = apply_dtype_plan(cleaned, sparse=True)
+    assert compact["month_dummy_6"].dtype == pd.SparseDtype(bool, fill_value=False)
+    assert compact["cuad2p"].dtype == "uint8"
+    pd.testing.assert_frame_equal(apply_dtype_plan(compact, sparse=True), compact)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from di_tella_2004_replication.data_management.indicators import (
+    indicator,
+    indicator_frame,
+    indicator_matrix,
+    shared_indicators,
+)
+
+
+@pytest.fixture()
+def month():
+    return pd.Series(
+        [5.0, 72.0, 12.0, np.nan, 5.0],
+        name="month",
+        index=[3, 1, 4, 0, 2],
+    )
+
+
+def test_indicator_frame_matches_get_dummies(month):
+    expected = pd.get_dummies(month, prefix="month_dummy")
+    result = indicator_frame(month, prefix="month_dummy", dtype=bool)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_indicator_matrix_levels_not_observed_are_zero(month):
+    matrix, levels = indicator_matrix(month, levels=[5, 6, 12])
+    assert levels.tolist() == [5, 6, 12]
+    np.testing.assert_array_equal(
+        matrix,
+        [[1, 0, 0], [0, 0, 0], [0, 0, 1], [0, 0, 0], [1, 0, 0]],
+    )
+    assert matrix.dtype == np.uint8
+
+
+def test_shared_indicators_build_the_matrix_of_a_column_once(month, monkeypatch):
+    from di_tella_2004_replication.data_management import indicators
+
+    calls = []
+    build = indicators.indicator_matrix
+    monkeypatch.setattr(
+        indicators,
+        "indicator_matrix",
+        lambda *args: calls.append(args) or build(*args),
+    )
+    shared_indicator = shared_indicators()
+    values = month.to_numpy()
+    for level in [5, 6, 12]:
+        np.testing.assert_array_equal(
+            shared_indicator(values, [5, 6, 12], level),
+            indicator(values, [5, 6, 12], level),
+        )
+    assert len(calls) == 1
+    shared_indicator(values.copy(), [5, 6, 12], 5)
+    assert len(calls) == 2
+
+
+def test_indicator_takes_one_level(month):
+    np.testing.assert_array_equal(
+        indicator(month.to_numpy(), [5, 6, 12], 12),
+        [0, 0, 1, 0, 0],
+    )
+
+
+def test_indicator_frame_is_writable(month):
+    result = indicator_frame(month, levels=[5, 12], columns=["month5", "month12"])
+    result.loc[3, "month5"] = 0
+    assert indicator_frame(month, levels=[5, 12]).loc[3, "month_5"] == 1
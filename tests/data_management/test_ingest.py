@@ -0,0 +1,154 @@
+import shutil
+
+import pandas as pd
+import pyreadstat
+import pytest
+from di_tella_2004_replication.config import SRC
+from di_tella_2004_replication.data_management.clean_WeeklyPanel import (
+    process_weekly_panel,
+)
+from di_tella_2004_replication.data_management.ingest import (
+    cache_dta,
+    partition_frame,
+    process_in_partitions,
+    read_cached,
+    read_cached_partitions,
+    read_raw,
+    uses_raw_columns,
+)
+
+
+@pytest.fixture()
+def source(tmp_path):
+    path = tmp_path / "MonthlyPanel.dta"
+    shutil.copy(SRC / "data" / "MonthlyPanel.dta", path)
+    return path
+
+
+def test_cache_dta_round_trip(source, tmp_path):
+    target = tmp_path / "MonthlyPanel.arrow"
+    assert cache_dta(source, target)
+    data, meta = pyreadstat.read_dta(source)
+    pd.testing.assert_frame_equal(read_cached(target), data)
+
+
+def test_cache_dta_reuses_cache(source, tmp_path):
+    target = tmp_path / "MonthlyPanel.arrow"
+    assert cache_dta(source, target)
+    assert not cache_dta(source, target)
+
+
+def test_cache_dta_detects_new_content(source, tmp_path):
+    target = tmp_path / "MonthlyPanel.arrow"
+    cache_dta(source, target)
+    shutil.copy(SRC / "data" / "WeeklyPanel.dta", source)
+    assert cache_dta(source, target)
+    assert "week" in read_cached(target).columns
+
+
+def test_read_cached_columns(source, tmp_path):
+    target = tmp_path / "MonthlyPanel.arrow"
+    cache_dta(source, target)
+    assert list(read_cached(target, columns=["observ", "mes"]).columns) == [
+        "observ",
+        "mes",
+    ]
+
+
+def test_read_cached_columns_in_file_order(source, tmp_path):
+    target = tmp_path / "MonthlyPanel.arrow"
+    cache_dta(source, target)
+    assert list(read_cached(target, columns=["mes", "observ"]).columns) == [
+        "observ",
+        "mes",
+    ]
+
+
+def test_read_raw_projects_stata_and_cache(source, tmp_path):
+    target = tmp_path / "MonthlyPanel.arrow"
+    cache_dta(source, target)
+    from_stata = read_raw(source, columns=["totrob", "observ"])
+    assert list(from_stata.columns) == ["observ", "totrob"]
+    pd.testing.assert_frame_equal(
+        read_raw(target, columns=["totrob", "observ"]),
+        from_stata,
+    )
+
+
+def test_read_raw_unknown_column(source):
+    with pytest.raises(KeyError, match="robbery"):
+        read_raw(source, columns=["observ", "robbery"])
+
+
+def test_uses_raw_columns():
+    @uses_raw_columns(["observ", "mes"])
+    def clean(df):
+        return df
+
+    assert clean.raw_columns == ["observ", "mes"]
+
+
+@pytest.mark.parametrize("num_processes", [1, 2])
+def test_cache_dta_in_chunks(source, tmp_path, num_processes):
+    full, chunked = tmp_path / "full.arrow", tmp_path / "chunked.arrow"
+    cache_dta(source, full)
+    assert cache_dta(source, chunked, chunksize=1000, num_processes=num_processes)
+    assert not cache_dta(source, chunked, chunksize=1000)
+    pd.testing.assert_frame_equal(read_cached(chunked), read_cached(full))
+
+
+def test_cache_dta_in_chunks_dates_and_missing_integers(tmp_path):
+    source = tmp_path / "dates.dta"
+    pd.DataFrame(
+        {
+            "day": pd.to_datetime(["2020-01-01", None, "2020-03-01", "2020-04-01"]),
+            "time": pd.to_datetime(["2020-01-01 10:00"] * 4),
+            "count": pd.array([1, None, None, 4], dtype="Int32"),
+            "value": [0.5, 1.5, None, 2.5],
+        },
+    ).to_stata(source, convert_dates={"day": "td", "time": "tc"}, write_index=False)
+    full, chunked = tmp_path / "full.arrow", tmp_path / "chunked.arrow"
+    cache_dta(source, full)
+    assert cache_dta(source, chunked, chunksize=1)
+    pd.testing.assert_frame_equal(read_cached(chunked), read_cached(full))
+    assert read_cached(chunked)["count"].isna().tolist() == [False, True, True, False]
+
+
+def test_read_cached_partitions_hold_whole_blocks(source, tmp_path):
+    target = tmp_path / "MonthlyPanel.arrow"
+    cache_dta(source, target)
+    data = read_cached(target)
+    partitions = list(read_cached_partitions(target, 100, columns=["observ", "mes"]))
+    assert len(partitions) == 9
+    blocks = [set(partition["observ"]) for partition in partitions]
+    assert sum(len(block) for block in blocks) == data["observ"].nunique()
+    assert set.union(*blocks) == set(data["observ"])
+    stacked = pd.concat(partitions).sort_index()
+    pd.testing.assert_frame_equal(stacked, data[["observ", "mes"]])
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"float32": True, "sparse": True}],
+)
+def test_process_in_partitions_weekly_panel(tmp_path, options):
+    source, target = SRC / "data" / "WeeklyPanel.dta", tmp_path / "WeeklyPanel.arrow"
+    cache_dta(source, target, chunksize=5000)
+    partitions = read_cached_partitions(target, 200, process_weekly_panel.raw_columns)
+    pd.testing.assert_frame_equal(
+        process_in_partitions(partitions, process_weekly_panel, **options).sort_index(),
+        process_weekly_panel(read_cached(target), **options),
+    )
+
+
+def test_partition_frame_holds_whole_blocks():
+    data = pd.DataFrame(
+        {"value": range(6)},
+        index=pd.Index([3, 1, 3, 2, 1, 4], name="block"),
+    )
+    partitions = list(partition_frame(data, 2, entity="block"))
+    assert [list(partition.index) for partition in partitions] == [
+        [3, 1, 3, 1],
+        [2, 4],
+    ]
+    pd.testing.assert_frame_equal(pd.concat(partitions).sort_values("value"), data)
@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+from di_tella_2004_replication.data_management.panel_tables import (
+    join_dimension,
+    split_panel,
+)
+
+
+@pytest.fixture()
+def panel():
+    return pd.DataFrame(
+        {
+            "block": [1, 1, 2, 2, 3, 3],
+            "month": [4, 5, 4, 5, 4, 5],
+            "neighborhood": ["Once", "Once", "Once", "Once", "Belgrano", "Belgrano"],
+            "jewish_inst": [1, 1, 0, 0, 0, 0],
+            "av_age": [30.5, 30.5, 41.0, 41.0, None, None],
+            "total_thefts": [0.0, 1.0, 0.25, 0.0, 1.0, 1.0],
+            "post": [0, 1, 0, 1, 0, 1],
+        },
+    ).set_index(["block", "month"])
+
+
+@pytest.fixture()
+def block_columns():
+    return ["neighborhood", "jewish_inst", "av_age"]
+
+
+def test_split_panel(panel, block_columns):
+    blocks, fact = split_panel(panel, block_columns, entity="block")
+    assert list(blocks.columns) == block_columns
+    assert list(fact.columns) == ["total_thefts", "post"]
+    assert blocks.index.tolist() == [1, 2, 3]
+    assert fact.index.equals(panel.index)
+
+
+def test_split_panel_keeps_other_constant_columns(panel):
+    blocks, fact = split_panel(panel, ["av_age"], entity="block")
+    assert list(blocks.columns) == ["av_age"]
+    assert "neighborhood" in fact.columns
+
+
+def test_split_panel_rejects_varying_columns(panel):
+    with pytest.raises(ValueError, match="post"):
+        split_panel(panel, ["jewish_inst", "post"], entity="block")
+
+
+def test_join_dimension_round_trip(panel, block_columns):
+    blocks, fact = split_panel(panel, block_columns, entity="block")
+    joined = join_dimension(fact, blocks)[panel.columns]
+    pd.testing.assert_frame_equal(joined, panel)
+
+
+def test_join_dimension_only_requested_columns(panel, block_columns):
+    blocks, fact = split_panel(panel.reset_index(), block_columns, entity="block")
+    joined = join_dimension(fact, blocks, ["post", "jewish_inst"])
+    assert list(joined.columns) == [*fact.columns, "jewish_inst"]
+    assert joined["jewish_inst"].tolist() == [1, 1, 0, 0, 0, 0]
+    assert join_dimension(fact, blocks, ["post"]) is fact
+
+
+def test_join_dimension_unknown_block(panel, block_columns):
+    blocks, fact = split_panel(panel, block_columns, entity="block")
+    with pytest.raises(ValueError, match="block"):
+        join_dimension(fact, blocks.drop(index=3))
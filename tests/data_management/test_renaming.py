@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+from di_tella_2004_replication.data_management.clean_crime_by_block import (
+    BLOCK_NAME_SUBSTITUTIONS,
+    BLOCK_RAW_COLUMNS,
+    THEFT_RAW_COLUMNS,
+)
+from di_tella_2004_replication.data_management.clean_MonthlyPanel import (
+    MONTHLY_NAME_SUBSTITUTIONS,
+    MONTHLY_RAW_COLUMNS,
+)
+from di_tella_2004_replication.data_management.clean_WeeklyPanel import (
+    WEEKLY_NAME_SUBSTITUTIONS,
+    WEEKLY_RAW_COLUMNS,
+)
+from di_tella_2004_replication.data_management.renaming import (
+    _renamed,
+    compile_substitutions,
+    rename_columns,
+)
+
+
+def _chained(columns, substitutions):
+    columns = pd.Index(columns)
+    for pattern, replacement in substitutions:
+        columns = columns.str.replace(pattern, replacement)
+    return list(columns)
+
+
+@pytest.mark.parametrize(
+    ("columns", "substitutions"),
+    [
+        (
+            [*BLOCK_RAW_COLUMNS, *THEFT_RAW_COLUMNS, "robmak"],
+            BLOCK_NAME_SUBSTITUTIONS,
+        ),
+        (WEEKLY_RAW_COLUMNS, WEEKLY_NAME_SUBSTITUTIONS),
+        (MONTHLY_RAW_COLUMNS, MONTHLY_NAME_SUBSTITUTIONS),
+    ],
+)
+def test_rename_columns_matches_chained_replace(columns, substitutions):
+    assert rename_columns(columns, substitutions) == _chained(columns, substitutions)
+
+
+def test_rename_columns_is_memoized():
+    columns = ("rob1dia", "rob1mes", "rob1hor")
+    rename_columns(columns, BLOCK_NAME_SUBSTITUTIONS)
+    hits = _renamed.cache_info().hits
+    assert rename_columns(list(columns), BLOCK_NAME_SUBSTITUTIONS) == [
+        "theft1day",
+        "theft1month",
+        "theft1hour",
+    ]
+    assert _renamed.cache_info().hits == hits + 1
+
+
+def test_rename_columns_keeps_names_that_are_not_strings():
+    assert rename_columns(["rob", 3], (("rob", "theft"),)) == ["theft", 3]
+
+
+def test_compile_substitutions_rejects_chained_replacements():
+    with pytest.raises(ValueError, match="depends on"):
+        compile_substitutions((("dia", "day"), ("day", "week_day")))
+
+
+def test_rename_columns_prefers_the_leftmost_pattern():
+    assert rename_columns(["ab"], (("b", "Y"), ("ab", "X"))) == ["X"]
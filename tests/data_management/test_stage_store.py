@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+import pytest
+from di_tella_2004_replication.data_management.stage_store import (
+    ROWS_COLUMN,
+    read_stage,
+    write_stage,
+)
+
+
+@pytest.fixture()
+def stages():
+    first = pd.DataFrame(
+        {
+            "observ": np.array([1, 1, 2, 2], dtype="int16"),
+            "month": [4.0, 72.0, 4.0, 5.0],
+            "neighborhood": pd.Categorical(["Once", "Once", "Belgrano", "Belgrano"]),
+            "total_thefts": [0.0, np.nan, 1.0, 0.25],
+        },
+        index=[10, 11, 12, 13],
+    )
+    second = first[first["month"] != 72].sort_values(["observ", "month"]).copy()
+    second["total_thefts"] = second["total_thefts"] * 4
+    second["post"] = np.array([0, 0, 1], dtype="uint8")
+    third = second.copy()
+    third["w"] = 0.25
+    return first, second, third
+
+
+@pytest.fixture()
+def stored(stages, tmp_path):
+    paths = [tmp_path / f"stage{i}.arrow" for i in range(3)]
+    write_stage(stages[0], paths[0])
+    write_stage(stages[1], paths[1], parent=paths[0])
+    write_stage(stages[2], paths[2], parent=paths[1])
+    return paths
+
+
+def test_read_stage_reassembles_every_stage(stages, stored):
+    for expected, path in zip(stages, stored):
+        pd.testing.assert_frame_equal(read_stage(path), expected)
+
+
+def test_write_stage_stores_only_new_or_changed_columns(stored):
+    assert feather.read_table(stored[1]).column_names == [
+        "total_thefts",
+        "post",
+        ROWS_COLUMN,
+    ]
+    assert feather.read_table(stored[2]).column_names == ["w"]
+
+
+def test_read_stage_selected_columns(stages, stored):
+    result = read_stage(stored[2], columns=["w", "neighborhood"])
+    pd.testing.assert_frame_equal(result, stages[2][["w", "neighborhood"]])
+
+
+def test_write_stage_rejects_rows_not_in_parent(stages, stored, tmp_path):
+    new_rows = stages[1].rename(index={10: 99})
+    with pytest.raises(ValueError, match="not in its parent"):
+        write_stage(new_rows, tmp_path / "other.arrow", parent=stored[0])
+
+
+def test_stage_store_keeps_sparse_columns(stages, tmp_path):
+    first = stages[0].copy()
+    first["week_dummy_1"] = pd.arrays.SparseArray(
+        np.array([0, 0, 1, 0], dtype="uint8"),
+        fill_value=0,
+    )
+    write_stage(first, tmp_path / "sparse.arrow")
+    pd.testing.assert_frame_equal(read_stage(tmp_path / "sparse.arrow"), first)
+
+
+def test_stage_store_keeps_attrs(stages, tmp_path):
+    first = stages[0].copy()
+    first.attrs["virtual_columns"] = {"thefts_post": "total_thefts * post"}
+    write_stage(first, tmp_path / "attrs.arrow")
+    assert read_stage(tmp_path / "attrs.arrow").attrs == first.attrs
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+from di_tella_2004_replication.data_management.theft_cube import (
+    THEFT_RULES,
+    bin_membership,
+    category_counts,
+    theft_cube,
+    value_threshold_sweep,
+)
+
+
+@pytest.fixture()
+def theft_data():
+    return pd.DataFrame(
+        {
+            "theft1": [1.0, 1.0, 0.0],
+            "theft1month": [4.0, 5.0, 4.0],
+            "theft1val": [8403.826, 20000.0, 100.0],
+            "theft1hour": [23.0, 12.0, 3.0],
+            "theft1day": [6.0, 2.0, 1.0],
+            "theft1corner": [0.0, 1.0, 0.0],
+            "theft2": [1.0, np.nan, 1.0],
+            "theft2month": [4.0, np.nan, 12.0],
+            "theft2val": [100.0, np.nan, 9000.0],
+            "theft2hour": [12.0, np.nan, np.nan],
+            "theft2day": [3.0, np.nan, 7.0],
+            "theft2corner": [0.0, np.nan, 0.0],
+        },
+        index=pd.Index([10, 20, 30], name="block"),
+    )
+
+
+def test_category_counts_of_default_rules(theft_data):
+    cube = theft_cube(theft_data, months=[4, 5, 12], maxrange=3)
+    assert cube["counts"].shape[:2] == (3, 3)
+    np.testing.assert_array_equal(
+        category_counts(cube, value="hv"),
+        [[1, 0, 0], [0, 0.25, 0], [0, 0, 1]],
+    )
+    np.testing.assert_array_equal(
+        category_counts(cube, value="lv"),
+        [[2, 0, 0], [0, 0, 0], [0, 0, 0]],
+    )
+    np.testing.assert_array_equal(
+        category_counts(cube, time="night", week="weekend"),
+        [[1, 0, 0], [0, 0, 0], [0, 0, 0]],
+    )
+    np.testing.assert_array_equal(
+        category_counts(cube),
+        [[2, 0, 0], [0, 0.25, 0], [0, 0, 1]],
+    )
+
+
+def test_theft_cube_with_other_cut_off(theft_data):
+    rules = {
+        "value": {
+            "field": "val",
+            "bins": {"hv": [pd.Interval(5000, np.inf, closed="left")]},
+        },
+    }
+    cube = theft_cube(theft_data, rules=rules, months=[4, 5, 12], maxrange=3)
+    np.testing.assert_array_equal(
+        category_counts(cube, value="hv"),
+        [[1, 0, 0], [0, 0.25, 0], [0, 0, 1]],
+    )
+
+
+def test_bin_membership_missing_values_are_in_no_bin():
+    membership = bin_membership([3.0, np.nan, 22.0], THEFT_RULES["time"]["bins"])
+    np.testing.assert_array_equal(membership, [[1, 0], [0, 0], [0, 1]])
+
+
+def test_category_counts_unknown_rule(theft_data):
+    cube = theft_cube(theft_data, months=[4], maxrange=3)
+    with pytest.raises(ValueError, match="Unknown rules"):
+        category_counts(cube, colour="red")
+
+
+def test_value_threshold_sweep_matches_cube(theft_data):
+    thresholds = [9000.0, 100.0, 8403.826, 50000.0]
+    sweep = value_threshold_sweep(theft_data, thresholds, months=[4, 5, 12], maxrange=3)
+    assert list(sweep["tot_theft_hv"].columns) == thresholds
+    for threshold in thresholds:
+        rules = {
+            "value": {
+                "field": "val",
+                "bins": {
+                    "hv": [pd.Interval(threshold, 100000, closed="both")],
+                    "lv": [pd.Interval(0, threshold, closed="both")],
+                },
+            },
+        }
+        cube = theft_cube(theft_data, rules=rules, months=[4, 5, 12], maxrange=3)
+        for label in ["hv", "lv"]:
+            np.testing.assert_array_equal(
+                sweep[f"tot_theft_{label}"][threshold].to_numpy(),
+                category_counts(cube, value=label).ravel(),
+            )
+    pd.testing.assert_frame_equal(
+        sweep["dif_hv_lv"],
+        sweep["tot_theft_hv"] - sweep["tot_theft_lv"],
+    )